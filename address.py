@@ -0,0 +1,214 @@
+import numpy as np
+
+# Keccak-f[1600] round constants and rho rotations, ROTATIONS[x][y] for lane (x, y)
+ROUND_CONSTANTS = np.array([
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+], dtype=np.uint64)
+ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+# Keccak-256 absorbs 136 bytes per permutation
+RATE = 136
+
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+# ASCII byte -> nibble value, 255 for anything that isn't a hex digit
+_NIBBLES = np.full(256, 255, dtype=np.uint8)
+_NIBBLES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+_NIBBLES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+_NIBBLES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+
+def _rotl(lane, shift):
+    if shift == 0:
+        return lane
+    return (lane << np.uint64(shift)) | (lane >> np.uint64(64 - shift))
+
+
+def _permute(state):
+    """Keccak-f[1600] on a (5, 5, n) uint64 state, every message of the batch at once"""
+    for constant in ROUND_CONSTANTS:
+        parity = state[:, 0] ^ state[:, 1] ^ state[:, 2] ^ state[:, 3] ^ state[:, 4]
+        for x in range(5):
+            state[x] ^= parity[(x - 1) % 5] ^ _rotl(parity[(x + 1) % 5], 1)
+        moved = np.empty_like(state)
+        for x in range(5):
+            for y in range(5):
+                moved[y, (2 * x + 3 * y) % 5] = _rotl(state[x, y], ROTATIONS[x][y])
+        for x in range(5):
+            state[x] = moved[x] ^ (~moved[(x + 1) % 5] & moved[(x + 2) % 5])
+        state[0, 0] ^= constant
+    return state
+
+
+def keccak256(messages):
+    """Keccak-256 (Ethereum's pre-NIST padding) of equal-length messages, an (n, length) uint8 array in, (n, 32) out"""
+    messages = np.atleast_2d(np.asarray(messages, dtype=np.uint8))
+    n, length = messages.shape
+    blocks = length // RATE + 1
+    padded = np.zeros((n, blocks * RATE), dtype=np.uint8)
+    padded[:, :length] = messages
+    padded[:, length] ^= 0x01
+    padded[:, -1] ^= 0x80
+
+    state = np.zeros((5, 5, n), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for block in range(blocks):
+            chunk = np.zeros((n, 200), dtype=np.uint8)
+            chunk[:, :RATE] = padded[:, block * RATE:(block + 1) * RATE]
+            # Lane (x, y) is little-endian word x + 5y of the block
+            lanes = chunk.view('<u8').astype(np.uint64).T.reshape(5, 5, n).transpose(1, 0, 2)
+            state ^= lanes
+            _permute(state)
+    words = np.ascontiguousarray(state[:, 0][:4].T, dtype="<u8")
+    return words.view(np.uint8).reshape(n, 32)
+
+
+def parse(addresses, strict=True):
+    """Bulk hex -> (n, 20) uint8, accepting any case with or without 0x
+
+    With strict=False malformed entries don't raise; a boolean mask of the valid
+    rows is returned alongside (invalid rows are zero).
+    """
+    text = np.char.strip(np.asarray(addresses, dtype=str).ravel())
+    lengths = np.char.str_len(text)
+    prefixed = (lengths == 42) & np.char.startswith(np.char.lower(text), "0x")
+    valid = prefixed | (lengths == 40)
+    # Non-ASCII characters become '?' so every row keeps its length, shorter rows are zero padded
+    padded = np.char.encode(text, "ascii", "replace").astype("S42").view(np.uint8).reshape(-1, 42)
+    chars = np.where(prefixed[:, None], padded[:, 2:], padded[:, :40])
+    nibbles = _NIBBLES[chars]
+    valid &= (nibbles != 255).all(axis=1)
+    raw = np.where(valid[:, None], (nibbles[:, 0::2] << 4) | nibbles[:, 1::2], 0).astype(np.uint8)
+    if strict:
+        if not valid.all():
+            raise ValueError(f"not a 20-byte hex address: {addresses[int(np.argmin(valid))]!r}")
+        return raw
+    return raw, valid
+
+
+def format_hex(raw):
+    """(n, 20) uint8 or S20 -> lowercase 0x-prefixed strings"""
+    raw = as_bytes(raw)
+    chars = np.empty((len(raw), 42), dtype=np.uint8)
+    chars[:, 0] = ord("0")
+    chars[:, 1] = ord("x")
+    chars[:, 2::2] = _HEX_DIGITS[raw >> 4]
+    chars[:, 3::2] = _HEX_DIGITS[raw & 0x0F]
+    return chars.view("S42").ravel().astype(str)
+
+
+def checksum(raw):
+    """EIP-55 mixed-case strings for (n, 20) uint8 or S20 addresses, one keccak256 batch for all of them"""
+    raw = as_bytes(raw)
+    lower = np.empty((len(raw), 40), dtype=np.uint8)
+    lower[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    lower[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+    digest = keccak256(lower)
+    # Hex digit i is upper-cased when nibble i of the hash is 8 or more
+    high = np.empty((len(raw), 40), dtype=bool)
+    high[:, 0::2] = (digest[:, :20] & 0x80) != 0
+    high[:, 1::2] = (digest[:, :20] & 0x08) != 0
+    letters = lower >= ord("a")
+    chars = np.empty((len(raw), 42), dtype=np.uint8)
+    chars[:, :2] = np.frombuffer(b"0x", dtype=np.uint8)
+    chars[:, 2:] = np.where(high & letters, lower - 32, lower)
+    return chars.view("S42").ravel().astype(str)
+
+
+def as_bytes(raw):
+    """(n, 20) uint8 view of S20 or uint8 address arrays"""
+    raw = np.asarray(raw)
+    if raw.dtype == np.dtype("S20"):
+        return np.ascontiguousarray(raw).view(np.uint8).reshape(-1, 20)
+    return raw.reshape(-1, 20).astype(np.uint8, copy=False)
+
+
+def as_keys(raw):
+    """S20 view of (n, 20) uint8 addresses, one sortable fixed-width key per address"""
+    raw = np.asarray(raw)
+    if raw.dtype == np.dtype("S20"):
+        return raw
+    return np.ascontiguousarray(raw, dtype=np.uint8).view("S20").ravel()
+
+
+class AddressBook:
+    """Interned addresses: id -> 20 bytes in an S20 array, bytes -> id through a sorted index
+
+    Ids are dense and stable (first seen, first numbered), so graphs, matrices and
+    caches key on int32s instead of 42-character strings. Lookups are one
+    searchsorted for a whole batch.
+    """
+
+    def __init__(self, raw=None):
+        self.raw = as_keys(raw) if raw is not None else np.empty(0, dtype="S20")
+        self._order = np.argsort(self.raw, kind='stable').astype(np.int32)
+        self._sorted = self.raw[self._order]
+
+    def __len__(self):
+        return len(self.raw)
+
+    def _keys(self, addresses):
+        addresses = np.asarray(addresses)
+        if addresses.dtype == np.dtype("S20") or addresses.dtype == np.uint8:
+            return as_keys(addresses)
+        return as_keys(parse(addresses))
+
+    def lookup(self, addresses):
+        """Ids of hex strings or raw addresses, -1 for ones never interned"""
+        keys = self._keys(addresses)
+        at = np.minimum(np.searchsorted(self._sorted, keys), max(len(self._sorted) - 1, 0))
+        if len(self._sorted) == 0:
+            return np.full(len(keys), -1, dtype=np.int32)
+        return np.where(self._sorted[at] == keys, self._order[at], -1).astype(np.int32)
+
+    def intern(self, addresses):
+        """Ids of hex strings or raw addresses, numbering the new ones"""
+        keys = self._keys(addresses)
+        ids = self.lookup(keys)
+        missing = ids < 0
+        if missing.any():
+            fresh, first, inverse = np.unique(keys[missing], return_index=True, return_inverse=True)
+            # Number new addresses in order of first appearance
+            rank = np.empty(len(fresh), dtype=np.int32)
+            rank[np.argsort(first, kind='stable')] = np.arange(len(fresh), dtype=np.int32)
+            new_ids = len(self.raw) + rank
+            ids[missing] = new_ids[inverse]
+
+            at = np.searchsorted(self._sorted, fresh)
+            self._sorted = np.insert(self._sorted, at, fresh)
+            self._order = np.insert(self._order, at, new_ids)
+            appended = np.empty(len(fresh), dtype="S20")
+            appended[rank] = fresh
+            self.raw = np.concatenate((self.raw, appended))
+        return ids
+
+    def hex(self, ids):
+        return format_hex(self.raw[np.asarray(ids)])
+
+    def checksummed(self, ids):
+        return checksum(self.raw[np.asarray(ids)])
+
+    def save(self, file_path):
+        np.save(file_path, self.raw.view(np.uint8).reshape(-1, 20))
+
+    @classmethod
+    def load(cls, file_path):
+        return cls(np.load(file_path))
+
+
+if __name__ == "__main__":
+    import sys
+
+    book = AddressBook()
+    ids = book.intern(sys.argv[1:])
+    for i, address in zip(ids, book.checksummed(ids)):
+        print(i, address)
@@ -0,0 +1,154 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from metrics import MetricsStore
+
+WINDOW = 30
+THRESHOLD = 3.0
+# EWMA smoothing factor, about a two week half-life on daily data
+ALPHA = 0.05
+
+
+def rolling_stats(values, window=WINDOW):
+    """Mean, std and sample count over the `window` samples before each row, for every column at once
+
+    values is a (T, M) float array; NaNs are skipped. The statistics exclude the
+    row itself, so a spike can't hide inside its own window.
+    """
+    valid = ~np.isnan(values)
+    # Centred per column so long prefix sums of squares don't swamp the variance
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        centre = np.nan_to_num(np.nanmean(values, axis=0))
+    filled = np.where(valid, values - centre, 0.0)
+    zeros = np.zeros((1, values.shape[1]))
+    # Prefix sums with a leading zero row: window sums are differences of two rows
+    count = np.concatenate((zeros, np.cumsum(valid, axis=0)))
+    total = np.concatenate((zeros, np.cumsum(filled, axis=0)))
+    squares = np.concatenate((zeros, np.cumsum(filled ** 2, axis=0)))
+
+    end = np.arange(values.shape[0])
+    start = np.maximum(end - window, 0)
+    n = count[end] - count[start]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (total[end] - total[start]) / n
+        variance = (squares[end] - squares[start]) / n - mean ** 2
+    std = np.sqrt(np.maximum(variance, 0))
+    return mean + centre, std, n
+
+
+def ewma(values, alpha=ALPHA):
+    """Exponentially weighted moving average down every column, NaNs carry the previous value"""
+    filled = pd.DataFrame(values).ffill().bfill().to_numpy(dtype=np.float64)
+    if len(filled) == 0:
+        return filled
+    # y[t] = alpha * x[t] + (1 - alpha) * y[t - 1], seeded with the first value
+    smoothed, _ = lfilter([alpha], [1, alpha - 1], filled, axis=0, zi=(1 - alpha) * filled[:1])
+    return smoothed
+
+
+def detect(frame, window=WINDOW, threshold=THRESHOLD, alpha=ALPHA, min_periods=None):
+    """Rolling z-scores, EWMA and anomaly flags for every column of a wide frame in one vectorised pass
+
+    Returns a frame with a (metric, statistic) column MultiIndex, statistic being
+    one of value, mean, std, ewma, zscore, anomaly.
+    """
+    min_periods = min_periods or max(window // 2, 2)
+    values = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+    mean, std, n = rolling_stats(values, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        zscore = (values - mean) / std
+    zscore[(n < min_periods) | (std == 0)] = np.nan
+    anomaly = np.abs(zscore) > threshold
+
+    stats = {"value": values, "mean": mean, "std": std, "ewma": ewma(values, alpha), "zscore": zscore,
+             "anomaly": anomaly}
+    return pd.DataFrame(
+        {(metric, name): stat[:, j] for j, metric in enumerate(frame.columns) for name, stat in stats.items()},
+        index=frame.index,
+    )
+
+
+def anomalies(frame, window=WINDOW, threshold=THRESHOLD):
+    """Long table of (timestamp, metric, value, zscore) for every flagged sample"""
+    result = detect(frame, window, threshold)
+    rows = []
+    for metric in frame.columns:
+        flagged = result[(metric, "anomaly")]
+        part = result.loc[flagged, [(metric, "value"), (metric, "zscore")]]
+        part.columns = ["value", "zscore"]
+        rows.append(part.assign(metric=metric))
+    table = pd.concat(rows).reset_index() if rows else pd.DataFrame(columns=["value", "zscore", "metric"])
+    return table.sort_values(table.columns[0]) if len(table) else table
+
+
+class RollingDetector:
+    """Incremental detector for live feeds: O(1) work per metric per sample through a ring buffer
+
+    Each update compares the sample against the previous `window` samples, then
+    pushes it. Running sums are rebuilt from the buffer once per window so float
+    drift stays bounded; that is amortised O(1) too.
+    """
+
+    def __init__(self, metrics, window=WINDOW, threshold=THRESHOLD, alpha=ALPHA, min_periods=None):
+        self.metrics = list(metrics)
+        self.window = window
+        self.threshold = threshold
+        self.alpha = alpha
+        self.min_periods = min_periods or max(window // 2, 2)
+        size = len(self.metrics)
+        self.buffer = np.full((window, size), np.nan)
+        self.position = 0
+        self.total = np.zeros(size)
+        self.squares = np.zeros(size)
+        self.count = np.zeros(size)
+        self.ewma = np.full(size, np.nan)
+        self.updates = 0
+
+    def _rebuild(self):
+        valid = ~np.isnan(self.buffer)
+        filled = np.where(valid, self.buffer, 0.0)
+        self.total = filled.sum(axis=0)
+        self.squares = (filled ** 2).sum(axis=0)
+        self.count = valid.sum(axis=0).astype(np.float64)
+
+    def update(self, sample):
+        """Score one sample (a value per metric, NaN for missing), returns (zscore, anomaly, ewma) arrays"""
+        sample = np.asarray(sample, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.total / self.count
+            std = np.sqrt(np.maximum(self.squares / self.count - mean ** 2, 0))
+            zscore = (sample - mean) / std
+        zscore[(self.count < self.min_periods) | (std == 0)] = np.nan
+        anomaly = np.abs(zscore) > self.threshold
+
+        # Swap the oldest sample out of the running sums and the new one in
+        valid = ~np.isnan(sample)
+        oldest = self.buffer[self.position]
+        leaving = ~np.isnan(oldest)
+        self.total -= np.where(leaving, oldest, 0.0)
+        self.squares -= np.where(leaving, oldest ** 2, 0.0)
+        self.count -= leaving
+        self.total += np.where(valid, sample, 0.0)
+        self.squares += np.where(valid, sample ** 2, 0.0)
+        self.count += valid
+        self.buffer[self.position] = sample
+        self.position = (self.position + 1) % self.window
+
+        self.ewma = np.where(np.isnan(self.ewma), sample,
+                             np.where(valid, self.alpha * sample + (1 - self.alpha) * self.ewma, self.ewma))
+
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._rebuild()
+        return zscore, anomaly, self.ewma.copy()
+
+
+if __name__ == "__main__":
+    table = anomalies(MetricsStore().load())
+    table.insert(1, "Date(UTC)", pd.to_datetime(table.iloc[:, 0], unit="s").dt.strftime("%Y-%m-%d"))
+    print(f"{len(table)} anomalies (|z| > {THRESHOLD} over a {WINDOW} day window)")
+    print(table.to_string(index=False))
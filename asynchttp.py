@@ -0,0 +1,145 @@
+import asyncio
+import json
+import ssl
+from urllib.parse import urlencode, urlsplit
+
+
+class HTTPError(Exception):
+    """Non-2xx response from a pooled request"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class HTTPPool:
+    """Minimal asyncio HTTP/1.1 client that keeps connections alive per host"""
+
+    def __init__(self, max_connections=8, timeout=30):
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle = {}
+        self._ssl = ssl.create_default_context()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Close every idle connection"""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+    async def _connect(self, key):
+        """Reuse an idle connection to key if there is one, returns (reader, writer, reused)"""
+        scheme, host, port = key
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.open_connection(host, port, ssl=self._ssl if scheme == 'https' else None)
+        return reader, writer, False
+
+    async def request(self, method, url, body=None, headers=None):
+        """Send one request and return (status, headers, body bytes)"""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            "Connection: keep-alive",
+            "Accept-Encoding: identity",
+            f"Content-Length: {len(body) if body else 0}",
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b'')
+
+        async with self._slots:
+            while True:
+                reader, writer, reused = await self._connect(key)
+                try:
+                    writer.write(payload)
+                    await writer.drain()
+                    status, response_headers, data = await asyncio.wait_for(
+                        self._read_response(reader), self.timeout
+                    )
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    # The server may have dropped an idle keep-alive connection, retry on a fresh one
+                    if not reused:
+                        raise
+                except BaseException:
+                    writer.close()
+                    raise
+
+            if response_headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._idle.setdefault(key, []).append((reader, writer))
+
+        return status, response_headers, data
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed before response")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            data = b''.join(chunks)
+        elif 'content-length' in headers:
+            data = await reader.readexactly(int(headers['content-length']))
+        else:
+            data = await reader.read()
+            headers['connection'] = 'close'
+        return status, headers, data
+
+    async def get_json(self, url, params=None):
+        """GET url and decode the JSON body"""
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+        status, _, data = await self.request('GET', url, headers={"Accept": "application/json"})
+        if not 200 <= status < 300:
+            raise HTTPError(status, data)
+        return json.loads(data)
+
+    async def post_json(self, url, payload):
+        """POST a JSON payload and decode the JSON body"""
+        body = json.dumps(payload).encode()
+        status, _, data = await self.request(
+            'POST', url, body=body,
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+        )
+        if not 200 <= status < 300:
+            raise HTTPError(status, data)
+        return json.loads(data)
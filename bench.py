@@ -0,0 +1,280 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from changes import update_changes
+from experiment import load_data
+from layout import force_layout, spectral_layout
+from metrics import DATASETS, DATE_COLUMN, TIME_COLUMN, MetricsStore
+from normalized import SOURCES, normalize_file
+from pointcloud import PointCloud
+from txgraph import CSRGraph
+
+BASELINE = "bench-baseline.json"
+RESULTS = "bench-results.json"
+SCALES = (1, 10, 100)
+# Fraction over baseline before a case counts as a regression
+THRESHOLD = 0.25
+
+# Input sizes at 1x: a year of daily metrics like the checked-in CSVs, points and graph sized for today's runs
+BASE_DAYS = 366
+BASE_POINTS = 100_000
+BASE_NODES = 10_000
+BASE_EDGES = 30_000
+
+
+def write_points(clean_path, trailing_path, n, rng, chunk=1 << 16):
+    """The same points as experiment.json in experiment.cpp's layout, without and with its trailing commas"""
+    points = rng.integers(0, 1000, size=(n, 3))
+    with open(clean_path, 'w') as clean, open(trailing_path, 'w') as trailing:
+        for f in (clean, trailing):
+            f.write('{ "data": [')
+        for start in range(0, n, chunk):
+            block = points[start:start + chunk]
+            # One %-format over the whole block instead of an f-string per row
+            rows = "[%d, %d, %d],\n" * len(block) % tuple(block.ravel().tolist())
+            trailing.write(rows)
+            clean.write(rows if start + chunk < n else rows[:-2])
+        clean.write("\n]}")
+        trailing.write("]}")
+
+
+def write_metrics(root, days, rng):
+    """Every metrics CSV (and raw address-count.csv) with `days` rows in its own date format and quoting"""
+    dates = pd.date_range("2000-01-01", periods=days, freq="D")
+    timestamps = (dates - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    specs = dict(DATASETS)
+    specs["address-count-raw"] = SOURCES["address-count"]
+    for spec in specs.values():
+        frame = pd.DataFrame({DATE_COLUMN: dates.strftime(spec["date_format"]), TIME_COLUMN: timestamps})
+        for column in spec["columns"]:
+            frame[column] = np.cumsum(rng.integers(0, 100_000, days)) + 250_000_000
+        frame.to_csv(os.path.join(root, spec["file"]), index=False, quoting=1)
+
+
+class Workspace:
+    """Synthetic inputs for one scale in a temporary directory"""
+
+    def __init__(self, scale, seed=0):
+        self.scale = scale
+        self.root = tempfile.mkdtemp(prefix=f"bench-{scale}x-")
+        rng = np.random.default_rng(seed)
+
+        self.points_clean = os.path.join(self.root, "experiment-clean.json")
+        self.points_trailing = os.path.join(self.root, "experiment.json")
+        write_points(self.points_clean, self.points_trailing, BASE_POINTS * scale, rng)
+        self.points = np.asarray(load_data(self.points_trailing, use_sidecar=False))
+
+        write_metrics(self.root, BASE_DAYS * scale, rng)
+
+        addresses = np.array([f"0x{i:040x}" for i in range(BASE_NODES * scale)])
+        self.src_names = addresses[rng.integers(0, len(addresses), BASE_EDGES * scale)]
+        self.dst_names = addresses[rng.integers(0, len(addresses), BASE_EDGES * scale)]
+        self.graph = CSRGraph.from_edges(self.src_names, self.dst_names)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _load_sidecar(ws):
+    # Make sure the sidecar exists and is fresh, then time only the mapped load
+    load_data(ws.points_trailing)
+    return lambda: int(np.asarray(load_data(ws.points_trailing)).sum())
+
+
+def _write_sidecar(ws):
+    def run():
+        if os.path.exists(ws.points_trailing + ".npy"):
+            os.remove(ws.points_trailing + ".npy")
+        load_data(ws.points_trailing)
+    return run
+
+
+def _pointcloud_prep(ws):
+    # What visualize_3d_points computes before handing points to matplotlib
+    def run():
+        cloud = PointCloud(ws.points)
+        cloud.distances(3)
+        core, outer = cloud.split(0.7, dims=3)
+        cloud.decimate_groups([core, outer[::3]], 50_000, dims=3)
+    return run
+
+
+def _pointcloud_prep_2d(ws):
+    # What visualize_2d_points computes before handing points to matplotlib
+    def run():
+        cloud = PointCloud(ws.points)
+        cloud.distances(2)
+        core, outer = cloud.split(0.7, dims=2)
+        cloud.decimate_groups([core, outer[::2]], 200_000, dims=2)
+    return run
+
+
+def _metrics_load(ws):
+    def run():
+        shutil.rmtree(ws.path(".cache"), ignore_errors=True)
+        store = MetricsStore(root=ws.root)
+        for name, spec in DATASETS.items():
+            store.frame(name).melt(id_vars=[DATE_COLUMN], value_vars=spec["columns"], var_name="Metric",
+                                   value_name="Metric value")
+    return run
+
+
+def _metrics_cached(ws):
+    MetricsStore(root=ws.root).load()
+    return lambda: MetricsStore(root=ws.root).load()
+
+
+def _normalize(ws):
+    return lambda: [normalize_file(name, "zscore", root=ws.root) for name in SOURCES]
+
+
+def _changes_full(ws):
+    source = ws.path(SOURCES["address-count"]["file"])
+
+    def run():
+        for path in (ws.path("changes.csv"), ws.path("changes.csv.state.json")):
+            if os.path.exists(path):
+                os.remove(path)
+        update_changes(source, ws.path("changes.csv"), date_format=SOURCES["address-count"]["date_format"])
+    return run
+
+
+def _changes_append(ws):
+    source = ws.path(SOURCES["address-count"]["file"])
+    log = ws.path("changes-append.csv")
+    date_format = SOURCES["address-count"]["date_format"]
+    update_changes(source, log, date_format=date_format)
+    day = [pd.Timestamp("2200-01-01")]
+
+    def run():
+        # One new day on top of an up-to-date log, the common daily case
+        with open(source, 'a') as f:
+            f.write(f'"{day[0].strftime(date_format)}","{day[0].value // 10 ** 9}","999999999"\n')
+        day[0] += pd.Timedelta(days=1)
+        update_changes(source, log, date_format=date_format)
+    return run
+
+
+CASES = {
+    "load_data/parse-clean": lambda ws: lambda: load_data(ws.points_clean, use_sidecar=False),
+    "load_data/parse-trailing-commas": lambda ws: lambda: load_data(ws.points_trailing, use_sidecar=False),
+    "load_data/write-sidecar": _write_sidecar,
+    "load_data/load-sidecar": _load_sidecar,
+    "pointcloud/prepare-3d": _pointcloud_prep,
+    "pointcloud/prepare-2d": _pointcloud_prep_2d,
+    "metrics/load-and-melt": _metrics_load,
+    "metrics/cached-load": _metrics_cached,
+    "normalize/zscore-all": _normalize,
+    "changes/full-rebuild": _changes_full,
+    "changes/append-day": _changes_append,
+    "graph/build": lambda ws: lambda: CSRGraph.from_edges(ws.src_names, ws.dst_names),
+    "graph/layout-10-iterations": lambda ws: lambda: force_layout(ws.graph, spectral_layout(ws.graph), 10),
+}
+
+
+def time_case(run, repeats):
+    """Seconds per call over `repeats` calls, output from the code under test is swallowed"""
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "runs": times}
+
+
+def run_benchmarks(cases, scales, repeats=3):
+    """{"<case>@<scale>x": timings} for every selected case at every scale"""
+    results = {}
+    for scale in scales:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            ws = Workspace(scale)
+        print(f"{scale}x inputs generated in {time.perf_counter() - start:.1f}s")
+        try:
+            for name in cases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run = CASES[name](ws)
+                timing = time_case(run, repeats)
+                results[f"{name}@{scale}x"] = timing
+
+                # Growth relative to the previous scale, anything well past linear is a scaling cliff
+                previous = scales[scales.index(scale) - 1] if scales.index(scale) else None
+                growth = ""
+                if previous and f"{name}@{previous}x" in results:
+                    ratio = timing["min"] / max(results[f"{name}@{previous}x"]["min"], 1e-9)
+                    growth = f"  x{ratio:.1f} for x{scale // previous} data"
+                print(f"  {name:<32} {timing['min'] * 1000:10.1f} ms{growth}")
+        finally:
+            ws.close()
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Cases slower than baseline * (1 + threshold), as (key, seconds, baseline seconds)"""
+    regressions = []
+    for key, timing in results.items():
+        if key in baseline and timing["min"] > baseline[key]["min"] * (1 + threshold):
+            regressions.append((key, timing["min"], baseline[key]["min"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data paths on synthetic inputs")
+    parser.add_argument('cases', nargs='*', help="case names or prefixes (e.g. load_data), default: all")
+    parser.add_argument('--scales', default=",".join(map(str, SCALES)), help="comma separated multiples of 1x")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="record these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--out', default=RESULTS)
+    args = parser.parse_args()
+
+    cases = [name for name in CASES if not args.cases or any(name.startswith(c) for c in args.cases)]
+    if not cases:
+        parser.error(f"no case matches {args.cases}, expected one of {', '.join(CASES)}")
+    scales = [int(s) for s in args.scales.split(",")]
+
+    results = run_benchmarks(cases, scales, args.repeats)
+    report = {"machine": platform.platform(), "python": platform.python_version(), "results": results}
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved in '{args.out}'")
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)
+        report["results"] = baseline
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved in '{args.baseline}'")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, seconds, expected in regressions:
+            print(f"REGRESSION {key}: {seconds * 1000:.1f} ms vs baseline {expected * 1000:.1f} ms "
+                  f"(+{(seconds / expected - 1):.0%}, threshold {args.threshold:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions past {args.threshold:.0%} against '{args.baseline}'")
+    else:
+        print(f"No baseline at '{args.baseline}', run with --save-baseline to record one")
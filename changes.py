@@ -0,0 +1,157 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from metrics import DATASETS, DATE_COLUMN, TIME_COLUMN
+
+SOURCE = DATASETS["address-count"]["file"]
+LOG = "logged_changes.csv"
+CHANGE_COLUMN = "Daily Change"
+
+# Bytes of new source rows parsed per step
+CHUNK_SIZE = 1 << 20
+
+
+def state_path(log):
+    """Where the pipeline remembers how far it got"""
+    return log + ".state.json"
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _save_state(path, state):
+    with open(path + ".tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _prefix_hash(path, length):
+    """sha1 object over the first length bytes of a file, to be extended with the rows consumed next"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while length > 0:
+            block = f.read(min(length, CHUNK_SIZE))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest
+
+
+def _iter_row_blocks(f, end, chunk_size):
+    """Yield blocks of complete lines from the current position up to byte offset end"""
+    remainder = b''
+    while f.tell() < end:
+        block = remainder + f.read(min(chunk_size, end - f.tell()))
+        cut = block.rfind(b'\n') + 1
+        remainder = block[cut:]
+        if cut:
+            yield block[:cut]
+    # A trailing line without a newline may still be being written, leave it for the next run
+    f.seek(-len(remainder), os.SEEK_CUR)
+
+
+def _changes(block, header, date_format, last):
+    """Rows of one block with their daily change, continuing from the previous run's last row"""
+    df = pd.read_csv(io.BytesIO(block), names=header, dtype={DATE_COLUMN: "string"})
+    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format=date_format).dt.strftime("%Y-%m-%d")
+    if last is not None:
+        # Rows at or before the last logged timestamp were already processed
+        df = df[df[TIME_COLUMN] > last["timestamp"]]
+
+    values = df["Value"].astype("float64")
+    previous = values.shift(1)
+    if last is not None and len(values):
+        previous.iloc[0] = last["value"]
+    df[CHANGE_COLUMN] = values - previous
+    return df
+
+
+def update_changes(source=SOURCE, log=LOG, chunk_size=CHUNK_SIZE, date_format=DATASETS["address-count"]["date_format"]):
+    """Append daily changes for source rows added since the last run to log, returns the number of new rows"""
+    state_file = state_path(log)
+    state = _load_state(state_file)
+    source_size = os.path.getsize(source)
+
+    if (
+        state is None
+        or not os.path.exists(log)
+        or os.path.getsize(log) < state["log_size"]
+        or source_size < state["source_offset"]
+    ):
+        # First run, or the files were rewritten behind our back: rebuild from scratch
+        state = None
+
+    digest = None
+    if state is not None:
+        # A rewrite that keeps or grows the size only shows in the bytes already consumed
+        digest = _prefix_hash(source, state["source_offset"])
+        if digest.hexdigest() != state.get("source_sha1"):
+            state = None
+
+    with open(source, 'rb') as f:
+        header = f.readline().decode().strip().replace('"', '').split(',')
+        if state is not None:
+            if state["header"] != header:
+                state = None
+            else:
+                f.seek(state["source_offset"])
+        if state is None:
+            digest = _prefix_hash(source, f.tell())
+            last = None
+            with open(log + ".tmp", 'w', newline='') as out:
+                pd.DataFrame(columns=header + [CHANGE_COLUMN]).to_csv(out, index=False)
+            mode = 'new'
+        else:
+            last = state["last"]
+            # Undo the tail of an append that crashed before its state was saved
+            if os.path.getsize(log) > state["log_size"]:
+                with open(log, 'r+b') as out:
+                    out.truncate(state["log_size"])
+            open(log + ".tmp", 'w').close()
+            mode = 'append'
+
+        added = 0
+        with open(log + ".tmp", 'a', newline='') as out:
+            for block in _iter_row_blocks(f, source_size, chunk_size):
+                digest.update(block)
+                df = _changes(block, header, date_format, last)
+                if not len(df):
+                    continue
+                df.to_csv(out, index=False, header=False)
+                added += len(df)
+                last = {"timestamp": int(df[TIME_COLUMN].iloc[-1]), "value": float(df["Value"].iloc[-1])}
+        source_offset = f.tell()
+
+    if mode == 'new':
+        os.replace(log + ".tmp", log)
+    else:
+        # Append the new rows and fsync before the state moves forward
+        with open(log + ".tmp", 'rb') as new_rows, open(log, 'ab') as out:
+            shutil.copyfileobj(new_rows, out, chunk_size)
+            out.flush()
+            os.fsync(out.fileno())
+        os.remove(log + ".tmp")
+
+    _save_state(state_file, {
+        "header": header,
+        "source_offset": source_offset,
+        "source_sha1": digest.hexdigest(),
+        "log_size": os.path.getsize(log),
+        "last": last,
+    })
+    return added
+
+
+if __name__ == "__main__":
+    added = update_changes()
+    print(f"Appended {added} new daily change(s) to '{LOG}'")
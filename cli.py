@@ -0,0 +1,97 @@
+import argparse
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+# Subcommand -> (script module, description); a module is imported only when its command runs
+COMMANDS = {
+    "dashboard": ("main", "metrics dashboards (main.py)"),
+    "points": ("experiment", "experiment.json point cloud views (experiment.py)"),
+    "pointgen": ("pointgen", "synthetic point clouds for scale tests (pointgen.py)"),
+    "graph": ("kon", "transaction graph layout (kon.py)"),
+    "communities": ("gtVisualiser", "blockmodel communities of visGraph.dot (gtVisualiser.py)"),
+    "normalize": ("normalized", "normalize the metrics CSVs (normalized.py)"),
+    "preprocess": ("preprocess", "append and plot daily changes (preprocess.py)"),
+    "recommend": ("recommender", "build or query the contract recommender (recommender.py)"),
+    "similar": ("similar", "similar-contract search index (similar.py)"),
+    "ingest": ("ingest", "poll and log transactions (ingest.py)"),
+    "cluster": ("clustering", "k-means over logged transactions (clustering.py)"),
+    "rollup": ("rollup", "daily/weekly/monthly/yearly metric rollups (rollup.py)"),
+    "bench": ("bench", "data path benchmarks (bench.py)"),
+}
+
+# Libraries the dispatcher itself must never pull in
+HEAVY_MODULES = ("numpy", "pandas", "scipy", "matplotlib", "plotly", "graph_tool", "networkx")
+# Seconds `python cli.py --help` may take
+STARTUP_BUDGET = 0.3
+
+
+def run(command, args):
+    """Run a script module as __main__ with its own argv, as if started with `python <script>.py args`"""
+    module = COMMANDS[command][0]
+    sys.argv = [module + ".py", *args]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+def _seconds(code, repeats=3):
+    """Best wall time of a fresh interpreter running code"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                       check=True, capture_output=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def self_check(budget=STARTUP_BUDGET):
+    """Check the dispatcher starts within budget without heavy imports, returns True when it does"""
+    leaked = subprocess.run(
+        [sys.executable, "-c", f"import sys, cli; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    baseline = _seconds("pass")
+    startup = _seconds("import sys; sys.argv = ['cli.py', '--help']\ntry:\n import cli; cli.main()\nexcept SystemExit: pass")
+
+    print(f"{'interpreter':<14} {baseline * 1000:8.1f} ms")
+    print(f"{'cli --help':<14} {startup * 1000:8.1f} ms (budget {budget * 1000:.0f} ms)")
+    for command, (module, _) in COMMANDS.items():
+        try:
+            cost = _seconds(f"import {module}", repeats=1) - baseline
+            print(f"{command:<14} {cost * 1000:8.1f} ms to import {module}")
+        except subprocess.CalledProcessError:
+            print(f"{command:<14} {'-':>8}    {module} can't be imported here (missing dependency)")
+
+    ok = True
+    if leaked:
+        print(f"FAIL: importing cli loads {leaked}")
+        ok = False
+    if startup > budget:
+        print(f"FAIL: cli startup {startup * 1000:.1f} ms is over the {budget * 1000:.0f} ms budget")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ethereum analysis tools",
+        epilog="Arguments after the command go to its script, e.g. `cli.py graph --help`.",
+    )
+    parser.add_argument('command', choices=[*COMMANDS, "self-check"], metavar='command',
+                        help="; ".join(f"{name}: {text}" for name, (_, text) in COMMANDS.items())
+                             + "; self-check: startup time budget")
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.command == "self-check":
+        check = argparse.ArgumentParser(prog="cli.py self-check")
+        check.add_argument('--budget', type=float, default=STARTUP_BUDGET, help="seconds")
+        sys.exit(0 if self_check(check.parse_args(args.args).budget) else 1)
+    run(args.command, args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from ingest import DEFAULT_LOG_DIR, iter_transactions
+
+FEATURES = ("log value", "time of day", "log gas used")
+# Features are scaled into experiment.py's 0-1000 cube so the clusters plot directly
+SCALE = 1000.0
+BATCH_SIZE = 65_536
+
+
+def timestamp_seconds(value):
+    """Unix seconds from either a numeric string or an explorer ISO timestamp"""
+    if value is None:
+        return 0.0
+    text = str(value)
+    if text.isdigit():
+        return float(text)
+    return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+
+
+def features(transaction):
+    """market.cpp's (log(value + 1), timestamp % 100000) plus log(gasUsed + 1) as a third axis"""
+    value = float(transaction.get("value") or 0)
+    timestamp = timestamp_seconds(transaction.get("timeStamp", transaction.get("timestamp")))
+    gas = float(transaction.get("gasUsed") or 0)
+    return np.log1p(value), timestamp % 100000, np.log1p(gas)
+
+
+def _seconds(stamps):
+    """timestamp_seconds over a whole column: numeric strings and ...Z ISO timestamps, None as 0"""
+    text = np.asarray(["" if stamp is None else str(stamp) for stamp in stamps], dtype=str)
+    digits = np.char.isdigit(text)
+    iso = ~digits & (text != "")
+    seconds = np.zeros(len(text))
+    seconds[digits] = text[digits].astype(np.float64)
+    if iso.any():
+        stamps = np.char.rstrip(text[iso], "Z")
+        # numpy can't carry a UTC offset, leave those to timestamp_seconds
+        if ((np.char.find(stamps, "+", 10) >= 0) | (np.char.find(stamps, "-", 10) >= 0)).any():
+            raise ValueError("timestamp with a UTC offset")
+        seconds[iso] = stamps.astype("datetime64[us]").astype(np.int64) / 1e6
+    return seconds
+
+
+def feature_block(transactions):
+    """features() of a list of records as one (n, 3) float64 array, converted column by column
+
+    A block holding a malformed record falls back to features() per record,
+    dropping the ones that don't parse.
+    """
+    try:
+        value = np.array([t.get("value") or 0 for t in transactions], dtype=object).astype(np.float64)
+        gas = np.array([t.get("gasUsed") or 0 for t in transactions], dtype=object).astype(np.float64)
+        timestamp = _seconds([t.get("timeStamp", t.get("timestamp")) for t in transactions])
+        return np.column_stack((np.log1p(value), timestamp % 100000, np.log1p(gas)))
+    except (TypeError, ValueError):
+        rows = []
+        for transaction in transactions:
+            try:
+                rows.append(features(transaction))
+            except (TypeError, ValueError):
+                continue
+        return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES))
+
+
+def iter_feature_batches(directory=DEFAULT_LOG_DIR, batch_size=BATCH_SIZE):
+    """Stream (batch_size, 3) float64 feature blocks out of the ingest log"""
+    batch = []
+    for transaction in iter_transactions(directory):
+        batch.append(transaction)
+        if len(batch) == batch_size:
+            yield feature_block(batch)
+            batch = []
+    if batch:
+        yield feature_block(batch)
+
+
+def extract_features(directory=DEFAULT_LOG_DIR, points_path="clusters.npy", batch_size=BATCH_SIZE):
+    """Parse the ingest log once into scaled float32 points in a .npy file, returns (memory map, low, high)
+
+    Features go to a raw scratch file while the bounds are gathered, then get
+    scaled into the .npy that every epoch and the label pass read back.
+    """
+    low = np.full(len(FEATURES), np.inf)
+    high = np.full(len(FEATURES), -np.inf)
+    count = 0
+    with open(points_path + ".raw", 'wb') as raw:
+        for batch in iter_feature_batches(directory, batch_size):
+            if not len(batch):
+                continue
+            low = np.minimum(low, batch.min(axis=0))
+            high = np.maximum(high, batch.max(axis=0))
+            raw.write(batch.astype(np.float32).tobytes())
+            count += len(batch)
+
+    points = np.lib.format.open_memmap(points_path, mode='w+', dtype=np.float32, shape=(count, len(FEATURES)))
+    if count:
+        unscaled = np.memmap(points_path + ".raw", dtype=np.float32, mode='r', shape=(count, len(FEATURES)))
+        for start in range(0, count, batch_size):
+            points[start:start + batch_size] = scale(unscaled[start:start + batch_size], low, high)
+        del unscaled
+    points.flush()
+    os.remove(points_path + ".raw")
+    return np.load(points_path, mmap_mode='r'), low, high
+
+
+def scale(batch, low, high):
+    """Map features into [0, SCALE] per axis"""
+    return (batch - low) * (SCALE / np.where(high > low, high - low, 1))
+
+
+def kmeans_plus_plus(points, k, rng):
+    """k-means++ seeding, each new centre drawn with probability proportional to D^2"""
+    centroids = np.empty((k, points.shape[1]))
+    centroids[0] = points[rng.integers(len(points))]
+    closest = ((points - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        choice = rng.choice(len(points), p=closest / total) if total > 0 else rng.integers(len(points))
+        centroids[i] = points[choice]
+        np.minimum(closest, ((points - centroids[i]) ** 2).sum(axis=1), out=closest)
+    return centroids
+
+
+def assign(points, centroids, workers=None, block=16_384):
+    """Nearest centroid of every point as (labels, squared distances), blocks run on a thread pool
+
+    ||x||^2 - 2 x.c + ||c||^2 turns the search into one matrix product per block,
+    and BLAS releases the GIL so the blocks run on separate cores.
+    """
+    centre_norms = (centroids ** 2).sum(axis=1)
+
+    def nearest(start):
+        chunk = points[start:start + block]
+        d2 = (chunk ** 2).sum(axis=1)[:, None] - 2 * chunk @ centroids.T + centre_norms
+        labels = d2.argmin(axis=1)
+        return labels, np.maximum(d2[np.arange(len(chunk)), labels], 0)
+
+    starts = range(0, len(points), block)
+    if len(starts) <= 1:
+        return nearest(0)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(nearest, starts))
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+class MiniBatchKMeans:
+    """Mini-batch k-means (Sculley 2010) with per-centre 1/count learning rates"""
+
+    def __init__(self, k=7, seed=0, workers=None):
+        self.k = k
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.counts = np.zeros(k)
+
+    def partial_fit(self, batch):
+        """Update the centroids with one batch, seeding them from it with k-means++ the first time"""
+        if self.centroids is None:
+            if len(batch) < self.k:
+                raise ValueError(f"first batch has {len(batch)} points, need at least k={self.k}")
+            self.centroids = kmeans_plus_plus(batch, self.k, self.rng)
+
+        labels, _ = assign(batch, self.centroids, self.workers)
+        batch_counts = np.bincount(labels, minlength=self.k).astype(np.float64)
+        sums = np.stack([np.bincount(labels, weights=batch[:, axis], minlength=self.k)
+                         for axis in range(batch.shape[1])], axis=1)
+
+        # Each centre moves to the running mean of every point ever assigned to it
+        self.counts += batch_counts
+        moved = batch_counts > 0
+        self.centroids[moved] += (sums[moved] - batch_counts[moved, None] * self.centroids[moved]) \
+            / self.counts[moved, None]
+        return self
+
+    def predict(self, points):
+        return assign(points, self.centroids, self.workers)[0]
+
+    def inertia(self, points):
+        return assign(points, self.centroids, self.workers)[1].sum()
+
+
+def cluster_log(directory=DEFAULT_LOG_DIR, k=7, batch_size=BATCH_SIZE, epochs=3, seed=0, workers=None,
+                points_path="clusters.npy"):
+    """Fit on the ingest log, parsed once into points_path, returns (model, low, high, points)"""
+    points, low, high = extract_features(directory, points_path, batch_size)
+    if len(points) < k:
+        raise ValueError(f"{len(points)} transactions in {directory}, need at least k={k}")
+
+    model = MiniBatchKMeans(k, seed, workers)
+    for _ in range(epochs):
+        for start in range(0, len(points), batch_size):
+            model.partial_fit(np.asarray(points[start:start + batch_size], dtype=np.float64))
+    return model, low, high, points
+
+
+def write_assignments(model, points, batch_size=BATCH_SIZE, labels_path="cluster-labels.npy"):
+    """Cluster label of every point into a .npy file experiment.load_data can map"""
+    labels = np.lib.format.open_memmap(labels_path, mode='w+', dtype=np.int32, shape=(len(points),))
+    for start in range(0, len(points), batch_size):
+        labels[start:start + batch_size] = model.predict(np.asarray(points[start:start + batch_size], dtype=np.float64))
+    labels.flush()
+    return labels_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mini-batch k-means over logged transactions")
+    parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR)
+    parser.add_argument('-k', type=int, default=7, help="clusters (market.cpp uses 7)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--points', default="clusters.npy")
+    parser.add_argument('--labels', default="cluster-labels.npy")
+    parser.add_argument('--plot', action='store_true', help="show the clusters with experiment.visualize_3d_points")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model, low, high, points = cluster_log(args.log_dir, args.k, args.batch_size, args.epochs, args.seed,
+                                           args.workers, args.points)
+    write_assignments(model, points, args.batch_size, args.labels)
+    print(f"Clustered {len(points)} transactions into {args.k} clusters in {time.perf_counter() - start:.2f}s")
+
+    for i, centroid in enumerate(model.centroids / SCALE * (high - low) + low):
+        print(f"Centroid {i}: ({', '.join(f'{name} {v:.2f}' for name, v in zip(FEATURES, centroid))})")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        from experiment import load_data, visualize_3d_points
+
+        visualize_3d_points(load_data(args.points), labels=np.load(args.labels, mmap_mode='r'))
+        plt.show()
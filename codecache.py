@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from address import format_hex, parse
+from asynchttp import HTTPPool
+
+# Same default endpoint viem's mainnet chain uses in market/recommend.ts
+DEFAULT_RPC_URL = os.environ.get("ETH_RPC_URL", "https://eth.merkle.io")
+DEFAULT_DB = "market/codecache.sqlite"
+LEGACY_CACHE = "market/recommend.cache"
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_PARAMS = 900
+
+
+def address_keys(addresses):
+    """20-byte keys for hex addresses, None for placeholders ("0x", "0x0") and malformed ones, parsed in one batch"""
+    raw, valid = parse(addresses, strict=False)
+    return [row.tobytes() if ok else None for row, ok in zip(raw, valid)]
+
+
+class CodeCache:
+    """Contract/EOA classification with an LRU tier in front of a SQLite store
+
+    Both tiers key on the raw 20-byte address (a BLOB column in SQLite), hex only
+    exists at the edges: classify() input and the JSON-RPC calls.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, rpc_url=DEFAULT_RPC_URL, lru_size=1_000_000,
+                 batch_size=100, concurrency=8):
+        self.rpc_url = rpc_url
+        self.lru_size = lru_size
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._lru = OrderedDict()
+
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self._migrate_text_keys()
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS code_exists ("
+            "address BLOB PRIMARY KEY, has_code INTEGER NOT NULL) WITHOUT ROWID"
+        )
+
+    def _migrate_text_keys(self):
+        """Convert a store written with lowercase hex TEXT keys to 20-byte BLOB keys, once"""
+        columns = self.db.execute("PRAGMA table_info(code_exists)").fetchall()
+        if not any(name == "address" and kind.upper() == "TEXT" for _, name, kind, *_ in columns):
+            return
+        rows = self.db.execute("SELECT address, has_code FROM code_exists").fetchall()
+        keys = address_keys([address for address, _ in rows])
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE code_exists_blob (address BLOB PRIMARY KEY, has_code INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO code_exists_blob (address, has_code) VALUES (?, ?)",
+                [(key, has_code) for key, (_, has_code) in zip(keys, rows) if key is not None],
+            )
+            self.db.execute("DROP TABLE code_exists")
+            self.db.execute("ALTER TABLE code_exists_blob RENAME TO code_exists")
+        print(f"Migrated {len(rows)} cached addresses to 20-byte keys")
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM code_exists").fetchone()[0]
+
+    def _remember(self, address, has_code):
+        self._lru[address] = has_code
+        self._lru.move_to_end(address)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, addresses):
+        """Cached classifications for 20-byte address keys, misses are left out"""
+        found = {}
+        missing = []
+        for address in addresses:
+            has_code = self._lru.get(address)
+            if has_code is None:
+                missing.append(address)
+            else:
+                self._lru.move_to_end(address)
+                found[address] = has_code
+
+        for start in range(0, len(missing), SQLITE_MAX_PARAMS):
+            chunk = missing[start:start + SQLITE_MAX_PARAMS]
+            rows = self.db.execute(
+                f"SELECT address, has_code FROM code_exists WHERE address IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for address, has_code in rows:
+                found[address] = bool(has_code)
+                self._remember(address, bool(has_code))
+        return found
+
+    def put_many(self, classifications):
+        """Store {20-byte key: has_code} in both tiers in one transaction"""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO code_exists (address, has_code) VALUES (?, ?)",
+                [(address, int(has_code)) for address, has_code in classifications.items()],
+            )
+        for address, has_code in classifications.items():
+            self._remember(address, has_code)
+
+    def import_json_cache(self, file_path=LEGACY_CACHE):
+        """Import market/recommend.cache ({"codeExists": {address: bool}}), returns the entry count"""
+        with open(file_path, 'r') as f:
+            content = f.read()
+        if not content.strip():
+            return 0
+        entries = json.loads(content).get("codeExists", {})
+        classifications = {
+            key: bool(has_code) for key, has_code in zip(address_keys(list(entries)), entries.values())
+            if key is not None
+        }
+        self.put_many(classifications)
+        return len(classifications)
+
+    async def _fetch_batch(self, pool, addresses):
+        """One JSON-RPC batch of eth_getCode calls for 20-byte keys, failed lookups are omitted"""
+        hexes = format_hex(np.frombuffer(b"".join(addresses), dtype=np.uint8).reshape(-1, 20))
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": "eth_getCode", "params": [address, "latest"]}
+            for i, address in enumerate(hexes.tolist())
+        ]
+        try:
+            response = await pool.post_json(self.rpc_url, payload)
+        except Exception as e:
+            print(f"eth_getCode batch of {len(addresses)} failed: {e}")
+            return {}
+        if isinstance(response, dict):
+            response = [response]
+
+        results = {}
+        for item in response:
+            code = item.get("result")
+            if isinstance(code, str) and isinstance(item.get("id"), int) and item["id"] < len(addresses):
+                results[addresses[item["id"]]] = code not in ("0x", "0x0", "")
+        return results
+
+    async def classify(self, addresses):
+        """Classify addresses as contracts (True) or EOAs (False), looking up misses concurrently
+
+        Addresses that couldn't be resolved (a failed lookup or a malformed
+        address) come back as None rather than as EOAs.
+        """
+        normalized = dict(zip(addresses, address_keys(addresses)))
+        wanted = list({a for a in normalized.values() if a is not None})
+        known = self.get_many(wanted)
+
+        missing = [a for a in wanted if a not in known]
+        if missing:
+            async with HTTPPool(max_connections=self.concurrency) as pool:
+                batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+                fetched = {}
+                for result in await asyncio.gather(*(self._fetch_batch(pool, b) for b in batches)):
+                    fetched.update(result)
+            # Failed lookups aren't persisted so a flaky endpoint doesn't poison the store
+            self.put_many(fetched)
+            known.update(fetched)
+
+        return {a: known.get(n) if n is not None else None for a, n in normalized.items()}
+
+    def classify_sync(self, addresses):
+        """Blocking wrapper around classify()"""
+        return asyncio.run(self.classify(addresses))
+
+
+def serve_stub(port=8545, contracts=()):
+    """Local JSON-RPC stub answering eth_getCode, for exercising the cache without a node"""
+    contracts = {a.lower() for a in contracts}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            calls = request if isinstance(request, list) else [request]
+            replies = [
+                {"jsonrpc": "2.0", "id": c["id"], "result": "0x6080" if c["params"][0].lower() in contracts else "0x"}
+                for c in calls
+            ]
+            body = json.dumps(replies if isinstance(request, list) else replies[0]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contract/EOA code-existence cache")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    parser.add_argument('--rpc', default=DEFAULT_RPC_URL)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    imp = sub.add_parser('import', help="import a recommend.cache JSON file")
+    imp.add_argument('path', nargs='?', default=LEGACY_CACHE)
+
+    cls = sub.add_parser('classify', help="classify addresses, looking up misses over JSON-RPC")
+    cls.add_argument('addresses', nargs='*')
+    cls.add_argument('--file', help="file with one address per line")
+    cls.add_argument('--batch-size', type=int, default=100)
+    cls.add_argument('--concurrency', type=int, default=8)
+
+    stub = sub.add_parser('stub', help="run a local eth_getCode stub server")
+    stub.add_argument('--port', type=int, default=8545)
+    stub.add_argument('--contracts', help="file with one contract address per line")
+
+    args = parser.parse_args()
+
+    if args.command == 'stub':
+        contracts = []
+        if args.contracts:
+            with open(args.contracts) as f:
+                contracts = [line.strip() for line in f if line.strip()]
+        server = serve_stub(args.port, contracts)
+        print(f"Stub JSON-RPC listening on http://127.0.0.1:{args.port} ({len(contracts)} contracts)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == 'import':
+        cache = CodeCache(args.db, args.rpc)
+        count = cache.import_json_cache(args.path)
+        print(f"Imported {count} entries from {args.path} into {args.db}")
+    else:
+        cache = CodeCache(args.db, args.rpc, batch_size=args.batch_size, concurrency=args.concurrency)
+        addresses = list(args.addresses)
+        if args.file:
+            with open(args.file) as f:
+                addresses += [line.strip() for line in f if line.strip()]
+        start = time.perf_counter()
+        results = cache.classify_sync(addresses)
+        elapsed = time.perf_counter() - start
+        for address, has_code in results.items():
+            print(f"{address} {'unknown' if has_code is None else 'contract' if has_code else 'eoa'}")
+        unresolved = sum(has_code is None for has_code in results.values())
+        print(f"Classified {len(results) - unresolved} addresses in {elapsed:.3f}s, {unresolved} unresolved")
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from metrics import DATE_COLUMN, SEPARATOR, TIME_COLUMN, MetricsStore
+from tracing import span
+
+
+class Derived:
+    """A metric computed from other metrics (base "<dataset>/<column>" series or other derived ones)"""
+
+    def __init__(self, inputs, fn):
+        self.inputs = inputs
+        self.fn = fn
+
+    def definition(self):
+        """Changes whenever the inputs or the function body do, so edited formulas are recomputed"""
+        code = self.fn.__code__
+        return repr((self.inputs, code.co_code, code.co_consts, code.co_names))
+
+
+def _ratio(numerator, denominator):
+    # Aligned on timestamp, days missing from either side stay empty
+    numerator, denominator = numerator.align(denominator, join="inner")
+    return (numerator / denominator.where(denominator != 0)).astype("float64")
+
+
+# Derived series, named "<dataset>/<column>" like the base series so sections can ask for them by column
+DERIVED = {
+    "address-count/Daily Change": Derived(["address-count/Value"], lambda value: value.diff()),
+    "deployed-contracts/Total Count": Derived(
+        ["deployed-contracts/No. of Deployed Contracts"], lambda daily: daily.fillna(0).cumsum()),
+    "token-txns/Total txns": Derived(["token-txns/Transactions"], lambda daily: daily.fillna(0).cumsum()),
+    "tx-growth/Total txns": Derived(["tx-growth/Transactions"], lambda daily: daily.fillna(0).cumsum()),
+    "tx-growth/Transactions per active address": Derived(
+        ["tx-growth/Transactions", "active-addresses/Unique Address Total Count"], _ratio),
+    "token-txns/Token share of transactions": Derived(["token-txns/Transactions", "tx-growth/Transactions"], _ratio),
+}
+
+
+class DerivedMetrics:
+    """Lazy DAG of derived series over a MetricsStore, memoised in memory and on disk by input version
+
+    A base series' version is its dataset's content hash; a derived series' version
+    hashes its definition with its inputs' versions. Only series whose version
+    changed since the last run are recomputed, everything else is read back.
+    """
+
+    def __init__(self, store=None, metrics=DERIVED, cache_dir=".cache"):
+        self.store = store or MetricsStore()
+        self.metrics = metrics
+        self.cache_path = os.path.join(self.store.root, cache_dir, "derived.parquet")
+        self.manifest_path = os.path.join(self.store.root, cache_dir, "derived.json")
+        self._versions = {}
+        self._memo = {}
+        self._disk = None
+
+    def load(self):
+        return self.store.load()
+
+    def version(self, name):
+        if name not in self._versions:
+            if name in self.metrics:
+                digest = hashlib.sha1(self.metrics[name].definition().encode())
+                for dependency in self.metrics[name].inputs:
+                    digest.update(self.version(dependency).encode())
+                self._versions[name] = digest.hexdigest()
+            else:
+                self._versions[name] = self.store.versions()[name.split(SEPARATOR)[0]]
+        return self._versions[name]
+
+    def _read_disk(self):
+        if self._disk is None:
+            self._disk = ({}, None)
+            if os.path.exists(self.cache_path) and os.path.exists(self.manifest_path):
+                try:
+                    with open(self.manifest_path, 'r') as f:
+                        manifest = json.load(f)
+                    self._disk = (manifest, pd.read_parquet(self.cache_path))
+                except (ImportError, ValueError, OSError) as e:
+                    print(f"Ignoring derived metrics cache: {e}")
+        return self._disk
+
+    def get(self, name):
+        """One series indexed by UnixTimeStamp, computed only if its version isn't memoised"""
+        version = self.version(name)
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == version:
+            return memo[1]
+
+        if name not in self.metrics:
+            wide = self.load()
+            if name not in wide.columns:
+                raise KeyError(f"unknown metric {name!r}")
+            series = wide[name].dropna()
+        else:
+            manifest, cached = self._read_disk()
+            if manifest.get(name) == version and name in cached.columns:
+                series = cached[name].dropna()
+            else:
+                with span("derive", metric=name):
+                    series = self.metrics[name].fn(*(self.get(i) for i in self.metrics[name].inputs))
+                self._save(name, version, series)
+        self._memo[name] = (version, series)
+        return series
+
+    def _save(self, name, version, series):
+        manifest, cached = self._read_disk()
+        column = series.rename(name).astype("float64")
+        if cached is None:
+            cached = column.to_frame()
+        else:
+            cached = cached.drop(columns=[name], errors="ignore").join(column, how="outer")
+        manifest = {**manifest, name: version}
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        try:
+            cached.to_parquet(self.cache_path + ".tmp")
+        except ImportError:
+            self._disk = (manifest, cached)
+            return
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+        with open(self.manifest_path + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        self._disk = (manifest, cached)
+
+    def frame(self, name, derived=()):
+        """MetricsStore.frame(name) plus the requested derived columns of that dataset"""
+        df = self.store.frame(name)
+        for column in derived:
+            series = self.get(name + SEPARATOR + column)
+            df[column] = series.reindex(df[TIME_COLUMN].to_numpy()).to_numpy()
+        return df
+
+    def series_frame(self, names):
+        """Any mix of base and derived series side by side, with Date(UTC) like MetricsStore.frame"""
+        df = pd.concat([self.get(name).rename(name) for name in names], axis=1).sort_index().reset_index()
+        df.insert(0, DATE_COLUMN, pd.to_datetime(df[TIME_COLUMN], unit="s"))
+        return df
+
+
+if __name__ == "__main__":
+    metrics = DerivedMetrics()
+    print(metrics.series_frame(list(DERIVED)).tail())
@@ -1,104 +1,207 @@
-import json
+import os
+import shutil
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-import re
-from matplotlib import cm
+import argparse
 import random
+import tracing
+from pointcloud import PointCloud
+from pointgen import EXTENT
+from spatial import OUTLIER_THRESHOLD
+from tracing import span, traced
 
-def load_data(file_path):
-    """Load the experiment data from JSON file"""
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-            return data['data']
-    except json.JSONDecodeError:
-        # Fix common JSON syntax errors like trailing commas
-        print("JSON decode error found. Attempting to fix common issues...")
-        with open(file_path, 'r') as f:
-            content = f.read()
-            
-        # Remove trailing commas in arrays/objects
-        fixed_content = re.sub(r',\s*([}\]])', r'\1', content)
-        
-        # Try parsing the fixed content
-        try:
-            data = json.loads(fixed_content)
-            print("Successfully fixed and loaded JSON")
-            return data['data']
-        except json.JSONDecodeError as e:
-            print(f"Still couldn't parse JSON: {e}")
-            # Alternative: create a C++ program to parse the file more robustly
-            print("Attempting to load using vector format...")
-            points = []
-            # Simple parsing to extract coordinate triplets
-            triplet_pattern = re.compile(r'\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]')
-            matches = triplet_pattern.findall(content)
-            for match in matches:
-                x, y, z = map(int, match)
-                points.append([x, y, z])
-            
-            print(f"Loaded {len(points)} points using regex parsing")
-            return points
+# Bytes read per step when streaming experiment.json
+CHUNK_SIZE = 1 << 22
+
+# JSON punctuation becomes whitespace, so brackets and the trailing commas
+# experiment.cpp leaves behind never reach the number parser
+_SEPARATOR_CHARS = b'[]{},:\r\n\t'
+_SEPARATORS = bytes.maketrans(_SEPARATOR_CHARS, b' ' * len(_SEPARATOR_CHARS))
+
+def iter_point_chunks(file_path, chunk_size=CHUNK_SIZE):
+    """Stream (k, 3) int32 blocks of points out of an experiment.json file"""
+    pending = np.empty(0, dtype=np.int64)
+    carry = b''
+    started = False
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = carry + chunk
+            if not started:
+                # Skip the {"data": prefix so the key never looks like a value
+                if b'[' not in chunk:
+                    carry = chunk
+                    continue
+                key = chunk.find(b'"data"')
+                if key >= 0:
+                    chunk = chunk[key + len(b'"data"'):]
+                started = True
+
+            # Hold back a number that may continue in the next chunk
+            cut = len(chunk)
+            while cut > 0 and chunk[cut - 1] in b'-0123456789':
+                cut -= 1
+            carry = chunk[cut:]
+
+            tokens = chunk[:cut].translate(_SEPARATORS).split()
+            if not tokens:
+                continue
+            values = np.concatenate((pending, np.array(tokens).astype(np.int64)))
+            usable = len(values) - len(values) % 3
+            pending = values[usable:]
+            if usable:
+                yield values[:usable].reshape(-1, 3).astype(np.int32)
+
+    if carry.strip():
+        values = np.concatenate((pending, [int(carry)]))
+        pending = values[len(values) - len(values) % 3:]
+        if len(values) >= 3:
+            yield values[:len(values) - len(pending)].reshape(-1, 3).astype(np.int32)
+    if len(pending):
+        print(f"Ignoring {len(pending)} trailing values that don't form a full point")
+
+def sidecar_path(file_path):
+    """Binary cache written next to a point file"""
+    return file_path + '.npy'
+
+def _write_npy(path, blocks):
+    """Write (k, 3) int32 blocks to a .npy file without holding them all in memory"""
+    tmp = path + '.tmp'
+    count = 0
+    with open(tmp + '.raw', 'wb') as raw:
+        for block in blocks:
+            raw.write(np.ascontiguousarray(block, dtype='<i4').tobytes())
+            count += len(block)
+    with open(tmp, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, {'descr': '<i4', 'fortran_order': False, 'shape': (count, 3)})
+        with open(tmp + '.raw', 'rb') as raw:
+            shutil.copyfileobj(raw, f, CHUNK_SIZE)
+    os.remove(tmp + '.raw')
+    os.replace(tmp, path)
+    return count
+
+@traced()
+def load_data(file_path, use_sidecar=True, chunk_size=CHUNK_SIZE):
+    """Load the experiment points as an N x 3 int32 array, memory-mapped from the .npy sidecar when fresh"""
+    if file_path.endswith('.npy'):
+        return np.load(file_path, mmap_mode='r')
 
-def visualize_3d_points(points):
-    """Create a 3D scatter plot visualization of points with gradient coloring"""
+    sidecar = sidecar_path(file_path)
+    if use_sidecar and os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns >= os.stat(file_path).st_mtime_ns:
+        return np.load(sidecar, mmap_mode='r')
+
+    if use_sidecar:
+        with span("parse json and write sidecar", path=file_path):
+            count = _write_npy(sidecar, iter_point_chunks(file_path, chunk_size))
+        print(f"Parsed {count} points, cached in {sidecar}")
+        return np.load(sidecar, mmap_mode='r')
+
+    # No sidecar: grow one N x 3 buffer chunk by chunk
+    points = np.empty((max(os.path.getsize(file_path) // 16, 1), 3), dtype=np.int32)
+    count = 0
+    with span("parse json", path=file_path):
+        for block in iter_point_chunks(file_path, chunk_size):
+            if count + len(block) > len(points):
+                points = np.resize(points, (max(2 * len(points), count + len(block)), 3))
+            points[count:count + len(block)] = block
+            count += len(block)
+    return points[:count]
+
+def as_point_cloud(points):
+    """Wrap raw points in a PointCloud, passing existing clouds through so their caches are shared"""
+    return points if isinstance(points, PointCloud) else PointCloud(points)
+
+# Points handed to matplotlib per view, beyond this the scatter is decimated
+POINT_BUDGET_3D = 50_000
+POINT_BUDGET_2D = 200_000
+
+def select_outer(outer_indices, fraction):
+    """Random subset of the outer points, seeded from the random module so random.seed() still applies"""
+    rng = np.random.default_rng(random.getrandbits(32))
+    k = int(len(outer_indices) * fraction)
+    return np.sort(rng.choice(outer_indices, size=k, replace=False))
+
+@traced()
+def visualize_3d_points(points, budget=POINT_BUDGET_3D, labels=None):
+    """Create a 3D scatter plot visualization of points with gradient coloring, or colored by cluster labels"""
+    # matplotlib is only imported when something is drawn, loading points doesn't pay for it
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D
+    from matplotlib import cm
     fig = plt.figure(figsize=(12, 10))
     ax = fig.add_subplot(111, projection='3d')
     
-    # Extract x, y, z coordinates
-    x = np.array([point[0] for point in points])
-    y = np.array([point[1] for point in points])
-    z = np.array([point[2] for point in points])
+    cloud = as_point_cloud(points)
+    x, y, z = cloud.x, cloud.y, cloud.z
     
     # Calculate the centroid (actual center of the data points)
-    center_x = np.mean(x)
-    center_y = np.mean(y)
-    center_z = np.mean(z)
+    center_x, center_y, center_z = cloud.centroid(3)
     
     print(f"Calculated data centroid: ({center_x:.2f}, {center_y:.2f}, {center_z:.2f})")
     
-    # Calculate distances from center
-    distances = np.sqrt((x-center_x)**2 + (y-center_y)**2 + (z-center_z)**2)
-    max_distance = np.max(distances)
-    
-    # Calculate relative distances (as percentage of max distance)
-    relative_distances = distances / max_distance
+    # Distances from center, shared with any other view of the same cloud
+    distances = cloud.distances(3)
     
     # Create two sets of points: 
     # 1. Core points (less than 70% distance from center)
     # 2. Outer points (70% or greater distance from center) - only show 50% of these
     
-    core_indices = np.where(relative_distances < 0.7)[0]
-    outer_indices = np.where(relative_distances >= 0.7)[0]
-    
-    # Randomly select 50% of the outer points
-    selected_outer_indices = random.sample(list(outer_indices), k=len(outer_indices) // 3)
-    
-    print(f"Total points: {len(points)}")
-    print(f"All contracts (inner radius): {len(core_indices)}")
-    print(f"Most interacted L labelled (inner to outer radius): {len(outer_indices)}")
+    with span("split", dims=3):
+        core_indices, outer_indices = cloud.split(0.7, dims=3)
+    
+    # Randomly select 50% of the outer points, cluster views keep every point of every cluster
+    selected_outer_indices = select_outer(outer_indices, 1 / 3) if labels is None else outer_indices
+    
+    # Level of detail: keep what matplotlib draws within budget
+    with span("decimate", dims=3):
+        core_shown, outer_shown = cloud.decimate_groups([core_indices, selected_outer_indices], budget, dims=3)
+    
+    print(f"Total points: {len(cloud)}")
+    if labels is None:
+        print(f"All contracts (inner radius): {len(core_indices)}")
+        print(f"Most interacted L labelled (inner to outer radius): {len(outer_indices)}")
+    else:
+        labels = np.asarray(labels)
+        cluster_ids, cluster_sizes = np.unique(labels, return_counts=True)
+        print(f"Clusters: {', '.join(f'{i}: {count}' for i, count in zip(cluster_ids, cluster_sizes))}")
+    print(f"Rendering {len(core_shown) + len(outer_shown)} points (budget {budget})")
     # print(f"Selected outer points (50% of outer): {len(selected_outer_indices)}")
     
     # Plot core points with gradient coloring
-    if len(core_indices) > 0:
-        core_colors = distances[core_indices]
-        scatter_core = ax.scatter(
-            x[core_indices], y[core_indices], z[core_indices],
-            c=core_colors, cmap=cm.viridis, marker='o', alpha=0.8, s=10
-        )
+    if len(core_shown) > 0:
+        if labels is None:
+            core_colors = distances[core_shown]
+            scatter_core = ax.scatter(
+                x[core_shown], y[core_shown], z[core_shown],
+                c=core_colors, cmap=cm.viridis, marker='o', alpha=0.8, s=10
+            )
+        else:
+            scatter_core = ax.scatter(
+                x[core_shown], y[core_shown], z[core_shown],
+                c=labels[core_shown] % 10, cmap=cm.tab10, vmin=0, vmax=9, marker='o', alpha=0.8, s=10
+            )
         
-    # Plot selected outer points in red
-    if len(selected_outer_indices) > 0:
-        scatter_outer = ax.scatter(
-            x[selected_outer_indices], y[selected_outer_indices], z[selected_outer_indices],
-            c='red', marker='o', alpha=0.8, s=10
-        )
+    # Plot selected outer points in red (or in their cluster color)
+    if len(outer_shown) > 0:
+        if labels is None:
+            scatter_outer = ax.scatter(
+                x[outer_shown], y[outer_shown], z[outer_shown],
+                c='red', marker='o', alpha=0.8, s=10
+            )
+        else:
+            scatter_outer = ax.scatter(
+                x[outer_shown], y[outer_shown], z[outer_shown],
+                c=labels[outer_shown] % 10, cmap=cm.tab10, vmin=0, vmax=9, marker='o', alpha=0.8, s=10
+            )
     
     # Add a color bar for the core points
-    if len(core_indices) > 0:
+    if len(core_shown) > 0:
         cbar = plt.colorbar(scatter_core, ax=ax, shrink=0.6, aspect=20)
-        cbar.set_label(f'Distance from data centroid ({center_x:.2f}, {center_y:.2f}, {center_z:.2f})')
+        if labels is None:
+            cbar.set_label(f'Distance from data centroid ({center_x:.2f}, {center_y:.2f}, {center_z:.2f})')
+        else:
+            cbar.set_label('Cluster')
     
     # Set labels and title
     ax.set_xlabel('X Axis', fontsize=12)
@@ -106,21 +209,23 @@ def visualize_3d_points(points):
     ax.set_zlabel('Z Axis', fontsize=12)
     # ax.set_title('3D Visualization of Experiment Data Points', fontsize=14)
     
-    # Set consistent axis limits to show the scale of the 1000x1000x1000 space
-    ax.set_xlim(0, 1000)
-    ax.set_ylim(0, 1000)
-    ax.set_zlim(0, 1000)
+    # Set consistent axis limits to show the scale of the EXTENT^3 space the points live in
+    ax.set_xlim(0, EXTENT)
+    ax.set_ylim(0, EXTENT)
+    ax.set_zlim(0, EXTENT)
     
     # Calculate and display point statistics
-    total_points = len(points)
-    shown_points = len(core_indices) + len(selected_outer_indices)
-    volume = 1000 * 1000 * 1000
+    total_points = len(cloud)
+    shown_points = len(core_shown) + len(outer_shown)
+    volume = EXTENT ** 3
     density = total_points / volume
     
     info_text = (
         f'Total points: {total_points} (Density: {density:.8f})\n'
         f'Shown points: {shown_points} ({shown_points/total_points*100:.1f}% of total)\n'
-        f'Red points: {len(selected_outer_indices)} (≥70% distance from center)'
+    ) + (
+        f'Red points: {len(outer_shown)} (≥70% distance from center)' if labels is None
+        else f'Clusters: {len(cluster_ids)}'
     )
     plt.figtext(0.02, 0.02, info_text)
     
@@ -132,94 +237,105 @@ def visualize_3d_points(points):
     
     # Add a legend
     from matplotlib.lines import Line2D
-    legend_elements = [
-        Line2D([0], [0], marker='o', color='w', markerfacecolor=cm.viridis(0.5), 
-               label='All contracts (inner radius)', markersize=8),
-        Line2D([0], [0], marker='o', color='w', markerfacecolor='red', 
-               label='Labelled L (most interacted label) (inner to outer radius)', markersize=8),
+    if labels is None:
+        legend_elements = [
+            Line2D([0], [0], marker='o', color='w', markerfacecolor=cm.viridis(0.5), 
+                   label='All contracts (inner radius)', markersize=8),
+            Line2D([0], [0], marker='o', color='w', markerfacecolor='red', 
+                   label='Labelled L (most interacted label) (inner to outer radius)', markersize=8),
+        ]
+    else:
+        legend_elements = [
+            Line2D([0], [0], marker='o', color='w', markerfacecolor=cm.tab10(int(i) % 10),
+                   label=f'Cluster {i} ({count} points)', markersize=8)
+            for i, count in zip(cluster_ids, cluster_sizes)
+        ]
+    legend_elements.append(
         Line2D([0], [0], marker='*', color='w', markerfacecolor='yellow', 
                label='Centroid', markersize=12, markeredgecolor='black')
-    ]
+    )
     ax.legend(handles=legend_elements, loc='upper right')
     
     return fig, ax
 
-def visualize_2d_points(points):
+@traced()
+def visualize_2d_points(points, budget=POINT_BUDGET_2D):
     """Create a 2D scatter plot visualization of points using only X and Y coordinates"""
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
     fig = plt.figure(figsize=(14, 8))
     ax = fig.add_subplot(111)
     
-    # Extract x, y coordinates
-    x = np.array([point[0] for point in points])
-    y = np.array([point[1] for point in points])
+    cloud = as_point_cloud(points)
+    x, y = cloud.x, cloud.y
     
     # Calculate the centroid (actual center of the X,Y data points)
-    center_x = np.mean(x)
-    center_y = np.mean(y)
+    center_x, center_y = cloud.centroid(2)
     
     print(f"Calculated 2D data centroid: ({center_x:.2f}, {center_y:.2f})")
     
-    # Calculate distances from center
-    distances = np.sqrt((x-center_x)**2 + (y-center_y)**2)
-    max_distance = np.max(distances)
-    
-    # Calculate relative distances (as percentage of max distance)
-    relative_distances = distances / max_distance
+    # Distances from center in the X-Y plane
+    distances = cloud.distances(2)
     
     # Create two sets of points: 
     # 1. Core points (less than 70% distance from center)
     # 2. Outer points (70% or greater distance from center) - only show 50% of these
     
-    core_indices = np.where(relative_distances < 0.7)[0]
-    outer_indices = np.where(relative_distances >= 0.7)[0]
+    with span("split", dims=2):
+        core_indices, outer_indices = cloud.split(0.7, dims=2)
     
     # Randomly select 50% of the outer points
-    selected_outer_indices = random.sample(list(outer_indices), k=len(outer_indices) // 2)
+    selected_outer_indices = select_outer(outer_indices, 1 / 2)
     
-    print(f"2D Analysis - Total points: {len(points)}")
+    # Level of detail: keep what matplotlib draws within budget
+    with span("decimate", dims=2):
+        core_shown, outer_shown = cloud.decimate_groups([core_indices, selected_outer_indices], budget, dims=2)
+    
+    print(f"2D Analysis - Total points: {len(cloud)}")
     print(f"2D Core points (<70% distance): {len(core_indices)}")
     print(f"2D Outer points (≥70% distance): {len(outer_indices)}")
     print(f"2D Selected outer points (50% of outer): {len(selected_outer_indices)}")
+    print(f"2D Rendering {len(core_shown) + len(outer_shown)} points (budget {budget})")
     
     # Plot core points with gradient coloring
-    if len(core_indices) > 0:
-        core_colors = distances[core_indices]
+    if len(core_shown) > 0:
+        core_colors = distances[core_shown]
         scatter_core = ax.scatter(
-            x[core_indices], y[core_indices],
+            x[core_shown], y[core_shown],
             c=core_colors, cmap=cm.viridis, marker='o', alpha=0.8, s=20
         )
         
     # Plot selected outer points in red
-    if len(selected_outer_indices) > 0:
+    if len(outer_shown) > 0:
         scatter_outer = ax.scatter(
-            x[selected_outer_indices], y[selected_outer_indices],
+            x[outer_shown], y[outer_shown],
             c='red', marker='o', alpha=0.8, s=20
         )
     
     # Add a color bar for the core points
-    if len(core_indices) > 0:
+    if len(core_shown) > 0:
         cbar = plt.colorbar(scatter_core, ax=ax, shrink=0.6, aspect=20)
         cbar.set_label(f'Distance from data centroid ({center_x:.2f}, {center_y:.2f})')
     
     # Set labels and title
-    ax.set_xlabel('X Axis (0-5000)', fontsize=12)
-    ax.set_ylabel('Y Axis (0-5000)', fontsize=12)
+    ax.set_xlabel(f'X Axis (0-{EXTENT})', fontsize=12)
+    ax.set_ylabel(f'Y Axis (0-{EXTENT})', fontsize=12)
     ax.set_title('2D Visualization of Experiment Data Points (X-Y Plane)', fontsize=14)
     
-    # Set consistent axis limits to show the scale as 5000x5000 space
-    ax.set_xlim(0, 5000)
-    ax.set_ylim(0, 5000)
+    # Same extent as the 3D view, the space experiment.cpp and pointgen.py write into
+    ax.set_xlim(0, EXTENT)
+    ax.set_ylim(0, EXTENT)
     
     # Calculate and display point statistics
-    total_points = len(points)
-    shown_points = len(core_indices) + len(selected_outer_indices)
-    area = 5000 * 5000
+    total_points = len(cloud)
+    shown_points = len(core_shown) + len(outer_shown)
+    area = EXTENT ** 2
     density = total_points / area
     
     info_text = (
         f'Total points: {total_points} (2D Density: {density:.8f})\n'
         f'Shown points: {shown_points} ({shown_points/total_points*100:.1f}% of total)\n'
-        f'Red points: {len(selected_outer_indices)} (≥70% distance from center)'
+        f'Red points: {len(outer_shown)} (≥70% distance from center)'
     )
     plt.figtext(0.02, 0.02, info_text)
     
@@ -244,27 +360,40 @@ def visualize_2d_points(points):
     return fig, ax
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Visualize experiment.json")
+    parser.add_argument('path', nargs='?', default='experiment.json', help="experiment.json or a pointgen.py .npy file")
+    parser.add_argument('--outliers', action='store_true',
+                        help="also count k-NN density outliers over the full cloud (slow on millions of points)")
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    tracing.configure(args.trace)
+
     # Set random seed for reproducibility
     random.seed(42)
     
     # Load the data
-    points = load_data('experiment.json')
-    print(f"Loaded {len(points)} points from experiment.json")
+    points = load_data(args.path)
+    print(f"Loaded {len(points)} points from {args.path}")
+    
+    # One columnar cloud shared by the bounds pass and both visualizations
+    cloud = PointCloud(points)
     
     # Calculate bounds of the data
-    x_min = min(point[0] for point in points)
-    x_max = max(point[0] for point in points)
-    y_min = min(point[1] for point in points)
-    y_max = max(point[1] for point in points)
-    z_min = min(point[2] for point in points)
-    z_max = max(point[2] for point in points)
+    (x_min, y_min, z_min), (x_max, y_max, z_max) = cloud.bounds
     
     print(f"Data bounds: X: {x_min}-{x_max}, Y: {y_min}-{y_max}, Z: {z_min}-{z_max}")
     
+    # Local-density outliers (k-NN based) alongside the centroid-distance split, only on request
+    if args.outliers:
+        with span("density outliers"):
+            density_outliers = cloud.density_outliers(k=8, threshold=OUTLIER_THRESHOLD)
+        print(f"Density outliers (< {OUTLIER_THRESHOLD} points/unit^3 around 8 nearest neighbours): {len(density_outliers)}")
+    
     # Create both visualizations
-    fig_3d, ax_3d = visualize_3d_points(points)
-    fig_2d, ax_2d = visualize_2d_points(points)
+    fig_3d, ax_3d = visualize_3d_points(cloud)
+    fig_2d, ax_2d = visualize_2d_points(cloud)
     
     # Show the visualizations
+    import matplotlib.pyplot as plt
     plt.tight_layout()
     plt.show()
\ No newline at end of file
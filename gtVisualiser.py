@@ -1,14 +1,192 @@
-from pprint import pprint
+import argparse
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
 import graph_tool.all as gt
 
-g = gt.load_graph("visGraph.dot")  # Load a DOT file
+DOT_FILE = "visGraph.dot"
+
+# One `"a" -- "b";` edge per line, as VisGraphGen.ts writes them
+EDGE_PATTERN = re.compile(r'"([^"]+)"\s*--\s*"([^"]+)"')
+
+
+def edges_cache_path(dot_path):
+    return os.path.splitext(dot_path)[0] + ".edges.npz"
+
+
+def blocks_cache_path(dot_path):
+    return os.path.splitext(dot_path)[0] + ".blocks.npz"
+
+
+def parse_edges(lines):
+    """(source names, target names) of the edge lines among lines"""
+    src_names = []
+    dst_names = []
+    for line in lines:
+        match = EDGE_PATTERN.search(line)
+        if match:
+            src_names.append(match.group(1))
+            dst_names.append(match.group(2))
+    return src_names, dst_names
+
+
+def parse_dot(dot_path):
+    """Stream the DOT edge lines into (node names, src ids, dst ids)"""
+    with open(dot_path, 'r') as f:
+        src_names, dst_names = parse_edges(f)
+    nodes, inverse = np.unique(np.array(src_names + dst_names), return_inverse=True)
+    return nodes, inverse[:len(src_names)].astype(np.int64), inverse[len(src_names):].astype(np.int64)
+
+
+def prefix_hash(path, length):
+    """sha1 object over the first length bytes of a file, to be extended with whatever follows"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while length > 0:
+            block = f.read(min(length, 1 << 20))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest
+
+
+def load_edges(dot_path):
+    """Edge list from the binary cache, parsing only the lines appended since it was written
+
+    The cache keeps the byte offset of the last complete line it consumed and a
+    hash of everything before it. VisGraphGen.ts only adds edge lines ahead of the
+    closing brace, so while that prefix is unchanged only the tail is parsed;
+    any other rewrite is parsed from the start.
+    """
+    cache = edges_cache_path(dot_path)
+    stat = os.stat(dot_path)
+    nodes = np.empty(0, dtype=str)
+    src = dst = np.empty(0, dtype=np.int64)
+    offset = 0
+    digest = hashlib.sha1()
+    if os.path.exists(cache):
+        with np.load(cache) as f:
+            cached = {name: f[name] for name in f.files}
+        if int(cached['dot_mtime_ns']) == stat.st_mtime_ns and int(cached['dot_size']) == stat.st_size:
+            return cached['nodes'], cached['src'], cached['dst']
+        if 'offset' in cached and int(cached['offset']) <= stat.st_size:
+            previous = prefix_hash(dot_path, int(cached['offset']))
+            if previous.hexdigest() == str(cached['prefix_sha1']):
+                nodes, src, dst = cached['nodes'], cached['src'], cached['dst']
+                offset = int(cached['offset'])
+                digest = previous
+
+    with open(dot_path, 'rb') as f:
+        f.seek(offset)
+        tail = f.read()
+    # Up to the last newline: the closing brace, or a line still being written, waits for the next load
+    consumed = tail[:tail.rfind(b'\n') + 1]
+    digest.update(consumed)
+    src_names, dst_names = parse_edges(consumed.decode().splitlines())
+    if src_names:
+        names = np.array(src_names + dst_names)
+        merged = np.union1d(nodes, names)
+        # Ids are positions in the sorted node list, so earlier edges are renumbered around the new names
+        remap = np.searchsorted(merged, nodes)
+        ids = np.searchsorted(merged, names)
+        src = np.concatenate((remap[src], ids[:len(src_names)])).astype(np.int64)
+        dst = np.concatenate((remap[dst], ids[len(src_names):])).astype(np.int64)
+        nodes = merged
+
+    np.savez(cache, nodes=nodes, src=src, dst=dst, dot_mtime_ns=stat.st_mtime_ns, dot_size=stat.st_size,
+             offset=offset + len(consumed), prefix_sha1=digest.hexdigest())
+    return nodes, src, dst
+
+
+def build_graph(nodes, src, dst):
+    """Undirected graph over the node ids, each vertex named by its address like gt.load_graph did"""
+    g = gt.Graph(directed=False)
+    g.add_vertex(len(nodes))
+    g.add_edge_list(np.column_stack((src, dst)))
+    g.vp.name = g.new_vp("string", vals=nodes.tolist())
+    return g
+
+
+def warm_start_blocks(nodes, src, dst, previous):
+    """Previous partition mapped onto the current nodes, new nodes join their neighbours' most common block
+
+    Returns (blocks, fraction of nodes that are new), or (None, 1.0) without a
+    previous partition or with an empty one.
+    """
+    if previous is None or len(previous[0]) == 0:
+        return None, 1.0
+    prev_nodes, prev_blocks = previous
+
+    # Both node lists are sorted, so known nodes are found with one searchsorted
+    at = np.minimum(np.searchsorted(prev_nodes, nodes), len(prev_nodes) - 1)
+    known = prev_nodes[at] == nodes
+    blocks = np.full(len(nodes), -1, dtype=np.int64)
+    blocks[known] = prev_blocks[at[known]]
+
+    # Vote per new node over edges to known nodes
+    a = np.concatenate((src, dst))
+    b = np.concatenate((dst, src))
+    votes = (blocks[a] < 0) & (blocks[b] >= 0)
+    if votes.any():
+        pairs, counts = np.unique(np.stack((a[votes], blocks[b[votes]])), axis=1, return_counts=True)
+        order = np.lexsort((-counts, pairs[0]))
+        first = np.unique(pairs[0][order], return_index=True)[1]
+        winners = pairs[:, order[first]]
+        blocks[winners[0]] = winners[1]
+
+    # Isolated new nodes get a fresh block of their own
+    fresh = np.flatnonzero(blocks < 0)
+    blocks[fresh] = blocks.max(initial=-1) + 1 + np.arange(len(fresh))
+    return blocks, 1.0 - known.mean()
+
+
+def fit_blockmodel(g, blocks=None, sweeps=100):
+    """Cold minimize_blockmodel_dl, or MCMC refinement of a warm-start partition"""
+    if blocks is None:
+        return gt.minimize_blockmodel_dl(g)
+
+    state = gt.BlockState(g, b=g.new_vp("int", vals=blocks))
+    for _ in range(sweeps):
+        # beta=inf is greedy: only moves that lower the description length are taken
+        state.multiflip_mcmc_sweep(beta=np.inf, niter=10)
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blockmodel communities of the transaction graph")
+    parser.add_argument('dot', nargs='?', default=DOT_FILE)
+    parser.add_argument('--cold', action='store_true', help="ignore the previous partition")
+    parser.add_argument('--max-new', type=float, default=0.2,
+                        help="fit from scratch when more than this fraction of nodes is new")
+    parser.add_argument('--sweeps', type=int, default=100)
+    parser.add_argument('--no-draw', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    nodes, src, dst = load_edges(args.dot)
+    g = build_graph(nodes, src, dst)
+    print(f"Loaded {g.num_vertices()} vertices, {g.num_edges()} edges in {time.perf_counter() - start:.2f}s")
 
-# g = gt.collection.ns["ego_social/facebook_combined"]
+    previous = None
+    blocks_path = blocks_cache_path(args.dot)
+    if not args.cold and os.path.exists(blocks_path):
+        with np.load(blocks_path) as f:
+            previous = (f['nodes'], f['blocks'])
 
-# pprint(g.vp.vertex_name)
+    blocks, new_fraction = warm_start_blocks(nodes, src, dst, previous)
+    if new_fraction > args.max_new:
+        blocks = None
 
-state = gt.minimize_blockmodel_dl(g)
+    start = time.perf_counter()
+    state = fit_blockmodel(g, blocks, args.sweeps)
+    mode = "cold" if blocks is None else f"warm ({new_fraction:.1%} new nodes)"
+    print(f"Blockmodel fit {mode} in {time.perf_counter() - start:.2f}s, description length {state.entropy():.1f}")
 
-state.draw()
+    np.savez(blocks_path, nodes=nodes, blocks=state.get_blocks().a.astype(np.int64))
 
-# gt.graph_draw(g)
+    if not args.no_draw:
+        state.draw()
@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from asynchttp import HTTPPool
+
+# Same endpoint grab.ts polls
+DEFAULT_ENDPOINT = os.environ.get("INGEST_URL", "https://eth.blockscout.com/api/v2/transactions")
+DEFAULT_LOG_DIR = "ingest"
+SEGMENT_BYTES = 64 << 20
+POLL_INTERVAL = 15
+
+
+def to_record(txn):
+    """The fields grab.ts keeps, read from either explorer naming (blockNumber or block, gasUsed or gas_used)"""
+    sender = txn.get("from") or {}
+    target = txn.get("to") or {}
+    return {
+        "blockNumber": txn.get("blockNumber", txn.get("block_number", txn.get("block"))),
+        "timeStamp": txn.get("timeStamp", txn.get("timestamp")),
+        "hash": txn["hash"],
+        "from": {"ens_domain_name": sender.get("ens_domain_name"), "hash": sender.get("hash")},
+        "to": {"ens_domain_name": target.get("ens_domain_name"), "hash": target.get("hash")},
+        "value": txn.get("value"),
+        "gasUsed": txn.get("gasUsed", txn.get("gas_used")),
+    }
+
+
+def hash_key(tx_hash):
+    """32 raw bytes instead of a 66 character string, keeps the dedupe set small"""
+    try:
+        return bytes.fromhex(tx_hash[2:] if tx_hash.startswith("0x") else tx_hash)
+    except ValueError:
+        return tx_hash.encode()
+
+
+class TransactionLog:
+    """Append-only JSONL log of transactions split into fixed-size segments"""
+
+    def __init__(self, directory=DEFAULT_LOG_DIR, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._repair()
+        self.seen = {hash_key(record["hash"]) for record in self}
+
+    def segments(self):
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.jsonl")))
+
+    def _repair(self):
+        """Drop a partial trailing line left by a crash mid-append"""
+        segments = self.segments()
+        if not segments:
+            return
+        with open(segments[-1], 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _current_segment(self):
+        segments = self.segments()
+        if segments and os.path.getsize(segments[-1]) < self.segment_bytes:
+            return segments[-1]
+        number = int(os.path.basename(segments[-1])[8:-6]) + 1 if segments else 1
+        return os.path.join(self.directory, f"segment-{number:06d}.jsonl")
+
+    def __len__(self):
+        return len(self.seen)
+
+    def __iter__(self):
+        return iter_transactions(self.directory)
+
+    def append(self, transactions):
+        """Append transactions not seen before, returns how many were new"""
+        lines = []
+        for txn in transactions:
+            key = hash_key(txn["hash"])
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            lines.append(json.dumps(txn, separators=(',', ':')) + '\n')
+        if not lines:
+            return 0
+
+        with open(self._current_segment(), 'a') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(lines)
+
+    def import_json(self, file_path="data.json"):
+        """Seed the log from an existing grab.ts data.json, returns how many were new"""
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+        return self.append(t for t in data.get("transactions", []) if isinstance(t, dict) and t.get("hash"))
+
+    def compact(self, out_path="data.json"):
+        """Write the log as grab.ts's { visited, transactions } JSON, streaming record by record"""
+        with open(out_path + ".tmp", 'w') as out:
+            out.write('{"visited":[')
+            for i, record in enumerate(self):
+                out.write((',' if i else '') + json.dumps(record["hash"]))
+            out.write('],"transactions":[')
+            for i, record in enumerate(self):
+                out.write((',' if i else '') + json.dumps(record, separators=(',', ':')))
+            out.write(']}')
+        os.replace(out_path + ".tmp", out_path)
+        return out_path
+
+
+def iter_transactions(directory=DEFAULT_LOG_DIR):
+    """Yield every logged transaction in append order"""
+    for segment in sorted(glob.glob(os.path.join(directory, "segment-*.jsonl"))):
+        with open(segment, 'r') as f:
+            for line in f:
+                if line.endswith('\n'):
+                    yield json.loads(line)
+
+
+async def fetch_page(pool, endpoint, params=None):
+    """One explorer page as (transactions, next page params or None)"""
+    page = await pool.get_json(endpoint, params)
+    return page.get("items") or [], page.get("next_page_params")
+
+
+async def sync(pool, endpoint, log, pages=1):
+    """Pull up to `pages` pages, newest first, stopping at the first page with nothing new"""
+    new_count = 0
+    params = None
+    for _ in range(pages):
+        items, params = await fetch_page(pool, endpoint, params)
+        records = []
+        for txn in items:
+            try:
+                records.append(to_record(txn))
+            except (KeyError, TypeError, AttributeError):
+                continue
+        added = log.append(records)
+        new_count += added
+        if not added or not params:
+            break
+    return new_count
+
+
+async def run(endpoint=DEFAULT_ENDPOINT, log_dir=DEFAULT_LOG_DIR, interval=POLL_INTERVAL, pages=1,
+              iterations=None, out_path=None):
+    """Poll the endpoint every `interval` seconds, compacting to out_path once when polling stops"""
+    log = TransactionLog(log_dir)
+    loaded = len(log)
+    print(f"Loaded {loaded} logged transactions.")
+    fails = 0
+    round_number = 0
+    try:
+        async with HTTPPool(max_connections=4) as pool:
+            while iterations is None or round_number < iterations:
+                round_number += 1
+                started = time.monotonic()
+                try:
+                    new_count = await sync(pool, endpoint, log, pages)
+                    print(f"Found {new_count} new transactions, {len(log)} collected so far.")
+                except Exception as e:
+                    fails += 1
+                    print(f"Failed, retrying ({e})")
+                    print(f"Encountered {fails} failures")
+                if iterations is None or round_number < iterations:
+                    await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        # The log is the source of truth, data.json is rewritten once rather than every round
+        if out_path and len(log) > loaded:
+            log.compact(out_path)
+            print(f"Wrote {len(log)} transactions to {out_path}")
+    return log
+
+
+def serve_stub(port=8080, page_size=50, per_request=20):
+    """Local explorer stub, every unpaged request reveals `per_request` new transactions"""
+    state = {"head": page_size}
+    lock = threading.Lock()
+
+    def transaction(i):
+        return {
+            "hash": f"0x{i:064x}",
+            "block_number": 20_000_000 + i // 100,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000000Z", time.gmtime(1_700_000_000 + 12 * (i // 100))),
+            "from": {"hash": f"0x{(i * 7919) % 5000 + 1:040x}", "ens_domain_name": None},
+            "to": {"hash": f"0x{(i * 104729) % 500 + 1:040x}", "ens_domain_name": None},
+            "value": str(i * 10 ** 15),
+            "gas_used": str(21000 + i % 50000),
+        }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlsplit(self.path).query)
+            with lock:
+                if "index" in query:
+                    top = int(query["index"][0])
+                else:
+                    state["head"] += per_request
+                    top = state["head"]
+            indices = range(top - 1, max(top - 1 - page_size, -1), -1)
+            body = json.dumps({
+                "items": [transaction(i) for i in indices],
+                "next_page_params": {"index": indices[-1]} if len(indices) and indices[-1] > 0 else None,
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transaction ingester replacing grab.ts")
+    parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    poll = sub.add_parser('run', help="poll the explorer and append to the log")
+    poll.add_argument('--endpoint', default=DEFAULT_ENDPOINT)
+    poll.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    poll.add_argument('--pages', type=int, default=1, help="pages to follow back per round")
+    poll.add_argument('--iterations', type=int, default=None)
+    poll.add_argument('--out', help="compact to this data.json when polling stops (after --iterations or Ctrl-C)")
+
+    compact = sub.add_parser('compact', help="write the log as data.json")
+    compact.add_argument('--out', default="data.json")
+
+    imp = sub.add_parser('import', help="seed the log from a grab.ts data.json")
+    imp.add_argument('path', nargs='?', default="data.json")
+
+    stub = sub.add_parser('stub', help="run a local explorer stub server")
+    stub.add_argument('--port', type=int, default=8080)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        try:
+            asyncio.run(run(args.endpoint, args.log_dir, args.interval, args.pages, args.iterations, args.out))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'compact':
+        log = TransactionLog(args.log_dir)
+        start = time.perf_counter()
+        log.compact(args.out)
+        print(f"Wrote {len(log)} transactions to {args.out} in {time.perf_counter() - start:.2f}s")
+    elif args.command == 'import':
+        count = TransactionLog(args.log_dir).import_json(args.path)
+        print(f"Imported {count} new transactions from {args.path}")
+    else:
+        server = serve_stub(args.port)
+        print(f"Stub explorer listening on http://127.0.0.1:{args.port}/api/v2/transactions")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,136 @@
+import hashlib
+import os
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import ArpackNoConvergence, eigsh
+
+from tracing import traced
+
+
+@traced()
+def spectral_layout(graph, seed=0):
+    """2D positions from the leading non-trivial eigenvectors of the normalised adjacency"""
+    n = len(graph)
+    rng = np.random.default_rng(seed)
+    if n < 4:
+        return rng.random((n, 2))
+
+    adjacency = sp.csr_matrix((np.ones(len(graph.indices)), graph.indices, graph.indptr), shape=(n, n))
+    inv_sqrt = 1 / np.sqrt(np.maximum(graph.degrees(), 1))
+    normalised = sp.diags(inv_sqrt) @ adjacency @ sp.diags(inv_sqrt)
+    try:
+        _, vectors = eigsh(normalised, k=3, which='LA', tol=1e-3, maxiter=max(1000, n // 10),
+                           v0=rng.random(n))
+        # Drop the trivial eigenvector, rescale to random-walk eigenvectors
+        positions = vectors[:, :2] * inv_sqrt[:, None]
+    except ArpackNoConvergence:
+        positions = rng.random((n, 2))
+
+    # Disconnected components share eigenvectors, jitter so they can be pulled apart
+    positions = _to_unit_box(positions)
+    return positions + rng.normal(0, 1e-3, positions.shape)
+
+
+def _to_unit_box(positions):
+    low = positions.min(axis=0)
+    span = np.maximum(positions.max(axis=0) - low, 1e-12)
+    return (positions - low) / span.max()
+
+
+def _repulsion_field(positions, grid, strength):
+    """Repulsive force at every node from a particle-mesh approximation of all-pairs k^2/d repulsion
+
+    Node mass is spread onto a grid x grid mesh (cloud-in-cell), convolved with
+    the pairwise force kernel through FFTs and read back at the nodes, so the
+    cost is O(n + grid^2 log grid) instead of O(n^2).
+    """
+    low = positions.min(axis=0)
+    h = max(np.ptp(positions, axis=0).max(), 1e-9) / (grid - 1)
+    cell = (positions - low) / h
+    base = np.minimum(np.floor(cell).astype(np.int64), grid - 2)
+    frac = cell - base
+
+    # Cloud-in-cell deposit onto the four surrounding mesh points
+    corners = [(0, 0), (1, 0), (0, 1), (1, 1)]
+    density = np.zeros(grid * grid)
+    weights = []
+    for dx, dy in corners:
+        w = (frac[:, 0] if dx else 1 - frac[:, 0]) * (frac[:, 1] if dy else 1 - frac[:, 1])
+        flat = (base[:, 0] + dx) * grid + base[:, 1] + dy
+        density += np.bincount(flat, weights=w, minlength=grid * grid)
+        weights.append((flat, w))
+    density = density.reshape(grid, grid)
+
+    # Force kernel on a zero-padded 2G mesh for linear (not circular) convolution
+    offsets = np.fft.fftfreq(2 * grid, 1 / (2 * grid)) * h
+    ox, oy = np.meshgrid(offsets, offsets, indexing='ij')
+    r2 = ox ** 2 + oy ** 2 + h ** 2
+    density_hat = np.fft.rfft2(density, s=(2 * grid, 2 * grid))
+    field = []
+    for component in (ox, oy):
+        kernel_hat = np.fft.rfft2(strength * component / r2)
+        field.append(np.fft.irfft2(density_hat * kernel_hat, s=(2 * grid, 2 * grid))[:grid, :grid].ravel())
+
+    force = np.zeros_like(positions)
+    for flat, w in weights:
+        force[:, 0] += field[0][flat] * w
+        force[:, 1] += field[1][flat] * w
+    return force
+
+
+@traced()
+def force_layout(graph, positions=None, iterations=100, grid=256, seed=0, cooling=0.95):
+    """Fruchterman-Reingold layout with particle-mesh repulsion and sparse edge attraction"""
+    n = len(graph)
+    if positions is None:
+        positions = np.random.default_rng(seed).random((n, 2))
+    positions = _to_unit_box(np.array(positions, dtype=np.float64))
+    if n < 2:
+        return positions
+
+    src, dst = graph.edges()
+    # Ideal edge length for n nodes in the unit square
+    k = np.sqrt(1.0 / n)
+    temperature = 0.1
+    grid = min(grid, max(8, int(np.sqrt(n)) * 2))
+
+    for _ in range(iterations):
+        displacement = _repulsion_field(positions, grid, k * k)
+
+        delta = positions[dst] - positions[src]
+        distance = np.sqrt((delta ** 2).sum(axis=1)) + 1e-12
+        pull = delta * (distance / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] += np.bincount(src, weights=pull[:, axis], minlength=n)
+            displacement[:, axis] -= np.bincount(dst, weights=pull[:, axis], minlength=n)
+
+        length = np.sqrt((displacement ** 2).sum(axis=1)) + 1e-12
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= cooling
+
+    return _to_unit_box(positions)
+
+
+def layout_key(graph, **params):
+    """Cache key over the graph structure and layout parameters"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(graph.indptr).tobytes())
+    digest.update(np.ascontiguousarray(graph.indices).tobytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+
+def cached_layout(graph, iterations=100, grid=256, seed=0, cache_dir=".cache"):
+    """Spectral initialisation refined by force_layout, cached on disk per graph and parameters"""
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"layout-{layout_key(graph, iterations=iterations, grid=grid, seed=seed)}.npy")
+        if os.path.exists(path):
+            return np.load(path)
+
+    positions = force_layout(graph, spectral_layout(graph, seed), iterations, grid, seed)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(path, positions)
+    return positions
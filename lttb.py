@@ -0,0 +1,252 @@
+import os
+
+import numpy as np
+
+# Points per plotted series, POINT_BUDGET=... overrides it (worker processes inherit the environment)
+POINT_BUDGET = int(os.environ.get("POINT_BUDGET", "2000"))
+# Above this many buckets (the fine pyramid levels) all buckets are chosen at once instead of in sequence
+EXACT_BUCKETS = 50000
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb(x, y, budget=POINT_BUDGET):
+    """Indices of at most budget points chosen by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. Every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves peaks and troughs. Bucket sums
+    come from one reduceat; only the inherently sequential argmax walks the buckets.
+    """
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if budget >= n:
+        return np.arange(n)
+    if budget < 3:
+        return np.array([0, n - 1])[:max(budget, 0)]
+
+    # budget - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    counts = np.diff(edges)
+    next_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1])[1:]
+
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    if budget - 2 > EXACT_BUCKETS:
+        selected[1:-1] = _select_parallel(x, y, edges, next_x, next_y)
+        return selected
+    a = 0
+    for i in range(budget - 2):
+        bx = x[edges[i]:edges[i + 1]]
+        by = y[edges[i]:edges[i + 1]]
+        area = np.abs((x[a] - next_x[i]) * (by - y[a]) - (x[a] - bx) * (next_y[i] - y[a]))
+        a = edges[i] + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _select_parallel(x, y, edges, next_x, next_y, passes=4):
+    """Every bucket's choice at once over a padded (buckets, width) view
+
+    Each pass uses the previous pass's choice in the bucket before as the left
+    vertex, seeded with the bucket averages. This drops the sequential walk of
+    exact LTTB; with the small buckets of fine levels the choices agree almost
+    everywhere.
+    """
+    counts = np.diff(edges)
+    rows = edges[:-1, None] + np.arange(counts.max())
+    padded = rows < edges[1:, None]
+    rows = np.where(padded, rows, edges[:-1, None])
+    bx = x[rows]
+    by = y[rows]
+
+    prev_x = np.concatenate(([x[0]], (bx * padded).sum(axis=1)[:-1] / counts[:-1]))
+    prev_y = np.concatenate(([y[0]], (by * padded).sum(axis=1)[:-1] / counts[:-1]))
+    for _ in range(passes):
+        area = np.abs((prev_x[:, None] - next_x[:, None]) * (by - prev_y[:, None])
+                      - (prev_x[:, None] - bx) * (next_y[:, None] - prev_y[:, None]))
+        area[~padded] = -1
+        chosen = rows[np.arange(len(rows)), np.argmax(area, axis=1)]
+        prev_x = np.concatenate(([x[0]], x[chosen[:-1]]))
+        prev_y = np.concatenate(([y[0]], y[chosen[:-1]]))
+    return chosen
+
+
+def downsample(df, x, y, color=None, budget=None):
+    """Rows of df kept by LTTB on (x, y), separately per value of the color column for long-format frames"""
+    budget = budget or POINT_BUDGET
+    if color is None:
+        valid = df[y].notna().to_numpy()
+        rows = np.flatnonzero(valid)
+        if len(rows) <= budget:
+            return df
+        return df.iloc[rows[lttb(df[x].to_numpy()[rows], df[y].to_numpy(dtype=np.float64)[rows], budget)]]
+
+    parts = [downsample(group, x, y, None, budget) for _, group in df.groupby(color, sort=False)]
+    return df.loc[np.concatenate([part.index.to_numpy() for part in parts])] if parts else df
+
+
+class Pyramid:
+    """LTTB levels from the raw series down to one budget, each a quarter of the next finer one
+
+    window() picks, for any zoom range, the finest level that fits the budget,
+    so zooming in reveals detail while every view stays bounded.
+    """
+
+    def __init__(self, x, y, budget=POINT_BUDGET, factor=4):
+        # Date axes send their range as strings or datetimes, converted the same way as x
+        self.dates = np.issubdtype(np.asarray(x).dtype, np.datetime64)
+        self.x = _as_float(x)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.budget = budget
+        level = np.flatnonzero(~np.isnan(self.y))
+        # Finest first: the raw (non-NaN) points, then coarser and coarser
+        self.levels = [level]
+        while len(level) > budget:
+            level = level[lttb(self.x[level], self.y[level], max(budget, len(level) // factor))]
+            self.levels.append(level)
+
+    def _position(self, value):
+        """A zoom bound as a number on the x scale, e.g. "2024-03-01 12:00:00.5" or a datetime on a date axis"""
+        if self.dates:
+            return float(np.datetime64(value, "ns").astype(np.int64))
+        return float(value)
+
+    def window(self, lo=None, hi=None):
+        """Indices into the series for x in [lo, hi], from the finest level within budget, plus one neighbour each side"""
+        lo = -np.inf if lo is None else self._position(lo)
+        hi = np.inf if hi is None else self._position(hi)
+        for level in self.levels:
+            xs = self.x[level]
+            start = max(np.searchsorted(xs, lo, side='left') - 1, 0)
+            stop = min(np.searchsorted(xs, hi, side='right') + 1, len(level))
+            if stop - start <= self.budget + 2:
+                return level[start:stop]
+        return level[start:stop]
+
+
+# Page-side twin of Pyramid.window: on every x zoom each trace gets the finest level of its pyramid
+# that fits the budget, and double-click (autorange) goes back to the coarsest. Reads fig.layout.meta.zoom.
+ZOOM_SCRIPT = """
+var gd = document.getElementById('{plot_id}');
+var zoom = (gd.layout.meta || {}).zoom;
+if (zoom) {
+    var position = function (v) {
+        if (!zoom.dates) return Number(v);
+        var text = String(v).replace(' ', 'T');
+        return Date.parse(text.length === 10 ? text + 'T00:00:00Z' : text + 'Z');
+    };
+    var bisect = function (a, v, right) {
+        var lo = 0, hi = a.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            if (a[mid] < v || (right && a[mid] === v)) lo = mid + 1; else hi = mid;
+        }
+        return lo;
+    };
+    zoom.series.forEach(function (s) {
+        s.levelT = s.levels.map(function (level) { return level.map(function (i) { return s.t[i]; }); });
+    });
+    var pick = function (s, lo, hi) {
+        var keep = [];
+        for (var l = 0; l < s.levels.length; l++) {
+            var start = Math.max(bisect(s.levelT[l], lo, false) - 1, 0);
+            var stop = Math.min(bisect(s.levelT[l], hi, true) + 1, s.levels[l].length);
+            keep = s.levels[l].slice(start, stop);
+            if (stop - start <= zoom.budget + 2) break;
+        }
+        return keep;
+    };
+    gd.on('plotly_relayout', function (e) {
+        var lo = -Infinity, hi = Infinity;
+        if (e['xaxis.range[0]'] !== undefined) {
+            lo = position(e['xaxis.range[0]']);
+            hi = position(e['xaxis.range[1]']);
+        } else if (e['xaxis.range']) {
+            lo = position(e['xaxis.range'][0]);
+            hi = position(e['xaxis.range'][1]);
+        } else if (!e['xaxis.autorange']) {
+            return;
+        }
+        var xs = [], ys = [];
+        zoom.series.forEach(function (s) {
+            var keep = pick(s, lo, hi);
+            xs.push(keep.map(function (i) { return s.x[i]; }));
+            ys.push(keep.map(function (i) { return s.y[i]; }));
+        });
+        Plotly.restyle(gd, {x: xs, y: ys}, zoom.series.map(function (s) { return s.trace; }));
+    });
+}
+"""
+
+
+def zoomable(fig, df, x, y, color=None, budget=None):
+    """Give fig's traces pyramid levels of df's full (x, y) series, returns fig
+
+    Each trace (one per color value) is redrawn from its coarsest level, and the
+    levels travel in fig.layout.meta, so a page written with
+    post_script=ZOOM_SCRIPT, or a FigureWidget under follow_zoom(), re-thins on
+    zoom instead of only enlarging the points thinned for the full view.
+    """
+    budget = budget or POINT_BUDGET
+    groups = [(None, df)] if color is None else [(str(k), g) for k, g in df.groupby(color, sort=False)]
+    dates = np.issubdtype(df[x].dtype, np.datetime64)
+    series = []
+    for name, group in groups:
+        trace = next((i for i, t in enumerate(fig.data) if name is None or t.name == name), None)
+        if trace is None:
+            continue
+        xs = group[x].to_numpy()
+        ys = group[y].to_numpy(dtype=np.float64)
+        pyramid = Pyramid(xs, ys, budget)
+        coarsest = pyramid.levels[-1]
+        fig.data[trace].update(x=xs[coarsest], y=ys[coarsest])
+        series.append({
+            "trace": trace,
+            "name": fig.data[trace].name,
+            "x": (np.datetime_as_string(xs.astype("datetime64[ms]")) if dates else xs).tolist(),
+            "t": (pyramid.x / 1e6 if dates else pyramid.x).tolist(),
+            "y": [None if np.isnan(v) else v for v in ys.tolist()],
+            "levels": [level.tolist() for level in pyramid.levels],
+        })
+    meta = dict(fig.layout.meta or {})
+    meta["zoom"] = {"budget": budget, "dates": bool(dates), "series": series}
+    fig.layout.meta = meta
+    return fig
+
+
+def follow_zoom(widget, series=None, budget=None):
+    """Re-thin a plotly FigureWidget's traces from their pyramids whenever the x-axis range changes
+
+    series maps trace name to its full (x, y) arrays, by default the series zoomable()
+    attached to the figure; the widget starts on the coarsest level.
+    """
+    if series is None:
+        zoom = widget.layout.meta["zoom"]
+        budget = budget or zoom["budget"]
+        series = {s["name"]: (np.array(s["x"], dtype="datetime64[ms]") if zoom["dates"] else np.array(s["x"]),
+                              np.array(s["y"], dtype=np.float64))
+                  for s in zoom["series"]}
+    pyramids = {name: (np.asarray(x), np.asarray(y), Pyramid(x, y, budget or POINT_BUDGET))
+                for name, (x, y) in series.items()}
+
+    def redraw(layout, x_range):
+        lo, hi = x_range if x_range else (None, None)
+        with widget.batch_update():
+            for trace in widget.data:
+                if trace.name in pyramids:
+                    x, y, pyramid = pyramids[trace.name]
+                    keep = pyramid.window(lo, hi)
+                    trace.x, trace.y = x[keep], y[keep]
+
+    widget.layout.on_change(redraw, 'xaxis.range')
+    redraw(widget.layout, None)
+    return widget
@@ -1,49 +1,67 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import plotly.express as px
-import json
+import tracing
+from anomaly import THRESHOLD, detect
+from changes import update_changes
+from derived import DerivedMetrics
+import lttb
+from lttb import ZOOM_SCRIPT, downsample, zoomable
+from metrics import MetricsStore
+from tracing import span
 
 
 do = [1,2,3,4,5,6,7]
 
 
-if 1 in do:
-    input("Show unique addresses")
-    
-    csv_filename = "normalized_address-count.csv"  
-    df = pd.read_csv(csv_filename)
+def mark_anomalies(fig, df, columns):
+    """Overlay red markers on the days where a column's rolling z-score crosses the threshold"""
+    with span("anomalies"):
+        result = detect(df[columns])
+        for column in columns:
+            flagged = result[(column, "anomaly")].to_numpy()
+            fig.add_scatter(x=df["Date(UTC)"][flagged], y=df[column][flagged], mode="markers",
+                            marker={"color": "red", "size": 11, "symbol": "x"},
+                            name=f"Anomaly ({column}, |z| > {THRESHOLD})")
 
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
 
+def section_1(store):
+    """Show unique addresses"""
+    
+    df = store.frame("address-count", ["Daily Change"])
 
-    df["Daily Change"] = df["Value"].diff()
 
+    # Only rows added since the last run are appended to logged_changes.csv
+    update_changes()
 
-    df.to_csv("logged_changes.csv", index=False)
 
+    with span("plot"):
+        fig1 = zoomable(px.line(downsample(df, "Date(UTC)", "Value"), x="Date(UTC)", y="Value", title="Value Over Time",
+                    markers=True, labels={"Value": "Total Value", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"}), df, "Date(UTC)", "Value")
 
-    fig1 = px.line(df, x="Date(UTC)", y="Value", title="Value Over Time",
-                markers=True, labels={"Value": "Total Value", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
 
+    with span("plot"):
+        fig2 = zoomable(px.line(downsample(df, "Date(UTC)", "Daily Change"), x="Date(UTC)", y="Daily Change", title="Daily Change in Value",
+                    markers=True, labels={"Daily Change": "users", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Daily Change": ":,"}), df, "Date(UTC)", "Daily Change")
 
-    fig2 = px.line(df, x="Date(UTC)", y="Daily Change", title="Daily Change in Value",
-                markers=True, labels={"Daily Change": "users", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Daily Change": ":,"})
 
+    mark_anomalies(fig2, df, ["Daily Change"])
 
-    fig1.show()
-    fig2.show()
+    return [("unique-addresses", fig1), ("unique-addresses-daily-change", fig2)]
 
 
 
-if 2 in do:
-    input("Show daily active users")
+def section_2(store):
+    """Show daily active users"""
 
-    csv_filename = "daily-active-eth-address.csv"
-    df = pd.read_csv(csv_filename)
-
-    
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+    df = store.frame("active-addresses")
 
     
     df["Total Active Users"] = df["Unique Address Total Count"]
@@ -51,169 +69,301 @@ if 2 in do:
     df["Sent"] = df["Unique Address Sent Count"]
 
     
-    df_melted = df.melt(id_vars=["Date(UTC)"], 
-                        value_vars=["Total Active Users", "Receive", "Sent"],
-                        var_name="Metric", 
-                        value_name="Value")
+    with span("melt"):
+        df_melted = df.melt(id_vars=["Date(UTC)"], 
+                            value_vars=["Total Active Users", "Receive", "Sent"],
+                            var_name="Metric", 
+                            value_name="Value")
 
     
-    fig = px.line(df_melted, x="Date(UTC)", y="Value", color="Metric", 
-                title="Daily Unique User Addresses",
-                markers=True, labels={"Value": "tokens", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
+    with span("plot"):
+        fig = zoomable(px.line(downsample(df_melted, "Date(UTC)", "Value", "Metric"), x="Date(UTC)", y="Value", color="Metric", 
+                    title="Daily Unique User Addresses",
+                    markers=True, labels={"Value": "tokens", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"}), df_melted, "Date(UTC)", "Value", "Metric")
 
-    fig.show()
+    mark_anomalies(fig, df, ["Total Active Users", "Receive", "Sent"])
 
+    return [("daily-active-users", fig)]
 
-if 3 in do:
-    input("Show daily tokens (coins)")
 
-    csv_filename = "daily-active-token-address.csv"
-    df = pd.read_csv(csv_filename)
+def section_3(store):
+    """Show daily tokens (coins)"""
 
-    
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+    df = store.frame("active-tokens")
 
     
     df["Total Tokens interacted with"] = df["Unique Address Total Count"]
 
     
-    df_melted = df.melt(id_vars=["Date(UTC)"], 
-                        value_vars=["Total Tokens interacted with"],
-                        var_name="Metric", 
-                        value_name="Value")
+    with span("melt"):
+        df_melted = df.melt(id_vars=["Date(UTC)"], 
+                            value_vars=["Total Tokens interacted with"],
+                            var_name="Metric", 
+                            value_name="Value")
 
     
-    fig = px.line(df_melted, x="Date(UTC)", y="Value", color="Metric", 
-                title="Daily Active Token Addresses",
-                markers=True, labels={"Value": "Daily Change", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
+    with span("plot"):
+        fig = zoomable(px.line(downsample(df_melted, "Date(UTC)", "Value", "Metric"), x="Date(UTC)", y="Value", color="Metric", 
+                    title="Daily Active Token Addresses",
+                    markers=True, labels={"Value": "Daily Change", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"}), df_melted, "Date(UTC)", "Value", "Metric")
 
-    fig.show()
+    mark_anomalies(fig, df, ["Total Tokens interacted with"])
 
+    return [("daily-active-tokens", fig)]
 
-if 4 in do:
-    input("New Contracts")
 
-    csv_filename = "deployed-contracts.csv"
-    df = pd.read_csv(csv_filename)
+def section_4(store):
+    """New Contracts"""
 
-    
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+    df = store.frame("deployed-contracts", ["Total Count"])
 
     
     df["contracts"] = df["No. of Deployed Contracts"]
 
     
-    df["Total Count"] = df["contracts"].fillna(0).cumsum()
+    with span("melt"):
+        df_melted = df.melt(id_vars=["Date(UTC)"], 
+                            value_vars=["contracts", "Total Count"],
+                            var_name="Metric", 
+                            value_name="Value")
 
     
-    df_melted = df.melt(id_vars=["Date(UTC)"], 
-                        value_vars=["contracts", "Total Count"],
-                        var_name="Metric", 
-                        value_name="Value")
+    with span("plot"):
+        fig = zoomable(px.line(downsample(df_melted, "Date(UTC)", "Value", "Metric"), x="Date(UTC)", y="Value", color="Metric", 
+                    title="Daily and Total Deployed Contracts",
+                    markers=True, labels={"Value": "Contracts", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"}), df_melted, "Date(UTC)", "Value", "Metric")
 
-    
-    fig = px.line(df_melted, x="Date(UTC)", y="Value", color="Metric", 
-                title="Daily and Total Deployed Contracts",
-                markers=True, labels={"Value": "Contracts", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
+    mark_anomalies(fig, df, ["contracts"])
 
-    fig.show()
+    return [("deployed-contracts", fig)]
 
 
 
-if 5 in do:
-    input("Exchange transactions")
+def section_5(store):
+    """Exchange transactions"""
 
-    csv_filename = "exchange-txns.csv"
-    df = pd.read_csv(csv_filename)
-
-    
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+    df = store.frame("exchange-txns")
 
     
     df["txns"] = df["Value"]
 
     
-    df_melted = df.melt(id_vars=["Date(UTC)"], 
-                        value_vars=["txns"],
-                        var_name="Metric", 
-                        value_name="Txn Count")
+    with span("melt"):
+        df_melted = df.melt(id_vars=["Date(UTC)"], 
+                            value_vars=["txns"],
+                            var_name="Metric", 
+                            value_name="Txn Count")
 
     
-    fig = px.line(df_melted, x="Date(UTC)", y="Txn Count", color="Metric", 
-                title="Daily Exchange Txns",
-                markers=True, labels={"Txn Count": "txns", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Txn Count": ":,"})
+    with span("plot"):
+        fig = zoomable(px.line(downsample(df_melted, "Date(UTC)", "Txn Count", "Metric"), x="Date(UTC)", y="Txn Count", color="Metric", 
+                    title="Daily Exchange Txns",
+                    markers=True, labels={"Txn Count": "txns", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Txn Count": ":,"}), df_melted, "Date(UTC)", "Txn Count", "Metric")
 
-    fig.show()
+    mark_anomalies(fig, df, ["txns"])
 
+    return [("exchange-txns", fig)]
 
-if 6 in do:
-    input("Token Transactions (Total / not unique)")
 
-    csv_filename = "token-txns.csv"
-    df = pd.read_csv(csv_filename)
+def section_6(store):
+    """Token Transactions (Total / not unique)"""
 
-    
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+    df = store.frame("token-txns", ["Total txns"])
 
     
     df["txns"] = df["Transactions"]
 
     
-    df["Total txns"] = df["txns"].fillna(0).cumsum()
+    with span("melt"):
+        df_melted = df.melt(id_vars=["Date(UTC)"], 
+                            value_vars=["txns", "Total txns"],
+                            var_name="Metric", 
+                            value_name="Value")
 
     
-    df_melted = df.melt(id_vars=["Date(UTC)"], 
-                        value_vars=["txns", "Total txns"],
-                        var_name="Metric", 
-                        value_name="Value")
+    with span("plot"):
+        fig = zoomable(px.line(downsample(df_melted, "Date(UTC)", "Value", "Metric"), x="Date(UTC)", y="Value", color="Metric", 
+                    title="Total (non unique) Transactions marked 'Token'",
+                    markers=True, labels={"Value": "Contracts", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"}), df_melted, "Date(UTC)", "Value", "Metric")
 
-    
-    fig = px.line(df_melted, x="Date(UTC)", y="Value", color="Metric", 
-                title="Total (non unique) Transactions marked 'Token'",
-                markers=True, labels={"Value": "Contracts", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
+    mark_anomalies(fig, df, ["txns"])
 
-    fig.show()
+    return [("token-txns", fig)]
 
 
-if 7 in do:
-    input("Transactions")
+def section_7(store):
+    """Transactions"""
 
-    csv_filename = "tx-growth.csv"
-    df = pd.read_csv(csv_filename)
-
-    
-    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+    df = store.frame("tx-growth", ["Total txns", "Transactions per active address"])
 
     
     df["txns"] = df["Transactions"]
 
     
-    df["Total txns"] = df["txns"].fillna(0).cumsum()
+    with span("melt"):
+        df_melted = df.melt(id_vars=["Date(UTC)"], 
+                            value_vars=["txns", "Total txns"],
+                            var_name="Metric", 
+                            value_name="Value")
 
     
-    df_melted = df.melt(id_vars=["Date(UTC)"], 
-                        value_vars=["txns", "Total txns"],
-                        var_name="Metric", 
-                        value_name="Value")
+    with span("plot"):
+        fig = zoomable(px.line(downsample(df_melted, "Date(UTC)", "Value", "Metric"), x="Date(UTC)", y="Value", color="Metric", 
+                    title="Total Transactions Daily",
+                    markers=True, labels={"Value": "Contracts", "Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"}), df_melted, "Date(UTC)", "Value", "Metric")
 
     
-    fig = px.line(df_melted, x="Date(UTC)", y="Value", color="Metric", 
-                title="Total Transactions Daily",
-                markers=True, labels={"Value": "Contracts", "Date(UTC)": "Date"},
-                hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
-
-    fig.show()
-
-
-
-input("Show top stats / actors")
-with open('most.json', 'r') as file:
-    data = json.load(file)
-
-print(json.dumps(data, indent=4))
+    with span("plot"):
+        fig2 = zoomable(px.line(downsample(df, "Date(UTC)", "Transactions per active address"), x="Date(UTC)", y="Transactions per active address",
+                    title="Transactions per Active Address",
+                    markers=True, labels={"Date(UTC)": "Date"},
+                    hover_data={"Date(UTC)": "|%Y-%m-%d", "Transactions per active address": ":.2f"}), df, "Date(UTC)", "Transactions per active address")
+
+    mark_anomalies(fig, df, ["txns"])
+    mark_anomalies(fig2, df, ["Transactions per active address"])
+
+    return [("transactions", fig), ("transactions-per-active-address", fig2)]
+
+
+
+SECTIONS = {
+    1: section_1,
+    2: section_2,
+    3: section_3,
+    4: section_4,
+    5: section_5,
+    6: section_6,
+    7: section_7,
+}
+
+
+def show_top_stats():
+    """Show top stats / actors"""
+    with open('most.json', 'r') as file:
+        data = json.load(file)
+
+    print(json.dumps(data, indent=4))
+
+
+def run_interactive(sections):
+    """Original flow: wait for enter before each section and open its figures in the browser"""
+    # Every section reads from one aligned, cached load of the metrics CSVs and their derived series
+    store = DerivedMetrics(MetricsStore())
+
+    for number in sections:
+        build = SECTIONS[number]
+        input(build.__doc__)
+        with span(f"section {number}"):
+            figures = build(store)
+        for _, fig in figures:
+            fig.show(post_script=ZOOM_SCRIPT)
+
+    input(show_top_stats.__doc__)
+    show_top_stats()
+
+
+def render_section(number, out_dir, formats, embed):
+    """Build one section's figures and write them out, returns per-figure timings (runs in a worker)"""
+    store = DerivedMetrics(MetricsStore())
+    build = SECTIONS[number]
+
+    start = time.perf_counter()
+    with span(f"section {number}"):
+        figures = build(store)
+    build_seconds = (time.perf_counter() - start) / max(len(figures), 1)
+
+    results = []
+    for fig_name, fig in figures:
+        name = f"{number}-{fig_name}"
+        start = time.perf_counter()
+        paths = []
+        with span("write figure", figure=name):
+            if "html" in formats:
+                paths.append(os.path.join(out_dir, name + ".html"))
+                fig.write_html(paths[-1], include_plotlyjs="cdn", post_script=ZOOM_SCRIPT)
+            if "png" in formats:
+                paths.append(os.path.join(out_dir, name + ".png"))
+                fig.write_image(paths[-1])
+            div = fig.to_html(full_html=False, include_plotlyjs=False, post_script=ZOOM_SCRIPT) if embed else None
+        results.append({
+            "section": number,
+            "figure": name,
+            "build_seconds": build_seconds,
+            "write_seconds": time.perf_counter() - start,
+            "paths": paths,
+            "div": div,
+        })
+    tracing.flush()
+    return results
+
+
+def write_report(path, results):
+    """One self-contained HTML page with every figure, plotly.js embedded once"""
+    from plotly.offline import get_plotlyjs
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<html><head><meta charset=\"utf-8\"><title>Ethereum metrics report</title>")
+        f.write(f"<script type=\"text/javascript\">{get_plotlyjs()}</script></head><body>")
+        for result in results:
+            f.write(f"<h2>{result['figure']}</h2>{result['div']}")
+        f.write("</body></html>")
+
+
+def run_headless(sections, out_dir, formats, report, workers):
+    """Build the selected sections in a process pool and write static files, no prompts"""
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Warm the metrics and derived caches once so workers only do the columnar loads
+    warm = DerivedMetrics(MetricsStore())
+    for name in warm.metrics:
+        warm.get(name)
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_section, n, out_dir, formats, report is not None) for n in sections]
+        for future in futures:
+            results.extend(future.result())
+    total = time.perf_counter() - start
+
+    if report:
+        write_report(os.path.join(out_dir, report), results)
+
+    print(f"{'figure':<50} {'build s':>8} {'write s':>8}")
+    for result in results:
+        print(f"{result['figure']:<50} {result['build_seconds']:>8.3f} {result['write_seconds']:>8.3f}")
+    print(f"Built {len(results)} figures from {len(sections)} sections in {total:.2f}s")
+    if report:
+        print(f"Combined report written to {os.path.join(out_dir, report)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ethereum metrics dashboards")
+    parser.add_argument('--headless', action='store_true', help="render to files instead of prompting and opening figures")
+    parser.add_argument('--sections', default=",".join(map(str, do)), help="comma separated section numbers")
+    parser.add_argument('--out-dir', default="reports")
+    parser.add_argument('--format', default="html", help="html, png or html,png (png needs kaleido)")
+    parser.add_argument('--report', nargs='?', const="report.html", help="also write one combined HTML report")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--points', type=int, default=None,
+                        help=f"max points per plotted series, LTTB downsampled (default {lttb.POINT_BUDGET})")
+    tracing.add_argument(parser)
+    args = parser.parse_args()
+    tracing.configure(args.trace)
+    if args.points:
+        # Workers pick the budget up from the environment
+        lttb.POINT_BUDGET = args.points
+        os.environ["POINT_BUDGET"] = str(args.points)
+
+    sections = [int(n) for n in args.sections.split(",") if n.strip()]
+    if args.headless:
+        run_headless(sections, args.out_dir, args.format.split(","), args.report, args.workers)
+    else:
+        run_interactive(sections)
 
@@ -1,3 +1,3 @@
 @echo off
-$OUTLIER_THRESHOLD=0.000002517
+set OUTLIER_THRESHOLD=0.000002517
 bun run market/recommend %1
\ No newline at end of file
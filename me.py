@@ -1,34 +1,64 @@
+import sys
+import json
 
 import matplotlib.pyplot as plt
 
-# Data
-algorithms = [
-    "ECDSA (secp256k1)",
-    "ECDSA (secp256r1)",
-    "Ed25519",
-    "Ed448",
-    "ECDSA (secp384r1)",
-    "Schnorr (BIP-340)"
-]
+# Measured by sigbench.py on this machine
+path = sys.argv[1] if len(sys.argv) > 1 else "sig-bench.json"
+try:
+    with open(path, 'r') as f:
+        report = json.load(f)
+except FileNotFoundError:
+    sys.exit(f"{path} not found, run `python sigbench.py` first")
 
-signing_speed = [141, 103, 75, 71, 62, 109]  # ops/sec
-verification_speed = [125, 62, 212, 40, 35, 72]  # ops/sec
+results = [r for r in report["results"] if "skipped" not in r]
+if not results:
+    sys.exit(f"No measured algorithms in {path}")
+
+algorithms = [r["algorithm"] for r in results]
+signing_speed = [r["sign"]["mean"] for r in results]  # ops/sec
+verification_speed = [r["verify"]["mean"] for r in results]  # ops/sec
+signing_error = [r["sign"]["ci"] for r in results]
+verification_error = [r["verify"]["ci"] for r in results]
+parallel = all("sign_parallel" in r for r in results)
 
 x = range(len(algorithms))
 width = 0.35
+confidence = results[0]["sign"]["confidence"]
 
 # Plot
-plt.figure(figsize=(12, 6))
-plt.bar(x, signing_speed, width=width, label='Signing Speed', color='#4caf50')
-plt.bar([i + width for i in x], verification_speed, width=width, label='Verification Speed', color='#2196f3')
+fig, axes = plt.subplots(1, 2 if parallel else 1, figsize=(18 if parallel else 12, 6), squeeze=False)
+ax = axes[0][0]
+ax.bar(x, signing_speed, width=width, yerr=signing_error, capsize=4, label='Signing Speed', color='#4caf50')
+ax.bar([i + width for i in x], verification_speed, width=width, yerr=verification_error, capsize=4,
+       label='Verification Speed', color='#2196f3')
 
 # Labels and titles
-plt.xlabel('Signature Algorithm')
-plt.ylabel('Operations per Second')
-plt.title('Signing vs Verification Speed of ECC Signature Algorithms')
-plt.xticks([i + width / 2 for i in x], algorithms, rotation=25, ha='right')
-plt.legend()
-plt.grid(axis='y', linestyle='--', alpha=0.7)
+ax.set_xlabel('Signature Algorithm')
+ax.set_ylabel(f'Operations per Second (single process, {confidence:.0%} CI)')
+ax.set_title('Signing vs Verification Speed of ECC Signature Algorithms')
+ax.set_xticks([i + width / 2 for i in x])
+ax.set_xticklabels(algorithms, rotation=25, ha='right')
+ax.legend()
+ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+if parallel:
+    workers = results[0]["sign_parallel"]["workers"]
+    ax = axes[0][1]
+    ax.bar(x, [r["sign_parallel"]["ops_per_sec"] for r in results], width=width,
+           label='Signing Throughput', color='#4caf50')
+    ax.bar([i + width for i in x], [r["verify_parallel"]["ops_per_sec"] for r in results], width=width,
+           label='Verification Throughput', color='#2196f3')
+    ax.set_xlabel('Signature Algorithm')
+    ax.set_ylabel(f'Operations per Second ({workers} processes)')
+    ax.set_title('Multi-process Throughput')
+    ax.set_xticks([i + width / 2 for i in x])
+    ax.set_xticklabels(algorithms, rotation=25, ha='right')
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+machine = report["machine"]
+fig.text(0.01, 0.01, f"{machine['processor']}, {machine['cpu_count']} cores, Python {machine['python']}", fontsize=8)
 
 # Show plot
 plt.tight_layout()
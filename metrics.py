@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from tracing import span, traced
+
+DATE_COLUMN = "Date(UTC)"
+TIME_COLUMN = "UnixTimeStamp"
+
+# Every dashboard CSV with its explicit date format and value columns
+DATASETS = {
+    "address-count": {
+        "file": "normalized_address-count.csv",
+        "date_format": "%Y-%m-%d",
+        "columns": ["Value"],
+    },
+    "active-addresses": {
+        "file": "daily-active-eth-address.csv",
+        "date_format": "%m/%d/%Y",
+        "columns": ["Unique Address Total Count", "Unique Address Receive Count", "Unique Address Sent Count"],
+    },
+    "active-tokens": {
+        "file": "daily-active-token-address.csv",
+        "date_format": "%m/%d/%Y",
+        "columns": ["Unique Address Total Count", "Unique Address Receive Count", "Unique Address Sent Count"],
+    },
+    "deployed-contracts": {
+        "file": "deployed-contracts.csv",
+        "date_format": "%Y-%m-%d",
+        "columns": ["No. of Deployed Contracts"],
+    },
+    "exchange-txns": {
+        "file": "exchange-txns.csv",
+        "date_format": "%m/%d/%Y",
+        "columns": ["Value"],
+    },
+    "token-txns": {
+        "file": "token-txns.csv",
+        "date_format": "%Y-%m-%d",
+        "columns": ["Transactions"],
+    },
+    "tx-growth": {
+        "file": "tx-growth.csv",
+        "date_format": "%m/%d/%Y",
+        "columns": ["Transactions"],
+    },
+}
+
+# Wide-frame columns are "<dataset>/<column>"
+SEPARATOR = "/"
+
+
+def file_hash(path):
+    """sha1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_dataset(path, spec):
+    """Parse one metrics CSV with explicit dtypes and date format, indexed by UnixTimeStamp"""
+    dtypes = {column: "Int64" for column in spec["columns"]}
+    dtypes[DATE_COLUMN] = "string"
+    with span("read_csv", path=path):
+        df = pd.read_csv(path, dtype=dtypes, usecols=lambda c: c in dtypes or c == TIME_COLUMN)
+
+    # The plotted date is authoritative: daily-active-*.csv carry no timestamp at all and
+    # exchange-txns.csv repeats 1722470400 for 12/31/2024
+    with span("to_datetime", path=path):
+        dates = pd.to_datetime(df[DATE_COLUMN], format=spec["date_format"])
+    timestamps = (dates - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    if TIME_COLUMN in df:
+        mismatched = int((df[TIME_COLUMN].astype("int64") != timestamps).sum())
+        if mismatched:
+            print(f"{path}: {mismatched} UnixTimeStamp value(s) disagree with {DATE_COLUMN}, using the date")
+
+    frame = df[spec["columns"]].copy()
+    frame.index = pd.Index(timestamps.to_numpy(), name=TIME_COLUMN)
+    return frame
+
+
+class MetricsStore:
+    """All dashboard series aligned on UnixTimeStamp, cached as one Parquet file keyed on source mtime/hash"""
+
+    def __init__(self, root=".", cache_dir=".cache", datasets=DATASETS):
+        self.root = root
+        self.datasets = datasets
+        self.cache_path = os.path.join(root, cache_dir, "metrics.parquet")
+        self.manifest_path = os.path.join(root, cache_dir, "metrics.json")
+        self._wide = None
+        self._versions = None
+
+    def _source(self, name):
+        return os.path.join(self.root, self.datasets[name]["file"])
+
+    def _fingerprint(self, name, previous=None):
+        """(mtime_ns, size, sha1) of a dataset's file, the hash is reused when mtime and size match"""
+        stat = os.stat(self._source(name))
+        if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+            return previous
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": file_hash(self._source(name))}
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (ValueError, OSError):
+            return {}
+
+    def _read_cache(self):
+        if not (os.path.exists(self.cache_path) and os.path.exists(self.manifest_path)):
+            return None, {}
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            return pd.read_parquet(self.cache_path), manifest
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Ignoring metrics cache: {e}")
+            return None, {}
+
+    def _write_cache(self, wide, manifest):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        try:
+            wide.to_parquet(self.cache_path + ".tmp")
+        except ImportError as e:
+            print(f"Metrics cache disabled ({e})")
+            return
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+        with open(self.manifest_path + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    @traced("MetricsStore.load")
+    def load(self):
+        """Wide frame of every dataset, reparsing only the CSVs whose contents changed"""
+        if self._wide is not None:
+            return self._wide
+
+        cached, manifest = self._read_cache()
+        fingerprints = {name: self._fingerprint(name, manifest.get(name)) for name in self.datasets}
+        self._versions = {name: fingerprint["sha1"] for name, fingerprint in fingerprints.items()}
+        stale = [
+            name for name in self.datasets
+            if cached is None or manifest.get(name, {}).get("sha1") != fingerprints[name]["sha1"]
+        ]
+
+        if not stale and fingerprints == manifest:
+            self._wide = cached
+            return cached
+
+        parts = []
+        for name in self.datasets:
+            if name in stale:
+                frame = parse_dataset(self._source(name), self.datasets[name])
+            else:
+                prefix = name + SEPARATOR
+                frame = cached[[c for c in cached.columns if c.startswith(prefix)]].dropna(how="all")
+                frame.columns = [c[len(prefix):] for c in frame.columns]
+            parts.append(frame.add_prefix(name + SEPARATOR))
+
+        wide = pd.concat(parts, axis=1).sort_index()
+        if stale:
+            print(f"Parsed {len(stale)} metrics file(s): {', '.join(stale)}")
+        self._write_cache(wide, fingerprints)
+        self._wide = wide
+        return wide
+
+    def versions(self):
+        """Content hash of every dataset, what derived series are keyed on
+
+        Read from file stats and the cache manifest, a CSV is only hashed when its
+        mtime or size moved and the frame itself is never loaded.
+        """
+        if self._versions is None:
+            manifest = self._read_manifest()
+            self._versions = {name: self._fingerprint(name, manifest.get(name))["sha1"] for name in self.datasets}
+        return self._versions
+
+    def frame(self, name):
+        """One dataset's rows with Date(UTC) as datetime, like pd.read_csv + pd.to_datetime gave"""
+        wide = self.load()
+        prefix = name + SEPARATOR
+        columns = [c for c in wide.columns if c.startswith(prefix)]
+        df = wide[columns].dropna(how="all")
+        df.columns = [c[len(prefix):] for c in columns]
+        df = df.reset_index()
+        df.insert(0, DATE_COLUMN, pd.to_datetime(df[TIME_COLUMN], unit="s"))
+        return df
+
+
+if __name__ == "__main__":
+    store = MetricsStore()
+    wide = store.load()
+    print(f"{len(wide)} timestamps x {len(wide.columns)} series")
+    print(wide.tail())
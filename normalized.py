@@ -1,21 +1,147 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-filename = "daily-active-eth-address"
+from metrics import DATASETS, DATE_COLUMN, TIME_COLUMN
+
+# Raw inputs: the dashboard datasets, with address-count read from its raw file
+SOURCES = {name: spec for name, spec in DATASETS.items() if not spec["file"].startswith("normalized_")}
+SOURCES["address-count"] = {"file": "address-count.csv", "date_format": "%m/%d/%Y", "columns": ["Value"]}
+
+STRATEGIES = ("baseline", "minmax", "zscore", "log")
+
+# Rows per chunk, neither pass ever holds more than this in memory
+CHUNK_ROWS = 100_000
+
+
+def output_path(file_name, strategy):
+    """normalized_<file> for the original baseline strategy, normalized_<strategy>_<file> otherwise"""
+    directory, base = os.path.split(file_name)
+    prefix = "normalized_" if strategy == "baseline" else f"normalized_{strategy}_"
+    return os.path.join(directory, prefix + base)
+
+
+def read_chunks(path, spec, chunk_rows):
+    """Stream a metrics CSV with explicit dtypes, a zero-byte file reads as one empty chunk"""
+    dtypes = {column: "float64" for column in spec["columns"]}
+    dtypes[DATE_COLUMN] = "string"
+    try:
+        return pd.read_csv(path, dtype=dtypes, chunksize=chunk_rows)
+    except pd.errors.EmptyDataError:
+        columns = [DATE_COLUMN, TIME_COLUMN, *spec["columns"]]
+        return iter([pd.DataFrame({c: pd.Series(dtype=dtypes.get(c, "int64")) for c in columns})])
+
+
+def column_stats(path, spec, strategy, chunk_rows=CHUNK_ROWS):
+    """One streaming pass over the file collecting what the strategy needs per value column
+
+    A file without rows gives count 0 and NaN for every other statistic.
+    """
+    columns = spec["columns"]
+    if strategy == "log":
+        return None
+
+    first = None
+    count = np.zeros(len(columns))
+    mean = np.zeros(len(columns))
+    m2 = np.zeros(len(columns))
+    low = np.full(len(columns), np.inf)
+    high = np.full(len(columns), -np.inf)
+
+    for chunk in read_chunks(path, spec, chunk_rows):
+        values = chunk[columns].to_numpy(dtype=np.float64)
+        if not len(values):
+            continue
+        if first is None:
+            first = values[0]
+            if strategy == "baseline":
+                break
+        low = np.fmin(low, np.nanmin(values, axis=0))
+        high = np.fmax(high, np.nanmax(values, axis=0))
+
+        # Chan et al. parallel merge of (count, mean, M2)
+        n = np.sum(~np.isnan(values), axis=0)
+        with np.errstate(invalid='ignore'):
+            chunk_mean = np.where(n > 0, np.nansum(values, axis=0) / np.maximum(n, 1), 0)
+        chunk_m2 = np.nansum((values - chunk_mean) ** 2, axis=0)
+        total = count + n
+        delta = chunk_mean - mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(total > 0, mean + delta * n / total, 0)
+            m2 = m2 + chunk_m2 + np.where(total > 0, delta ** 2 * count * n / total, 0)
+        count = total
+
+    empty = count == 0
+    if first is None:
+        first = np.full(len(columns), np.nan)
+    std = np.where(empty, np.nan, np.sqrt(m2 / np.maximum(count, 1)))
+    return {
+        "first": first, "count": count,
+        "min": np.where(empty, np.nan, low), "max": np.where(empty, np.nan, high),
+        "mean": np.where(empty, np.nan, mean), "std": std,
+    }
+
+
+def transform(values, strategy, stats):
+    """Apply a normalization strategy to a (rows, columns) float array"""
+    if strategy == "baseline":
+        return values - stats["first"]
+    if strategy == "minmax":
+        span = stats["max"] - stats["min"]
+        return (values - stats["min"]) / np.where(span == 0, 1, span)
+    if strategy == "zscore":
+        return (values - stats["mean"]) / np.where(stats["std"] == 0, 1, stats["std"])
+    if strategy == "log":
+        return np.log1p(np.clip(values, 0, None))
+    raise ValueError(f"unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+
+
+def normalize_file(name, strategy="baseline", chunk_rows=CHUNK_ROWS, root="."):
+    """Normalize one source in two streaming passes (stats, then transform), returns the output path"""
+    spec = SOURCES[name]
+    path = os.path.join(root, spec["file"])
+    out_path = output_path(path, strategy)
+    stats = column_stats(path, spec, strategy, chunk_rows)
+
+    header = True
+    with open(out_path + ".tmp", 'w', newline='') as out:
+        for chunk in read_chunks(path, spec, chunk_rows):
+            chunk[DATE_COLUMN] = pd.to_datetime(chunk[DATE_COLUMN], format=spec["date_format"]).dt.strftime("%Y-%m-%d")
+            values = transform(chunk[spec["columns"]].to_numpy(dtype=np.float64), strategy, stats)
+            chunk[spec["columns"]] = values
+            if strategy == "baseline" and np.all(np.isnan(values) | (values == np.round(values))):
+                # Differences of integer counts stay integers, as the original output had them
+                chunk[spec["columns"]] = chunk[spec["columns"]].astype("Int64")
+            chunk.to_csv(out, index=False, header=header)
+            header = False
+    os.replace(out_path + ".tmp", out_path)
+    return out_path
 
-# Load the CSV
-csv_filename = f"{filename}.csv"
-df = pd.read_csv(csv_filename)
 
-# Convert Date column to datetime for proper handling
-df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+def normalize_all(names, strategies, chunk_rows=CHUNK_ROWS, workers=None, root="."):
+    """Normalize every (source, strategy) pair across a process pool"""
+    jobs = [(name, strategy) for name in names for strategy in strategies]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(normalize_file, name, strategy, chunk_rows, root) for name, strategy in jobs]
+        return [future.result() for future in futures]
 
-# Select only numeric columns (excluding Date(UTC))
-numeric_cols = df.select_dtypes(include="number").columns
 
-# Subtract the first row's values from all numeric columns
-df[numeric_cols] = df[numeric_cols] - df.iloc[0][numeric_cols]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize the metrics CSVs")
+    parser.add_argument('names', nargs='*', help=f"sources to normalize (default: all of {', '.join(SOURCES)})")
+    parser.add_argument('--strategy', default="baseline",
+                        help=f"comma separated, any of {', '.join(STRATEGIES)}")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
 
-# Save the modified CSV
-df.to_csv(f"normalized_{filename}.csv", index=False)
+    strategies = args.strategy.split(",")
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            parser.error(f"unknown strategy {strategy!r}")
 
-print(f"Normalized data saved in 'normalized_{filename}.csv'")
+    for path in normalize_all(args.names or list(SOURCES), strategies, args.chunk_rows, args.workers):
+        print(f"Normalized data saved in '{path}'")
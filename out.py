@@ -1,69 +1,48 @@
-print("""
-Generating suggestions for address : 0x472cAde746560419a407CA7103c87c79c794C418
-
-100% done
-
-https://etherscan.io/address/0x472cade746560419a407ca7103c87c79c794c418
-
-
-Uniswap UniversalRouter
-https://etherscan.io/address/0x3fc91a3afd70395cd496c647d5a6cc9d4b2b7fad
-
-
-Brett Token
-https://etherscan.io/address/0x240d6faf8c3b1a7394e371792a3bf9d28dd65515
-
-
-Rainbow Wallet Swap Aggregator
-https://etherscan.io/address/0x00000000009726632680fb29d3f7a9734e3010e2
-
-
-USDT (Tether USD) Token
-https://etherscan.io/address/0xdac17f958d2ee523a2206206994597c13d831ec7
-
-
-Binance 18
-https://etherscan.io/address/0x9696f59e4d72e237be84ffd425dcad154bf96976
-
-
-Dork Lord (DORKY) Token
-https://etherscan.io/address/0x95ed629b028cf6aadd1408bb988c6d1daabe4767
-
-
-Binance 17
-https://etherscan.io/address/0x56eddb7aa87536c09ccc2793473599fd21a8b17f
-
-
-Uniswap V2Pair for BRETT/WETH
-https://etherscan.io/address/0x16ac64ddfacca437be7fe0da0c45bcd97227588a
-
-https://etherscan.io/address/0xf70da97812cb96acdf810712aa562db8dfa3dbef
-
-https://etherscan.io/address/0x2cfc980B6BeCBF277D8a303D9DcFc307b0EAc1E8
-
-https://etherscan.io/address/0x2233D7F6c351B2dc3d9a32ABF7ed6278FC8e2256
-
-https://etherscan.io/address/0x4d31Ab00Cf5177aa5E61322C5EAe74be35c07521
-
-https://etherscan.io/address/0x565b6F74D0b1621Eac480FF26280cd5E07a1216C
-
-https://etherscan.io/address/0x5f2d2DF3091355A23e3b0ADBd58eD4a00dAD947b
-
-https://etherscan.io/address/0x66F73fEf135B655225B8f04dF4e58f440E7CbC43
-
-https://etherscan.io/address/0x5b42C245153AB68b3aD857b42dc6015B10cc5246
-
-https://etherscan.io/address/0x63a209ff6034eDc64600a0934145aCEB874C9A9a
-
-https://etherscan.io/address/0x5ec2aF7aB4541A131A397DfD4492932a73bEcA99
-
-https://etherscan.io/address/0x6727351829e02086798e14d93E8a0497DD7c9635
-
-https://etherscan.io/address/0x62183c53ED6BdDd272FDa2AB28E94821750bF7ac
-
-https://etherscan.io/address/0x699081F698fC7197fd5033aa766f9a11fE21c018
-
-https://etherscan.io/address/0x652b96699c32669570caa583834DF4E76c4cdc98
-
-https://etherscan.io/address/0x6a7Ef7cD9BdB1479fFfAeD832b5A585221C311CB
-""")
\ No newline at end of file
+import json
+import os
+import sys
+
+from address import checksum, parse
+from recommender import Recommender
+
+INDEX_FILE = "recommender.npz"
+LABELS_FILE = "graph.json"
+
+
+def load_labels(file_path):
+    """Contract labels from graph.json entries shaped like { address: { label, functions } }"""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    return {
+        address.lower(): info["label"]
+        for address, info in data.items()
+        if isinstance(info, dict) and "label" in info
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python out.py <address> [top_n]")
+        sys.exit(1)
+
+    address = sys.argv[1]
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+
+    print(f"\nGenerating suggestions for address : {address}\n")
+
+    model = Recommender.load(INDEX_FILE)
+    labels = load_labels(LABELS_FILE)
+    recommendations = model.recommend([address], top_n=top_n)[address]
+
+    print("100% done\n")
+    # EIP-55 links for the address and every recommendation, checksummed in one batch
+    links = checksum(parse([address] + [contract for contract, _ in recommendations]))
+    print(f"https://etherscan.io/address/{links[0]}\n")
+
+    for (contract, _score), link in zip(recommendations, links[1:]):
+        label = labels.get(contract)
+        if label:
+            print(f"\n{label}")
+        print(f"https://etherscan.io/address/{link}\n")
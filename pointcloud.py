@@ -0,0 +1,122 @@
+import numpy as np
+
+from spatial import OUTLIER_THRESHOLD, SpatialIndex
+
+
+def voxel_decimate(coords, budget, seed=0):
+    """Positions (into the columns of coords) of at most budget points, sampled per voxel in proportion to its count
+
+    Every occupied voxel keeps at least one point, so isolated points and sparse
+    regions survive while dense regions keep their relative density.
+    """
+    dims, n = coords.shape
+    if n <= budget:
+        return np.arange(n)
+    if budget <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    # At most budget / 4 voxels, so the one-per-voxel floor leaves room for proportional sampling
+    cells = max(1, int((budget / 4) ** (1 / dims)))
+    lo = coords.min(axis=1)
+    span = np.maximum(coords.max(axis=1) - lo, 1e-9)
+    keys = np.zeros(n, dtype=np.int64)
+    for axis in range(dims):
+        cell = np.minimum(((coords[axis] - lo[axis]) * (cells / span[axis])).astype(np.int64), cells - 1)
+        keys = keys * cells + cell
+
+    # Group by voxel with a random order inside each voxel
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(n)
+    order = order[np.argsort(keys[order], kind='stable')]
+    _, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    voxels = len(counts)
+    quota = 1 + np.floor((counts - 1) * ((budget - voxels) / max(n - voxels, 1))).astype(np.int64)
+    rank = np.arange(n) - np.repeat(starts, counts)
+    return np.sort(order[rank < np.repeat(quota, counts)])
+
+
+class PointCloud:
+    """Columnar point cloud with lazily cached centroid, distance and core/outer statistics"""
+
+    def __init__(self, points):
+        points = np.asarray(points)
+        if points.ndim != 2 or points.shape[1] not in (2, 3):
+            raise ValueError(f"expected an N x 2 or N x 3 array of points, got shape {points.shape}")
+        # One contiguous (dims, N) block: every axis is a contiguous column
+        self.columns = np.ascontiguousarray(points.T)
+        self._cache = {}
+
+    def __len__(self):
+        return self.columns.shape[1]
+
+    @property
+    def x(self):
+        return self.columns[0]
+
+    @property
+    def y(self):
+        return self.columns[1]
+
+    @property
+    def z(self):
+        return self.columns[2]
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def bounds(self):
+        """(mins, maxs) per axis"""
+        return self._cached('bounds', lambda: (self.columns.min(axis=1), self.columns.max(axis=1)))
+
+    def centroid(self, dims=3):
+        """Mean of the first dims axes"""
+        return self._cached(('centroid', dims), lambda: self.columns[:dims].mean(axis=1))
+
+    def distances(self, dims=3):
+        """Euclidean distance of every point from the centroid over the first dims axes"""
+        def compute():
+            offsets = self.columns[:dims] - self.centroid(dims)[:, None]
+            return np.sqrt(np.einsum('ij,ij->j', offsets, offsets))
+        return self._cached(('distances', dims), compute)
+
+    def split(self, ratio=0.7, dims=3):
+        """(core, outer) indices: points below / at or above ratio of the max centroid distance"""
+        def compute():
+            distances = self.distances(dims)
+            if len(distances) == 0:
+                empty = np.empty(0, dtype=np.int64)
+                return empty, empty
+            outer = distances >= ratio * distances.max()
+            return np.flatnonzero(~outer), np.flatnonzero(outer)
+        return self._cached(('split', ratio, dims), compute)
+
+    def index(self, dims=3):
+        """Spatial index over the first dims axes"""
+        return self._cached(('index', dims), lambda: SpatialIndex(self.columns[:dims].T))
+
+    def local_density(self, k=8, dims=3):
+        """Points per unit volume around each point, from its k nearest neighbours"""
+        return self._cached(('density', k, dims), lambda: self.index(dims).local_density(k))
+
+    def density_outliers(self, k=8, threshold=OUTLIER_THRESHOLD, dims=3):
+        """Indices of points whose local density is below threshold"""
+        return np.flatnonzero(self.local_density(k, dims) < threshold)
+
+    def decimate(self, indices, budget, dims=3, seed=0):
+        """Subset of indices with at most budget points, chosen by voxel_decimate"""
+        indices = np.asarray(indices, dtype=np.int64)
+        return indices[voxel_decimate(self.columns[:dims, indices], budget, seed)]
+
+    def decimate_groups(self, groups, budget, dims=3, seed=0):
+        """Decimate several index groups under one budget, small groups (e.g. outliers) are kept whole first"""
+        shares = [0] * len(groups)
+        remaining = budget
+        order = sorted(range(len(groups)), key=lambda i: len(groups[i]))
+        for position, i in enumerate(order):
+            shares[i] = min(len(groups[i]), remaining // (len(groups) - position))
+            remaining -= shares[i]
+        return [self.decimate(g, share, dims, seed) for g, share in zip(groups, shares)]
@@ -0,0 +1,100 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+# Side of the cube every experiment point lies in, the axis range both experiment.py views use
+EXTENT = 1000
+# Points sampled per step, each step with its own child seed so a file depends only on the seed
+CHUNK = 1 << 20
+
+# experiment.cpp's scene: a radius 30 sphere centred at (280, 830, 180)
+EXPERIMENT_SCENE = {
+    "spheres": [((280, 830, 180), 30, 1.0)],
+    "clusters": [],
+    "noise": 0.0,
+}
+
+
+def random_scene(rng, spheres=3, clusters=5, noise=0.05, extent=EXTENT):
+    """Spheres and Gaussian clusters at random places, noise being the fraction of uniform points"""
+    def centre(margin):
+        return tuple(rng.uniform(margin, extent - margin, 3).round(1))
+
+    sphere_list = [(centre(r), r, rng.uniform(0.5, 2)) for r in rng.uniform(0.03, 0.12, spheres) * extent]
+    cluster_list = [(centre(3 * s), s, rng.uniform(0.5, 2)) for s in rng.uniform(0.01, 0.04, clusters) * extent]
+    return {"spheres": sphere_list, "clusters": cluster_list, "noise": noise}
+
+
+def _components(scene):
+    """(kind, centre, size, weight) per component, and the probability of a point coming from each (noise last)"""
+    components = [("sphere", np.array(c, float), r, w) for c, r, w in scene["spheres"]]
+    components += [("cluster", np.array(c, float), s, w) for c, s, w in scene["clusters"]]
+    shapes = sum(w for *_, w in components)
+    noise = scene.get("noise", 0.0) if shapes else 1.0
+    weights = np.array([w / shapes * (1 - noise) for *_, w in components] + [noise])
+    return components, weights / weights.sum()
+
+
+def sample(rng, n, scene, extent=EXTENT):
+    """(n, 3) int32 points drawn from the scene's mixture, clipped to the cube"""
+    components, weights = _components(scene)
+    which = rng.choice(len(weights), size=n, p=weights)
+    points = np.empty((n, 3))
+    for i, (kind, centre, size, _) in enumerate(components):
+        rows = np.flatnonzero(which == i)
+        if kind == "sphere":
+            # Uniform in the ball: a random direction at radius r * u^(1/3)
+            direction = rng.standard_normal((len(rows), 3))
+            direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+            points[rows] = centre + direction * (size * np.cbrt(rng.random(len(rows))))[:, None]
+        else:
+            points[rows] = rng.normal(centre, size, (len(rows), 3))
+    noise = np.flatnonzero(which == len(components))
+    points[noise] = rng.uniform(0, extent, (len(noise), 3))
+    return np.clip(np.rint(points), 0, extent - 1).astype(np.int32)
+
+
+def generate(path, n, scene=None, seed=0, extent=EXTENT):
+    """Write n points to a .npy file chunk by chunk through a memory map, experiment.load_data reads it directly
+
+    The same seed and scene always give the same file; a random scene is drawn
+    from the seed when none is given.
+    """
+    sequence = np.random.SeedSequence(seed)
+    scene_seed, points_seed = sequence.spawn(2)
+    scene = scene or random_scene(np.random.default_rng(scene_seed), extent=extent)
+    out = np.lib.format.open_memmap(path + ".tmp", mode='w+', dtype='<i4', shape=(n, 3))
+    chunks = range(0, n, CHUNK)
+    for start, child in zip(chunks, points_seed.spawn(len(chunks))):
+        stop = min(start + CHUNK, n)
+        out[start:stop] = sample(np.random.default_rng(child), stop - start, scene, extent)
+    out.flush()
+    del out
+    # Readers only ever see a complete file
+    os.replace(path + ".tmp", path)
+    return scene
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic experiment point clouds (.npy) for scale testing")
+    parser.add_argument('count', type=int, help="number of points")
+    parser.add_argument('--out', default="points.npy")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scene', choices=["random", "experiment"], default="random",
+                        help="random spheres, clusters and noise, or experiment.cpp's single sphere")
+    parser.add_argument('--spheres', type=int, default=3)
+    parser.add_argument('--clusters', type=int, default=5)
+    parser.add_argument('--noise', type=float, default=0.05, help="fraction of uniform background points")
+    args = parser.parse_args()
+
+    if args.scene == "experiment":
+        scene = EXPERIMENT_SCENE
+    else:
+        scene_rng = np.random.default_rng(np.random.SeedSequence(args.seed).spawn(2)[0])
+        scene = random_scene(scene_rng, args.spheres, args.clusters, args.noise)
+    start = time.perf_counter()
+    generate(args.out, args.count, scene, args.seed)
+    print(f"Wrote {args.count} points to {args.out} in {time.perf_counter() - start:.2f}s "
+          f"({len(scene['spheres'])} spheres, {len(scene['clusters'])} clusters, {scene['noise']:.0%} noise)")
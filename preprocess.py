@@ -1,31 +1,38 @@
+import sys
 import pandas as pd
 import plotly.express as px
+from changes import LOG, update_changes
 
-# Load the data
-csv_filename = "normalized_address-count.csv"  # Change this if needed
-df = pd.read_csv(csv_filename)
 
-# Convert Date column to datetime
-df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"])
+def main():
+    """Append new daily changes, then plot the whole log unless --no-plot is given"""
+    # Append daily changes for rows added since the last run
+    added = update_changes()
+    print(f"Appended {added} new daily change(s) to '{LOG}'")
 
-# Calculate daily changes
-df["Daily Change"] = df["Value"].diff()
+    if "--no-plot" in sys.argv:
+        return
 
-# Log daily changes to a new CSV
-df.to_csv("logged_changes.csv", index=False)
+    # Load the logged values and changes for plotting
+    df = pd.read_csv(LOG)
+    df["Date(UTC)"] = pd.to_datetime(df["Date(UTC)"], format="%Y-%m-%d")
 
-# Plot the values over time
-fig1 = px.line(df, x="Date(UTC)", y="Value", title="Value Over Time",
-               markers=True, labels={"Value": "Total Value", "Date(UTC)": "Date"},
-               hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
+    # Plot the values over time
+    fig1 = px.line(df, x="Date(UTC)", y="Value", title="Value Over Time",
+                   markers=True, labels={"Value": "Total Value", "Date(UTC)": "Date"},
+                   hover_data={"Date(UTC)": "|%Y-%m-%d", "Value": ":,"})
 
-# Plot daily changes
-fig2 = px.line(df, x="Date(UTC)", y="Daily Change", title="Daily Change in Value",
-               markers=True, labels={"Daily Change": "Change", "Date(UTC)": "Date"},
-               hover_data={"Date(UTC)": "|%Y-%m-%d", "Daily Change": ":,"})
+    # Plot daily changes
+    fig2 = px.line(df, x="Date(UTC)", y="Daily Change", title="Daily Change in Value",
+                   markers=True, labels={"Daily Change": "Change", "Date(UTC)": "Date"},
+                   hover_data={"Date(UTC)": "|%Y-%m-%d", "Daily Change": ":,"})
 
-# Show the interactive graphs
-fig1.show()
-fig2.show()
+    # Show the interactive graphs
+    fig1.show()
+    fig2.show()
 
-print("Daily changes logged in 'logged_changes.csv'")
+    print(f"Daily changes logged in '{LOG}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from address import AddressBook, parse
+
+
+def load_interactions(file_path):
+    """Load (address, contract) interaction pairs from data.json or a graphGen.ts adjacency
+
+    Returns (book, sender ids, target ids): addresses are interned once in bulk and
+    pairs with a malformed address are dropped.
+    """
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+
+    senders = []
+    targets = []
+    if isinstance(data, dict) and 'transactions' in data:
+        # grab.ts output: { visited, transactions: [{ from: {hash}, to: {hash}, ... }] }
+        for tx in data['transactions']:
+            try:
+                sender = tx['from']['hash']
+                target = tx['to']['hash']
+            except (KeyError, TypeError):
+                continue
+            if sender and target:
+                senders.append(sender)
+                targets.append(target)
+    else:
+        # graphGen.ts output: { from: [to, to, ...] }, entries that aren't edge lists are skipped
+        for sender, neighbours in data.items():
+            if not isinstance(neighbours, list):
+                continue
+            for target in neighbours:
+                if isinstance(target, str) and target:
+                    senders.append(sender)
+                    targets.append(target)
+
+    raw, valid = parse(senders + targets, strict=False)
+    keep = valid[:len(senders)] & valid[len(senders):]
+    if not keep.all():
+        print(f"Skipped {int((~keep).sum())} interactions with malformed addresses")
+    book = AddressBook()
+    ids = book.intern(np.concatenate((raw[:len(senders)][keep], raw[len(senders):][keep])))
+    return book, ids[:int(keep.sum())], ids[int(keep.sum()):]
+
+
+def top_k_per_row(matrix, k):
+    """Positions of the k largest entries of each CSR row as (row ids, ranks, data positions)"""
+    row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    order = np.lexsort((-matrix.data, row_ids))
+    rank = np.arange(len(order)) - matrix.indptr[row_ids[order]]
+    keep = rank < k
+    return row_ids[order[keep]], rank[keep], order[keep]
+
+
+class Recommender:
+    """Item-item co-occurrence recommender over address -> contract interactions
+
+    users and items are AddressBook ids; users are sorted, so a batch of
+    addresses finds its rows with one searchsorted.
+    """
+
+    def __init__(self, book, users, items, interactions, cooccurrence):
+        self.book = book
+        self.users = users
+        self.items = items
+        self.interactions = interactions.tocsr()
+        self.cooccurrence = cooccurrence.tocsr()
+        # Most interacted contracts, used for addresses we have never seen
+        self.popularity = np.asarray((self.interactions > 0).sum(axis=0)).ravel()
+        self.popular = np.argsort(-self.popularity, kind='stable')
+
+    @classmethod
+    def build(cls, book, senders, targets, normalize=True, neighbours=100):
+        """Build the interaction matrix and the item-item co-occurrence index from interned ids"""
+        users, user_idx = np.unique(senders, return_inverse=True)
+        items, item_idx = np.unique(targets, return_inverse=True)
+
+        counts = sp.coo_matrix(
+            (np.ones(len(user_idx), dtype=np.float32), (user_idx, item_idx)),
+            shape=(len(users), len(items)),
+        ).tocsr()
+        counts.sum_duplicates()
+
+        # Co-occurrence counts how many addresses touched both contracts
+        binary = counts.copy()
+        binary.data[:] = 1.0
+        cooccurrence = (binary.T @ binary).tocsr()
+        cooccurrence.setdiag(0)
+        cooccurrence.eliminate_zeros()
+
+        if normalize:
+            # Cosine normalisation so hub contracts (USDT, routers) don't dominate every list
+            item_counts = np.sqrt(np.asarray(binary.sum(axis=0)).ravel())
+            item_counts[item_counts == 0] = 1.0
+            inv = sp.diags(1.0 / item_counts).astype(np.float32)
+            cooccurrence = (inv @ cooccurrence @ inv).tocsr()
+
+        if neighbours:
+            # Keep only each contract's strongest neighbours so batch score rows stay sparse
+            rows, _, kept = top_k_per_row(cooccurrence, neighbours)
+            cooccurrence = sp.csr_matrix(
+                (cooccurrence.data[kept], (rows, cooccurrence.indices[kept])),
+                shape=cooccurrence.shape,
+            )
+
+        # Log-scaled counts so one address spamming a contract doesn't swamp its profile
+        counts.data = np.log1p(counts.data).astype(np.float32)
+        return cls(book, users, items, counts, cooccurrence.astype(np.float32))
+
+    def save(self, file_path):
+        """Save the index as a single .npz file"""
+        x = self.interactions
+        c = self.cooccurrence
+        np.savez(
+            file_path,
+            addresses=self.book.raw.view(np.uint8).reshape(-1, 20),
+            users=self.users,
+            items=self.items,
+            x_data=x.data, x_indices=x.indices, x_indptr=x.indptr,
+            c_data=c.data, c_indices=c.indices, c_indptr=c.indptr,
+        )
+
+    @classmethod
+    def load(cls, file_path):
+        """Load an index written by save()"""
+        with np.load(file_path) as f:
+            users = f['users']
+            items = f['items']
+            x = sp.csr_matrix((f['x_data'], f['x_indices'], f['x_indptr']), shape=(len(users), len(items)))
+            c = sp.csr_matrix((f['c_data'], f['c_indices'], f['c_indptr']), shape=(len(items), len(items)))
+            book = AddressBook(f['addresses']) if 'addresses' in f else None
+        if book is None:
+            # Indexes saved before interning hold unique hex strings; users, interned first, get ids 0..n-1 in order
+            book = AddressBook()
+            users = book.intern(users)
+            items = book.intern(items)
+        return cls(book, users, items, x, c)
+
+    def profiles(self, addresses):
+        """Sparse interaction rows for a list of addresses (empty rows for unknown ones)"""
+        raw, valid = parse(addresses, strict=False)
+        ids = np.where(valid, self.book.lookup(raw), -1)
+        at = np.minimum(np.searchsorted(self.users, ids), max(len(self.users) - 1, 0))
+        known = (ids >= 0) & (len(self.users) > 0) & (self.users[at] == ids)
+        rows = np.where(known, at, -1)
+        sub = self.interactions[rows[known]]
+
+        # Re-expand to one row per address, unknown addresses get an empty row
+        lengths = np.zeros(len(rows), dtype=np.int64)
+        lengths[known] = np.diff(sub.indptr)
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        return sp.csr_matrix((sub.data, sub.indices, indptr), shape=(len(rows), len(self.items)))
+
+    def score_batch(self, profiles, top_n=10):
+        """Score a batch of profiles, returning (item indices, scores) padded with -1 / 0"""
+        scores = (profiles @ self.cooccurrence).tocsr()
+
+        # Drop contracts the address already interacts with
+        seen = profiles.copy()
+        seen.data[:] = 1.0
+        scores = (scores - scores.multiply(seen)).tocsr()
+        scores.eliminate_zeros()
+
+        n_rows = scores.shape[0]
+        top_items = np.full((n_rows, top_n), -1, dtype=np.int64)
+        top_scores = np.zeros((n_rows, top_n), dtype=np.float32)
+
+        rows, rank, kept = top_k_per_row(scores, top_n)
+        top_items[rows, rank] = scores.indices[kept]
+        top_scores[rows, rank] = scores.data[kept]
+
+        # Cold start: fill the slots scoring left empty with the most popular contracts the
+        # address doesn't already use and wasn't already recommended
+        short = np.flatnonzero(top_items[:, -1] == -1)
+        if len(short) and len(self.items):
+            own = profiles[short].tocsr()
+            needed = (top_items[short] == -1).sum(axis=1)
+            # Ranks are filled from 0, so the free slots are each row's last `needed` ones
+            blank = (needed == top_n) & (np.diff(own.indptr) == 0)
+            head = self.popular[:top_n]
+            top_items[short[blank], :len(head)] = head
+            for i in np.flatnonzero(~blank):
+                row = top_items[short[i]]
+                # The first needed + len(exclude) popular contracts always leave enough after exclusion
+                exclude = np.concatenate((own.indices[own.indptr[i]:own.indptr[i + 1]], row[row >= 0]))
+                pool = self.popular[:needed[i] + len(exclude)]
+                fill = pool[~np.isin(pool, exclude)][:needed[i]]
+                row[top_n - needed[i]:top_n - needed[i] + len(fill)] = fill
+        return top_items, top_scores
+
+    def recommend(self, addresses, top_n=10, batch_size=4096):
+        """Recommend top_n contracts for every address, batch_size addresses per sparse product"""
+        items = self.book.hex(self.items).tolist()
+        results = {}
+        for start in range(0, len(addresses), batch_size):
+            batch = addresses[start:start + batch_size]
+            top_items, top_scores = self.score_batch(self.profiles(batch), top_n)
+            for address, item_row, score_row in zip(batch, top_items, top_scores):
+                results[address] = [
+                    (items[i], float(s)) for i, s in zip(item_row, score_row) if i >= 0
+                ]
+        return results
+
+
+def read_addresses(file_path):
+    """Read one address per line, ignoring blanks and # comments"""
+    with open(file_path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch contract recommender")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="build the co-occurrence index")
+    build.add_argument('--input', default='data.json', help="data.json or graph.json adjacency")
+    build.add_argument('--index', default='recommender.npz')
+    build.add_argument('--no-normalize', action='store_true')
+    build.add_argument('--neighbours', type=int, default=100, help="co-occurrence neighbours kept per contract (0 keeps all)")
+
+    rec = sub.add_parser('recommend', help="score addresses against an index")
+    rec.add_argument('--index', default='recommender.npz')
+    rec.add_argument('--addresses', help="file with one address per line (default: every indexed address)")
+    rec.add_argument('--top', type=int, default=10)
+    rec.add_argument('--batch-size', type=int, default=4096)
+    rec.add_argument('--out', default='recommendations.jsonl')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        book, senders, targets = load_interactions(args.input)
+        model = Recommender.build(book, senders, targets, normalize=not args.no_normalize, neighbours=args.neighbours)
+        model.save(args.index)
+        print(f"Indexed {len(targets)} interactions: {len(model.users)} addresses, {len(model.items)} contracts")
+        print(f"Saved index to {args.index} in {time.perf_counter() - start:.2f}s")
+    else:
+        model = Recommender.load(args.index)
+        addresses = read_addresses(args.addresses) if args.addresses else model.book.hex(model.users).tolist()
+        start = time.perf_counter()
+        results = model.recommend(addresses, top_n=args.top, batch_size=args.batch_size)
+        with open(args.out, 'w') as f:
+            for address, recs in results.items():
+                f.write(json.dumps({"address": address, "recommendations": recs}) + "\n")
+        elapsed = time.perf_counter() - start
+        print(f"Scored {len(addresses)} addresses in {elapsed:.2f}s, written to {args.out}")
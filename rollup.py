@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics import DATE_COLUMN, MetricsStore
+from tracing import span
+
+DAY = 86400
+RESOLUTIONS = ("day", "week", "month", "year")
+STATS = ("sum", "min", "max", "count", "last")
+
+
+def bucket_ids(timestamps, resolution):
+    """Integer bucket of every UnixTimeStamp: days, Monday-start weeks, months or years since 1970"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if resolution == "day":
+        return timestamps // DAY
+    if resolution == "week":
+        # 1970-01-01 was a Thursday
+        return (timestamps // DAY + 3) // 7
+    unit = {"month": "M", "year": "Y"}[resolution]
+    return timestamps.astype("datetime64[s]").astype(f"datetime64[{unit}]").astype(np.int64)
+
+
+def bucket_starts(ids, resolution):
+    """Datetime of the first day of every bucket"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if resolution == "day":
+        return pd.to_datetime(ids * DAY, unit="s")
+    if resolution == "week":
+        return pd.to_datetime((ids * 7 - 3) * DAY, unit="s")
+    unit = {"month": "M", "year": "Y"}[resolution]
+    return pd.to_datetime(ids.astype(f"datetime64[{unit}]").astype("datetime64[s]"))
+
+
+def aggregate(timestamps, values, resolution):
+    """(first bucket, stats) of sorted rows, stats holding one dense (buckets, metrics) array per STATS entry
+
+    Buckets with no rows are kept (count 0, NaN min/max/last) so a date maps to
+    its row by subtraction.
+    """
+    ids = bucket_ids(timestamps, resolution)
+    first = int(ids[0])
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    valid = ~np.isnan(values)
+    rows = np.arange(len(values))[:, None]
+    # Last valid row of every group, below the group's start when it has none
+    last_row = np.maximum.reduceat(np.where(valid, rows, -1), starts, axis=0)
+    has_last = last_row >= starts[:, None]
+
+    grouped = {
+        "sum": np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0),
+        "min": np.fmin.reduceat(values, starts, axis=0),
+        "max": np.fmax.reduceat(values, starts, axis=0),
+        "count": np.add.reduceat(valid, starts, axis=0).astype(np.float64),
+        "last": np.where(has_last, values[np.maximum(last_row, 0), np.arange(values.shape[1])], np.nan),
+    }
+    size = int(ids[-1]) - first + 1
+    stats = _empty(size, values.shape[1])
+    for name, array in grouped.items():
+        stats[name][ids[starts] - first] = array
+    return first, stats
+
+
+def _empty(size, width):
+    return {name: np.full((size, width), 0.0 if name in ("sum", "count") else np.nan) for name in STATS}
+
+
+def merge(first, stats, new_first, new_stats):
+    """Fold the stats of newer rows into existing buckets, growing the arrays as needed"""
+    width = stats["sum"].shape[1]
+    start = min(first, new_first)
+    end = max(first + len(stats["sum"]), new_first + len(new_stats["sum"]))
+    merged = _empty(end - start, width)
+    for name in STATS:
+        merged[name][first - start:first - start + len(stats[name])] = stats[name]
+
+    at = slice(new_first - start, new_first - start + len(new_stats["sum"]))
+    merged["sum"][at] += new_stats["sum"]
+    merged["count"][at] += new_stats["count"]
+    merged["min"][at] = np.fmin(merged["min"][at], new_stats["min"])
+    merged["max"][at] = np.fmax(merged["max"][at], new_stats["max"])
+    merged["last"][at] = np.where(new_stats["count"] > 0, new_stats["last"], merged["last"][at])
+    return start, merged
+
+
+class _Index:
+    """Prefix sums and sparse tables over one resolution's buckets, every range statistic in O(1)"""
+
+    def __init__(self, stats):
+        zeros = np.zeros((1, stats["sum"].shape[1]))
+        self.sums = np.concatenate((zeros, np.cumsum(stats["sum"], axis=0)))
+        self.counts = np.concatenate((zeros, np.cumsum(stats["count"], axis=0)))
+        # Bucket holding the latest value at or before each bucket, -1 before the first one
+        positions = np.arange(len(stats["count"]))[:, None]
+        self.latest = np.maximum.accumulate(np.where(stats["count"] > 0, positions, -1), axis=0)
+        self.last = stats["last"]
+        # Level k holds the min/max of 2**k buckets starting at each position
+        self.mins = [stats["min"]]
+        self.maxs = [stats["max"]]
+        while 2 ** len(self.mins) <= len(stats["min"]):
+            half = 2 ** (len(self.mins) - 1)
+            self.mins.append(np.fmin(self.mins[-1][:-half], self.mins[-1][half:]))
+            self.maxs.append(np.fmax(self.maxs[-1][:-half], self.maxs[-1][half:]))
+
+    def range(self, i, j, column):
+        """Statistics of buckets [i, j) for one column"""
+        level = (j - i).bit_length() - 1
+        width = 2 ** level
+        count = self.counts[j, column] - self.counts[i, column]
+        total = self.sums[j, column] - self.sums[i, column]
+        latest = self.latest[j - 1, column]
+        return {
+            "sum": total,
+            "min": np.fmin(self.mins[level][i, column], self.mins[level][j - width, column]),
+            "max": np.fmax(self.maxs[level][i, column], self.maxs[level][j - width, column]),
+            "count": int(count),
+            "last": self.last[latest, column] if latest >= i else np.nan,
+            "mean": total / count if count else np.nan,
+        }
+
+
+class Rollup:
+    """sum/min/max/count/last of every metric per day, week, month and year, persisted next to the metrics cache
+
+    refresh() folds in only the days after the last one seen, unless earlier rows
+    changed; queries then read bucket arrays and never the raw rows.
+    """
+
+    def __init__(self, store=None, cache_dir=".cache"):
+        self.store = store or MetricsStore()
+        self.path = os.path.join(self.store.root, cache_dir, "rollup.npz")
+        self.metrics = []
+        self.through = None
+        self.versions = {}
+        # resolution -> (first bucket id, stats)
+        self.levels = {}
+        self._indexes = {}
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                meta = json.loads(str(data["meta"]))
+                self.levels = {
+                    resolution: (meta["first"][resolution], {name: data[f"{resolution}_{name}"] for name in STATS})
+                    for resolution in RESOLUTIONS
+                }
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Ignoring rollup cache: {e}")
+            return False
+        self.metrics = meta["metrics"]
+        self.through = meta["through"]
+        self.versions = meta["versions"]
+        return True
+
+    def _write(self):
+        meta = {
+            "metrics": self.metrics, "through": self.through, "versions": self.versions,
+            "first": {resolution: first for resolution, (first, _) in self.levels.items()},
+        }
+        arrays = {f"{resolution}_{name}": stats[name]
+                  for resolution, (_, stats) in self.levels.items() for name in STATS}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", 'wb') as f:
+            np.savez(f, meta=json.dumps(meta), **arrays)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _unchanged_through(self, wide):
+        """Whether every row up to `through` still matches the daily buckets"""
+        first, stats = self.levels["day"]
+        old = wide.loc[:self.through]
+        days = bucket_ids(old.index.to_numpy(), "day") - first
+        if len(old) == 0 or days.min() < 0 or days.max() >= len(stats["last"]) or len(np.unique(days)) != len(days):
+            return False
+        values = old.to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.array_equal(values, stats["last"][days], equal_nan=True) and \
+            int((~np.isnan(values)).sum()) == int(stats["count"].sum())
+
+    def refresh(self):
+        """Bring the rollups up to date with the metrics CSVs, returns how many rows were folded in"""
+        versions = self.store.versions()
+        if self._read() and versions == self.versions:
+            return 0
+
+        wide = self.store.load()
+        incremental = bool(self.levels) and list(wide.columns) == self.metrics and self._unchanged_through(wide)
+        rows = wide.loc[wide.index > self.through] if incremental else wide
+        with span("rollup", rows=len(rows), incremental=incremental):
+            if len(rows):
+                timestamps = rows.index.to_numpy()
+                values = rows.to_numpy(dtype=np.float64, na_value=np.nan)
+                for resolution in RESOLUTIONS:
+                    new_first, new_stats = aggregate(timestamps, values, resolution)
+                    if incremental:
+                        self.levels[resolution] = merge(*self.levels[resolution], new_first, new_stats)
+                    else:
+                        self.levels[resolution] = (new_first, new_stats)
+        if not incremental:
+            print(f"Rebuilt rollups from {len(rows)} rows")
+        self.metrics = list(wide.columns)
+        self.through = int(wide.index.max())
+        self.versions = versions
+        self._indexes = {}
+        self._write()
+        return len(rows)
+
+    def _index(self, resolution):
+        if resolution not in self._indexes:
+            self._indexes[resolution] = _Index(self.levels[resolution][1])
+        return self._indexes[resolution]
+
+    def query(self, metric, start=None, end=None, resolution="day"):
+        """sum, min, max, count, last and mean of a metric over the buckets overlapping [start, end], in O(1)"""
+        if not self.levels:
+            self.refresh()
+        column = self.metrics.index(metric)
+        first, stats = self.levels[resolution]
+        size = len(stats["sum"])
+        i = 0 if start is None else int(bucket_ids([pd.Timestamp(start).value // 10 ** 9], resolution)[0]) - first
+        j = size if end is None else int(bucket_ids([pd.Timestamp(end).value // 10 ** 9], resolution)[0]) - first + 1
+        i, j = max(i, 0), min(j, size)
+        if i >= j:
+            return {"sum": 0.0, "min": np.nan, "max": np.nan, "count": 0, "last": np.nan, "mean": np.nan}
+        return self._index(resolution).range(i, j, column)
+
+    def frame(self, metric, resolution="week", stats=("mean",)):
+        """One row per bucket with Date(UTC) at its first day, e.g. weekly means or monthly sums"""
+        if not self.levels:
+            self.refresh()
+        column = self.metrics.index(metric)
+        first, level = self.levels[resolution]
+        df = pd.DataFrame({DATE_COLUMN: bucket_starts(np.arange(first, first + len(level["sum"])), resolution)})
+        for name in stats:
+            if name == "mean":
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    df[name] = level["sum"][:, column] / level["count"][:, column]
+            else:
+                df[name] = level[name][:, column]
+        return df[level["count"][:, column] > 0].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily/weekly/monthly/yearly rollups of the metrics CSVs")
+    parser.add_argument('metric', nargs='?', help="<dataset>/<column>, e.g. deployed-contracts/No. of Deployed Contracts")
+    parser.add_argument('--resolution', choices=RESOLUTIONS, default="month")
+    parser.add_argument('--stats', default="sum,mean,min,max,count,last")
+    parser.add_argument('--start', help="range query start date (inclusive)")
+    parser.add_argument('--end', help="range query end date (inclusive)")
+    args = parser.parse_args()
+
+    rollup = Rollup()
+    folded = rollup.refresh()
+    print(f"{folded} new rows folded in, {len(rollup.metrics)} metrics through "
+          f"{pd.to_datetime(rollup.through, unit='s'):%Y-%m-%d}")
+    if not args.metric:
+        print("\n".join(rollup.metrics))
+    elif args.start or args.end:
+        result = rollup.query(args.metric, args.start, args.end, args.resolution)
+        print(", ".join(f"{name}={value:,.2f}" for name, value in result.items()))
+    else:
+        print(rollup.frame(args.metric, args.resolution, args.stats.split(",")).to_string(index=False))
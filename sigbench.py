@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+from scipy import stats
+
+RESULTS = "sig-bench.json"
+MESSAGE = b"\x42" * 32
+
+
+def _ecdsa(curve_name, hash_name):
+    """ECDSA over a named curve with the cryptography library"""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(getattr(ec, curve_name)())
+    public = key.public_key()
+    algorithm = ec.ECDSA(getattr(hashes, hash_name)())
+    return (lambda message: key.sign(message, algorithm),
+            lambda signature, message: public.verify(signature, message, algorithm))
+
+
+def _eddsa(module_name, class_name):
+    """Ed25519 / Ed448 with the cryptography library"""
+    from importlib import import_module
+
+    key = getattr(import_module(f"cryptography.hazmat.primitives.asymmetric.{module_name}"), class_name).generate()
+    public = key.public_key()
+    return key.sign, lambda signature, message: public.verify(signature, message)
+
+
+def _schnorr():
+    """BIP-340 Schnorr over secp256k1 with coincurve"""
+    from coincurve import PrivateKey, PublicKeyXOnly
+
+    key = PrivateKey()
+    public = PublicKeyXOnly.from_secret(key.secret)
+
+    def verify(signature, message):
+        if not public.verify(signature, message):
+            raise ValueError("invalid signature")
+
+    return key.sign_schnorr, verify
+
+
+# Same algorithms, in the same order, as me.py's chart
+ALGORITHMS = {
+    "ECDSA (secp256k1)": lambda: _ecdsa("SECP256K1", "SHA256"),
+    "ECDSA (secp256r1)": lambda: _ecdsa("SECP256R1", "SHA256"),
+    "Ed25519": lambda: _eddsa("ed25519", "Ed25519PrivateKey"),
+    "Ed448": lambda: _eddsa("ed448", "Ed448PrivateKey"),
+    "ECDSA (secp384r1)": lambda: _ecdsa("SECP384R1", "SHA384"),
+    "Schnorr (BIP-340)": _schnorr,
+}
+
+
+def operations(name):
+    """{'sign': fn(), 'verify': fn()} closures over a fresh key for one algorithm"""
+    sign, verify = ALGORITHMS[name]()
+    signature = sign(MESSAGE)
+    return {"sign": lambda: sign(MESSAGE), "verify": lambda: verify(signature, MESSAGE)}
+
+
+def run_for(op, seconds):
+    """Call op repeatedly for at least `seconds`, returns ops/sec"""
+    count = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            op()
+        count += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+        # Grow the batch so the clock isn't read on every call of a fast op
+        batch = min(batch * 2, 1024)
+
+
+def summarize(rates, confidence=0.95):
+    """Mean, sample stdev and the confidence-interval half-width of repeated ops/sec measurements"""
+    mean = statistics.fmean(rates)
+    stdev = statistics.stdev(rates) if len(rates) > 1 else 0.0
+    half_width = stats.t.ppf((1 + confidence) / 2, len(rates) - 1) * stdev / len(rates) ** 0.5 if len(rates) > 1 else 0.0
+    return {"mean": mean, "stdev": stdev, "ci": half_width, "confidence": confidence, "runs": rates}
+
+
+def measure(name, kind, warmup=0.5, repeats=10, seconds=0.5):
+    """Single-process ops/sec of one algorithm operation over `repeats` timed runs after a warmup"""
+    op = operations(name)[kind]
+    run_for(op, warmup)
+    return summarize([run_for(op, seconds) for _ in range(repeats)])
+
+
+def _worker(name, kind, warmup, seconds):
+    op = operations(name)[kind]
+    run_for(op, warmup)
+    return run_for(op, seconds)
+
+
+def measure_parallel(name, kind, workers, warmup=0.5, seconds=2.0):
+    """Aggregate ops/sec of `workers` processes running the operation at the same time"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rates = list(pool.map(_worker, [name] * workers, [kind] * workers, [warmup] * workers, [seconds] * workers))
+    return {"workers": workers, "ops_per_sec": sum(rates), "per_worker": rates}
+
+
+def machine():
+    """Where the numbers were measured"""
+    versions = {}
+    for package in ("cryptography", "coincurve"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "libraries": versions,
+    }
+
+
+def benchmark(names, warmup=0.5, repeats=10, seconds=0.5, workers=None, parallel_seconds=2.0):
+    """Benchmark every algorithm, algorithms whose library isn't installed are recorded as skipped"""
+    workers = workers or os.cpu_count() or 1
+    results = []
+    for name in names:
+        try:
+            operations(name)
+        except ImportError as e:
+            print(f"{name}: skipped ({e})")
+            results.append({"algorithm": name, "skipped": str(e)})
+            continue
+
+        entry = {"algorithm": name}
+        for kind in ("sign", "verify"):
+            entry[kind] = measure(name, kind, warmup, repeats, seconds)
+            if workers > 1:
+                entry[f"{kind}_parallel"] = measure_parallel(name, kind, workers, warmup, parallel_seconds)
+        print(f"{name}: sign {entry['sign']['mean']:.0f} ± {entry['sign']['ci']:.0f} ops/sec, "
+              f"verify {entry['verify']['mean']:.0f} ± {entry['verify']['ci']:.0f} ops/sec")
+        results.append(entry)
+
+    return {
+        "machine": machine(),
+        "settings": {"warmup": warmup, "repeats": repeats, "seconds": seconds,
+                     "workers": workers, "parallel_seconds": parallel_seconds},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Signing/verification benchmark for me.py")
+    parser.add_argument('algorithms', nargs='*', help=f"subset of: {', '.join(ALGORITHMS)}")
+    parser.add_argument('--out', default=RESULTS)
+    parser.add_argument('--warmup', type=float, default=0.5, help="seconds of untimed calls first")
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=0.5, help="length of each timed run")
+    parser.add_argument('--workers', type=int, default=None, help="processes for the throughput run (default: all cores)")
+    parser.add_argument('--parallel-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    for name in args.algorithms:
+        if name not in ALGORITHMS:
+            parser.error(f"unknown algorithm {name!r}")
+
+    report = benchmark(args.algorithms or list(ALGORITHMS), args.warmup, args.repeats, args.seconds,
+                       args.workers, args.parallel_seconds)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved in '{args.out}'")
@@ -0,0 +1,374 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+from address import AddressBook, as_bytes, as_keys, parse
+from recommender import load_interactions
+
+# Dimensions of each embedding block and how much each block counts towards similarity
+BLOCK_DIM = 128
+WEIGHTS = {"functions": 1.0, "label": 0.5, "neighbours": 1.0}
+DIM = BLOCK_DIM * len(WEIGHTS)
+# LSH tables and hyperplanes (bits) per table
+TABLES = 20
+BITS = 16
+# Extra buckets probed per table, by flipping the least certain bits
+PROBES = 2
+# Indexes this small are searched exactly, hashing would only lose neighbours
+EXACT_BELOW = 10000
+# Candidate pairs scored per slice
+SCORE_CHUNK = 1 << 16
+DEFAULT_INDEX = "similar-index"
+
+
+def _tokens(functions):
+    """Function names plus their camelCase/snake_case words, so claimRewards and claim overlap"""
+    tokens = set()
+    for name in functions:
+        name = str(name).split("(")[0]
+        tokens.add("fn:" + name.lower())
+        tokens.update("word:" + w.lower() for w in re.findall(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])", name))
+    return tokens
+
+
+def _hashed(tokens):
+    """Signed feature hashing of string tokens into one BLOCK_DIM vector"""
+    vector = np.zeros(BLOCK_DIM, dtype=np.float32)
+    for token in tokens:
+        h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+        vector[h % BLOCK_DIM] += 1.0 if h >> 63 else -1.0
+    return vector
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def load_contracts(file_path):
+    """{address: {functions, label}} entries of a graph.json, the ones that describe contracts"""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    return {address: info for address, info in data.items() if isinstance(info, dict)}
+
+
+def embed(book, contracts=None, interactions=None):
+    """Unit-length float32 embeddings, one row per book id
+
+    contracts maps hex addresses to {functions, label} (graph.json); interactions
+    is (sender ids, contract ids) over the same book, and makes contracts used by
+    the same addresses similar. Each block is normalised on its own and weighted,
+    so a contract with no labels is still placed by its neighbourhood.
+    """
+    contracts = contracts or {}
+    ids = book.intern(list(contracts)) if contracts else []
+    blocks = {name: np.zeros((len(book), BLOCK_DIM), dtype=np.float32) for name in WEIGHTS}
+    for row, info in zip(ids, contracts.values()):
+        blocks["functions"][row] = _hashed(_tokens(info.get("functions", [])))
+        if info.get("label"):
+            blocks["label"][row] = _hashed({"label:" + str(info["label"]).lower()})
+
+    if interactions is not None:
+        senders, targets = interactions
+        # Distinct (contract, sender) pairs, each sender hashed by its address bytes
+        pairs = np.unique(np.stack((targets, senders), axis=1).astype(np.int64), axis=0)
+        # Low 8 bytes, multiplicatively mixed: vanity addresses share their leading zero bytes
+        low = as_bytes(book.raw[pairs[:, 1]])[:, 12:].copy().view('<u8').ravel()
+        with np.errstate(over='ignore'):
+            h = low * np.uint64(0x9E3779B97F4A7C15)
+        signs = np.where(h >> np.uint64(63), 1.0, -1.0).astype(np.float32)
+        buckets = ((h >> np.uint64(32)) % np.uint64(BLOCK_DIM)).astype(np.int64)
+        np.add.at(blocks["neighbours"], (pairs[:, 0], buckets), signs)
+
+    return _normalize(np.hstack([_normalize(blocks[name]) * np.sqrt(weight) for name, weight in WEIGHTS.items()]))
+
+
+class LSHIndex:
+    """Random-hyperplane LSH over unit vectors: TABLES tables of BITS-bit sign codes, candidates reranked by cosine
+
+    Every table keeps its codes sorted, so a batch of queries finds its buckets
+    with searchsorted. Queries also probe the buckets across their least certain
+    hyperplanes, where near neighbours that hashed differently most likely are.
+    """
+
+    def __init__(self, dim=DIM, tables=TABLES, bits=BITS, seed=0, planes=None):
+        rng = np.random.default_rng(seed)
+        self.planes = planes if planes is not None else rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.keys = np.empty(0, dtype="S20")
+        self.vectors = np.empty((0, self.planes.shape[2]), dtype=np.float32)
+        self.codes = np.empty((0, self.planes.shape[0]), dtype=np.int64)
+        self.sorted_codes = np.empty((self.planes.shape[0], 0), dtype=np.int64)
+        self.order = np.empty((self.planes.shape[0], 0), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def _project(self, vectors):
+        return np.einsum('tbd,nd->ntb', self.planes, np.asarray(vectors, dtype=np.float32))
+
+    def _codes(self, projections):
+        return ((projections > 0).astype(np.int64) << np.arange(self.planes.shape[1], dtype=np.int64)).sum(axis=2)
+
+    def hash(self, vectors):
+        """(n, tables) integer codes, bit b set when the vector is on the positive side of hyperplane b"""
+        return self._codes(self._project(vectors))
+
+    def add(self, keys, vectors):
+        """Insert a batch, merging its codes into every table's sorted order; returns the row of every key
+
+        A key that is already indexed keeps its row and gets the new vector, and
+        within a batch the last vector given for a key wins.
+        """
+        keys = np.asarray(keys, dtype="S20")
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        unique, first_reversed, inverse = np.unique(keys[::-1], return_index=True, return_inverse=True)
+        # New keys are numbered in batch order
+        last = len(keys) - 1 - first_reversed
+        by_position = np.argsort(last, kind='stable')
+        keys, vectors = unique[by_position], vectors[last[by_position]]
+        position = np.empty(len(unique), dtype=np.int64)
+        position[by_position] = np.arange(len(unique))
+        codes = self.hash(vectors)
+
+        rows = AddressBook(self.keys).lookup(keys).astype(np.int64) if len(self) else np.full(len(keys), -1)
+        fresh = rows < 0
+        rows[fresh] = np.arange(len(self), len(self) + int(fresh.sum()))
+        replaced = rows[~fresh]
+
+        size = len(self) + int(fresh.sum())
+        sorted_codes = np.empty((len(self.planes), size), dtype=np.int64)
+        order = np.empty_like(sorted_codes)
+        for t in range(len(self.planes)):
+            # Replaced rows leave the table and come back in with their new codes
+            kept = ~np.isin(self.order[t], replaced) if len(replaced) else slice(None)
+            new_order = np.argsort(codes[:, t], kind='stable')
+            at = np.searchsorted(self.sorted_codes[t][kept], codes[new_order, t], side='right')
+            sorted_codes[t] = np.insert(self.sorted_codes[t][kept], at, codes[new_order, t])
+            order[t] = np.insert(self.order[t][kept], at, rows[new_order])
+        self.sorted_codes = sorted_codes
+        self.order = order
+        self.keys = np.concatenate((self.keys, keys[fresh]))
+        self.vectors = np.concatenate((self.vectors, vectors[fresh]))
+        self.codes = np.concatenate((self.codes, codes[fresh]))
+        if len(replaced):
+            self.vectors[replaced] = vectors[~fresh]
+            self.codes[replaced] = codes[~fresh]
+        # Back to the caller's order, duplicates sharing a row
+        return rows[position[inverse.ravel()]][::-1]
+
+    def candidates(self, queries, probes=PROBES):
+        """(query index, row) pairs sharing a bucket with each query in any table, deduplicated
+
+        Besides its own bucket, each query probes the buckets reached by flipping
+        each of its `probes` least certain bits (the projections nearest zero).
+        """
+        projections = self._project(queries)
+        codes = self._codes(projections)
+        # (n, tables, probes + 1) codes to look up, the query's own first
+        uncertain = np.argsort(np.abs(projections), axis=2)[:, :, :probes]
+        lookups = np.concatenate((codes[:, :, None], codes[:, :, None] ^ (1 << uncertain)), axis=2)
+        query_parts = []
+        row_parts = []
+        for t in range(len(self.planes)):
+            probe_codes = lookups[:, t].ravel()
+            lo = np.searchsorted(self.sorted_codes[t], probe_codes, side='left')
+            hi = np.searchsorted(self.sorted_codes[t], probe_codes, side='right')
+            counts = hi - lo
+            query_parts.append(np.repeat(np.arange(len(probe_codes)) // lookups.shape[2], counts))
+            # Positions lo..hi-1 of every lookup, laid end to end
+            starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+            row_parts.append(self.order[t][starts + np.arange(counts.sum())])
+        pairs = np.unique(np.concatenate(query_parts) * len(self) + np.concatenate(row_parts))
+        return pairs // len(self), pairs % len(self)
+
+    def query(self, queries, k=10, probes=PROBES):
+        """(rows, similarities) of the k most similar indexed vectors per query, padded with -1 / nan"""
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        top_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        top_scores = np.full((len(queries), k), np.nan, dtype=np.float32)
+        if len(self) == 0:
+            return top_rows, top_scores
+        if len(self) <= EXACT_BELOW:
+            rows, scores = self.exact(queries, k)
+            top_rows[:, :rows.shape[1]] = rows
+            top_scores[:, :rows.shape[1]] = scores
+            return top_rows, top_scores
+        query_ids, rows = self.candidates(queries, probes)
+        scores = np.empty(len(rows), dtype=np.float32)
+        # Scored in slices so the gathered vectors stay small however many candidates there are
+        for start in range(0, len(rows), SCORE_CHUNK):
+            part = slice(start, start + SCORE_CHUNK)
+            scores[part] = np.einsum('nd,nd->n', queries[query_ids[part]], self.vectors[rows[part]])
+        # Best first within each query, then the first k of every run
+        order = np.lexsort((-scores, query_ids))
+        query_ids, rows, scores = query_ids[order], rows[order], scores[order]
+        run_starts = np.searchsorted(query_ids, np.arange(len(queries)))
+        rank = np.arange(len(query_ids)) - run_starts[query_ids]
+        keep = rank < k
+        top_rows[query_ids[keep], rank[keep]] = rows[keep]
+        top_scores[query_ids[keep], rank[keep]] = scores[keep]
+        return top_rows, top_scores
+
+    def exact(self, queries, k=10, batch_size=128):
+        """Brute-force top k, what query() approximates"""
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        k = min(k, len(self))
+        top_rows = np.empty((len(queries), k), dtype=np.int64)
+        top_scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), batch_size):
+            scores = queries[start:start + batch_size] @ np.asarray(self.vectors).T
+            rows = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            rows = np.take_along_axis(rows, np.argsort(-np.take_along_axis(scores, rows, axis=1), axis=1), axis=1)
+            top_rows[start:start + batch_size] = rows
+            top_scores[start:start + batch_size] = np.take_along_axis(scores, rows, axis=1)
+        return top_rows, top_scores
+
+    def save(self, directory):
+        """One .npy per array, so load() can memory-map them"""
+        os.makedirs(directory, exist_ok=True)
+        arrays = {"planes": self.planes, "keys": as_bytes(self.keys), "vectors": self.vectors, "codes": self.codes,
+                  "sorted_codes": self.sorted_codes, "order": self.order}
+        for name, array in arrays.items():
+            path = os.path.join(directory, name + ".npy")
+            with open(path + ".tmp", 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved index; memory-mapped arrays are paged in on demand and copied only on the next add()"""
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mode)
+                  for name in ("planes", "keys", "vectors", "codes", "sorted_codes", "order")}
+        index = cls(planes=np.asarray(arrays["planes"]))
+        index.keys = np.asarray(arrays["keys"]).view("S20").ravel()
+        for name in ("vectors", "codes", "sorted_codes", "order"):
+            setattr(index, name, arrays[name])
+        return index
+
+
+def embed_contracts(labels_path, interactions_path=None):
+    """(keys, vectors) of every labelled and every interacted-with contract"""
+    contracts = load_contracts(labels_path)
+    if interactions_path and os.path.exists(interactions_path):
+        book, senders, targets = load_interactions(interactions_path)
+        interactions = (senders, targets)
+        contract_ids = np.unique(targets)
+    else:
+        book, interactions, contract_ids = AddressBook(), None, np.empty(0, dtype=np.int64)
+
+    raw, valid = parse(list(contracts), strict=False)
+    if not valid.all():
+        print(f"Skipped {int((~valid).sum())} malformed addresses in {labels_path}")
+    contracts = {address: info for address, info, ok in zip(contracts, contracts.values(), valid) if ok}
+    vectors = embed(book, contracts, interactions)
+    contract_ids = np.union1d(contract_ids, book.lookup(raw[valid]))
+    return book.raw[contract_ids], vectors[contract_ids]
+
+
+def build(labels_path, interactions_path=None):
+    """Embed every labelled and every interacted-with contract and index them"""
+    index = LSHIndex()
+    index.add(*embed_contracts(labels_path, interactions_path))
+    return index
+
+
+def recall(index, sample=200, k=10, seed=0):
+    """Fraction of the exact top k found by query() over a random sample of indexed vectors"""
+    rows = np.random.default_rng(seed).choice(len(index), min(sample, len(index)), replace=False)
+    queries = np.asarray(index.vectors[rows])
+    approx, _ = index.query(queries, k)
+    exact, _ = index.exact(queries, k)
+    return np.mean([len(set(a[a >= 0]) & set(e)) / len(e) for a, e in zip(approx, exact)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Similar-contract search over function, label and neighbourhood embeddings")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    b = sub.add_parser('build', help="embed contracts and build the LSH index")
+    b.add_argument('--labels', default="graph.json")
+    b.add_argument('--interactions', default="data.json", help="data.json or graphGen.ts adjacency, if present")
+    b.add_argument('--index', default=DEFAULT_INDEX)
+
+    q = sub.add_parser('query', help="contracts most similar to the given ones")
+    q.add_argument('addresses', nargs='+')
+    q.add_argument('--index', default=DEFAULT_INDEX)
+    q.add_argument('--top', type=int, default=10)
+
+    a = sub.add_parser('add', help="embed contracts and insert them into a saved index, replacing ones already in it")
+    a.add_argument('addresses', nargs='*', help="contracts to insert (default: every contract in the inputs)")
+    a.add_argument('--labels', default="graph.json")
+    a.add_argument('--interactions', default="data.json", help="data.json or graphGen.ts adjacency, if present")
+    a.add_argument('--index', default=DEFAULT_INDEX)
+
+    s = sub.add_parser('bench', help="query speed and recall against exact search on random contracts")
+    s.add_argument('--contracts', type=int, default=300_000)
+    s.add_argument('--queries', type=int, default=1000)
+    s.add_argument('--top', type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        index = build(args.labels, args.interactions)
+        index.save(args.index)
+        print(f"Indexed {len(index)} contracts in {time.perf_counter() - start:.2f}s, saved to {args.index}")
+    elif args.command == 'add':
+        start = time.perf_counter()
+        keys, vectors = embed_contracts(args.labels, args.interactions)
+        if args.addresses:
+            given = np.unique(as_keys(parse(args.addresses)))
+            wanted = np.isin(keys, given)
+            if wanted.sum() < len(given):
+                print(f"{len(given) - int(wanted.sum())} of the given addresses aren't in {args.labels} or {args.interactions}")
+            keys, vectors = keys[wanted], vectors[wanted]
+        index = LSHIndex.load(args.index)
+        before = len(index)
+        index.add(keys, vectors)
+        index.save(args.index)
+        print(f"Added {len(index) - before} and replaced {len(keys) - (len(index) - before)} contracts "
+              f"in {time.perf_counter() - start:.2f}s, {len(index)} indexed")
+    elif args.command == 'query':
+        index = LSHIndex.load(args.index)
+        raw = parse(args.addresses)
+        book = AddressBook(index.keys)
+        rows = book.lookup(raw)
+        for address, row in zip(args.addresses, rows):
+            if row < 0:
+                print(f"{address} is not indexed")
+                continue
+            found, scores = index.query(index.vectors[row], args.top + 1)
+            print(f"\nSimilar to {address}:")
+            matches = [(match, score) for match, score in zip(book.checksummed(found[0][found[0] >= 0]), scores[0])
+                       if match.lower() != address.lower()]
+            for match, score in matches[:args.top]:
+                print(f"  {score:.3f}  {match}")
+    else:
+        rng = np.random.default_rng(0)
+        # Clustered vectors, so there are real neighbourhoods to find
+        centres = rng.standard_normal((args.contracts // 50, DIM)).astype(np.float32)
+        vectors = centres[rng.integers(0, len(centres), args.contracts)]
+        vectors += 0.5 * rng.standard_normal(vectors.shape).astype(np.float32)
+        keys = rng.integers(0, 256, (args.contracts, 20), dtype=np.uint8).view("S20").ravel()
+
+        start = time.perf_counter()
+        index = LSHIndex()
+        index.add(keys, vectors)
+        print(f"Indexed {len(index)} vectors in {time.perf_counter() - start:.2f}s")
+        queries = vectors[rng.choice(args.contracts, args.queries, replace=False)]
+        start = time.perf_counter()
+        index.query(queries, args.top)
+        approx = time.perf_counter() - start
+        start = time.perf_counter()
+        index.exact(queries, args.top)
+        exact = time.perf_counter() - start
+        print(f"{args.queries} queries: LSH {approx * 1000:.0f} ms, exact {exact * 1000:.0f} ms, "
+              f"recall@{args.top} {recall(index, args.queries, args.top):.3f}")
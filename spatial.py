@@ -0,0 +1,132 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Local density (points per unit volume) below which a point counts as an outlier, set in market.bat
+OUTLIER_THRESHOLD = float(os.environ.get("OUTLIER_THRESHOLD", "0.000002517"))
+
+# Points per shard before the index is split into more slabs
+SHARD_SIZE = 250_000
+
+
+def ball_volume(radius, dims):
+    """Volume of a dims-dimensional ball"""
+    return math.pi ** (dims / 2) / math.gamma(dims / 2 + 1) * radius ** dims
+
+
+class SpatialIndex:
+    """Exact k-NN and radius queries over KD-trees built in parallel on slabs along the X axis"""
+
+    def __init__(self, points, shards=None, leafsize=32, workers=None):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        n, self.dims = self.points.shape
+        self.workers = workers or os.cpu_count() or 1
+        shards = shards or max(1, min(n // SHARD_SIZE, 4 * self.workers))
+
+        # Slabs of (roughly) equal size along X, each gets its own tree; an empty cloud has none
+        order = np.argsort(self.points[:, 0], kind='stable')
+        self.members = [m for m in np.array_split(order, shards) if len(m)]
+        self.lo = np.array([self.points[m[0], 0] for m in self.members])
+        self.hi = np.array([self.points[m[-1], 0] for m in self.members])
+
+        with ThreadPoolExecutor(self.workers) as pool:
+            self.trees = list(pool.map(
+                lambda m: cKDTree(self.points[m], leafsize=leafsize, balanced_tree=False, compact_nodes=False),
+                self.members,
+            ))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _home_shards(self, queries):
+        if not self.trees:
+            return np.full(len(queries), -1)
+        return np.clip(np.searchsorted(self.lo, queries[:, 0], side='right') - 1, 0, len(self.trees) - 1)
+
+    def _gap(self, shard, queries):
+        """Distance along X from each query to a shard's slab"""
+        return np.maximum(np.maximum(self.lo[shard] - queries[:, 0], queries[:, 0] - self.hi[shard]), 0)
+
+    def _query_tree(self, shard, queries, k, bound=np.inf):
+        distances, local = self.trees[shard].query(queries, k=k, distance_upper_bound=bound, workers=-1)
+        distances = distances.reshape(len(queries), k)
+        local = local.reshape(len(queries), k)
+        # Missing neighbours come back as index n; map them to -1 and keep inf distances
+        found = local < len(self.members[shard])
+        indices = np.full(local.shape, -1, dtype=np.int64)
+        indices[found] = self.members[shard][local[found]]
+        return distances, indices
+
+    def knn(self, queries, k):
+        """(distances, indices) of the k nearest points to every query, nearest first"""
+        queries = np.ascontiguousarray(queries, dtype=np.float64).reshape(-1, self.dims)
+        distances = np.full((len(queries), k), np.inf)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        home = self._home_shards(queries)
+
+        for shard in range(len(self.trees)):
+            rows = np.flatnonzero(home == shard)
+            if len(rows):
+                distances[rows], indices[rows] = self._query_tree(shard, queries[rows], k)
+
+        # Neighbouring slabs only matter for queries whose k-th distance reaches across the boundary
+        for shard in range(len(self.trees)):
+            rows = np.flatnonzero((home != shard) & (self._gap(shard, queries) < distances[:, -1]))
+            if not len(rows):
+                continue
+            bound = distances[rows, -1]
+            d, i = self._query_tree(shard, queries[rows], k, bound=bound.max())
+            merged_d = np.concatenate((distances[rows], d), axis=1)
+            merged_i = np.concatenate((indices[rows], i), axis=1)
+            best = np.argsort(merged_d, axis=1, kind='stable')[:, :k]
+            distances[rows] = np.take_along_axis(merged_d, best, axis=1)
+            indices[rows] = np.take_along_axis(merged_i, best, axis=1)
+        return distances, indices
+
+    def radius(self, queries, r):
+        """Indices of the points within r of every query, as a list of arrays"""
+        queries = np.ascontiguousarray(queries, dtype=np.float64).reshape(-1, self.dims)
+        parts = [[] for _ in range(len(queries))]
+        for shard in range(len(self.trees)):
+            rows = np.flatnonzero(self._gap(shard, queries) <= r)
+            if not len(rows):
+                continue
+            hits = self.trees[shard].query_ball_point(queries[rows], r, workers=-1, return_sorted=False)
+            members = self.members[shard]
+            for row, local in zip(rows, hits):
+                if local:
+                    parts[row].append(members[local])
+        return [np.concatenate(p) if p else np.empty(0, dtype=np.int64) for p in parts]
+
+    def count_radius(self, queries, r):
+        """Number of points within r of every query"""
+        queries = np.ascontiguousarray(queries, dtype=np.float64).reshape(-1, self.dims)
+        counts = np.zeros(len(queries), dtype=np.int64)
+        for shard in range(len(self.trees)):
+            rows = np.flatnonzero(self._gap(shard, queries) <= r)
+            if len(rows):
+                counts[rows] += self.trees[shard].query_ball_point(queries[rows], r, workers=-1, return_length=True)
+        return counts
+
+    def local_density(self, k=8, batch_size=1_000_000):
+        """Points per unit volume in the ball reaching each point's k-th nearest neighbour"""
+        densities = np.empty(len(self.points))
+        for start in range(0, len(self.points), batch_size):
+            batch = self.points[start:start + batch_size]
+            # k + 1 because every point is its own nearest neighbour
+            distances, _ = self.knn(batch, k + 1)
+            reach = np.maximum(distances[:, -1], 1e-12)
+            densities[start:start + batch_size] = k / ball_volume(reach, self.dims)
+        return densities
+
+    def outlier_scores(self, k=8):
+        """Median local density over each point's own, > 1 means sparser than a typical point"""
+        densities = self.local_density(k)
+        return np.median(densities) / densities
+
+    def outliers(self, k=8, threshold=OUTLIER_THRESHOLD):
+        """Mask of points whose local density falls below threshold"""
+        return self.local_density(k) < threshold
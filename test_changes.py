@@ -0,0 +1,27 @@
+import pandas as pd
+
+from changes import CHANGE_COLUMN, update_changes
+
+
+def write_source(path, values):
+    rows = [f"2024-01-{day:02d},{1704067200 + (day - 1) * 86400},{value}" for day, value in enumerate(values, 1)]
+    path.write_text("Date(UTC),UnixTimeStamp,Value\n" + "".join(row + "\n" for row in rows))
+
+
+def test_appended_rows_continue_the_log(tmp_path):
+    source, log = tmp_path / "source.csv", str(tmp_path / "changes.csv")
+    write_source(source, [10, 15, 12])
+    assert update_changes(str(source), log) == 3
+    write_source(source, [10, 15, 12, 20])
+    assert update_changes(str(source), log) == 1
+    assert pd.read_csv(log)[CHANGE_COLUMN].tolist()[1:] == [5, -3, 8]
+
+
+def test_rewritten_history_rebuilds_the_log(tmp_path):
+    source, log = tmp_path / "source.csv", str(tmp_path / "changes.csv")
+    write_source(source, [10, 15, 12])
+    update_changes(str(source), log)
+    # Same-size edit of an old row plus a new row: not shorter, same header
+    write_source(source, [10, 11, 12, 20])
+    assert update_changes(str(source), log) == 4
+    assert pd.read_csv(log)[CHANGE_COLUMN].tolist()[1:] == [1, 1, 8]
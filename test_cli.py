@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+import time
+
+from cli import COMMANDS, HEAVY_MODULES, STARTUP_BUDGET
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_help_starts_within_budget():
+    # Best of a few runs so a cold disk cache doesn't fail the check
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "cli.py", "--help"], cwd=HERE, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert result.returncode == 0
+    assert all(command in result.stdout for command in COMMANDS)
+    assert best < STARTUP_BUDGET, f"cli.py --help took {best * 1000:.0f} ms"
+
+
+def test_import_loads_no_heavy_modules():
+    code = f"import sys, cli; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    leaked = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert leaked.stdout.strip() == ""
@@ -0,0 +1,33 @@
+import socket
+
+from codecache import CodeCache, serve_stub
+
+CONTRACT = "0x" + "12" * 20
+EOA = "0x" + "34" * 20
+
+
+def test_classify_against_stub(tmp_path):
+    server = serve_stub(0, [CONTRACT])
+    try:
+        cache = CodeCache(str(tmp_path / "cache.sqlite"), f"http://127.0.0.1:{server.server_address[1]}")
+        assert cache.classify_sync([CONTRACT, EOA, "0x"]) == {CONTRACT: True, EOA: False, "0x": None}
+        assert len(cache) == 2
+    finally:
+        server.shutdown()
+
+
+def test_failed_lookups_stay_unresolved(tmp_path):
+    # A port nothing listens on
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cache = CodeCache(str(tmp_path / "cache.sqlite"), f"http://127.0.0.1:{port}")
+    assert cache.classify_sync([CONTRACT, EOA]) == {CONTRACT: None, EOA: None}
+    assert len(cache) == 0
+
+    server = serve_stub(0, [CONTRACT])
+    try:
+        cache.rpc_url = f"http://127.0.0.1:{server.server_address[1]}"
+        assert cache.classify_sync([CONTRACT, EOA]) == {CONTRACT: True, EOA: False}
+    finally:
+        server.shutdown()
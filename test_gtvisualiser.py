@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("graph_tool")
+
+import gtVisualiser as gv
+
+
+def _write(path, edges):
+    with open(path, 'w') as f:
+        f.write("graph G {\n" + "".join(f'\t"0x{u:040x}" -- "0x{v:040x}";\n' for u, v in edges) + "}")
+
+
+def _same_as_full_parse(path):
+    nodes, src, dst = gv.load_edges(path)
+    full = gv.parse_dot(path)
+    return (nodes == full[0]).all() and (src == full[1]).all() and (dst == full[2]).all()
+
+
+def test_load_edges_parses_only_appended_lines(tmp_path, monkeypatch):
+    path = str(tmp_path / "visGraph.dot")
+    rng = np.random.default_rng(0)
+    edges = [tuple(e) for e in rng.integers(0, 300, (1000, 2))]
+    _write(path, edges)
+    assert _same_as_full_parse(path)
+
+    parsed = []
+    parse_edges = gv.parse_edges
+
+    def counting(lines):
+        # load_edges hands over a list of lines, parse_dot the open file
+        if isinstance(lines, list):
+            parsed.append(len(lines))
+        return parse_edges(lines)
+
+    monkeypatch.setattr(gv, "parse_edges", counting)
+    edges += [tuple(e) for e in rng.integers(0, 400, (50, 2))]
+    _write(path, edges)
+    assert _same_as_full_parse(path)
+    assert parsed == [50]
+
+    # Edited history is parsed again from the start
+    edges[0] = (299, 298)
+    _write(path, edges)
+    assert _same_as_full_parse(path)
+    assert parsed[-1] == len(edges) + 1
+
+
+def test_warm_start_without_previous_nodes():
+    nodes = np.array(["0x01", "0x02"])
+    src, dst = np.array([0]), np.array([1])
+    assert gv.warm_start_blocks(nodes, src, dst, (np.empty(0, dtype=str), np.empty(0, dtype=np.int64))) == (None, 1.0)
+    blocks, new = gv.warm_start_blocks(nodes, src, dst, (np.array(["0x01"]), np.array([3])))
+    assert blocks.tolist() == [3, 3] and new == 0.5
+
+
+def test_build_graph_names_vertices():
+    nodes = np.array(["0x01", "0x02", "0x03"])
+    g = gv.build_graph(nodes, np.array([0, 1]), np.array([1, 2]))
+    assert g.num_edges() == 2
+    assert [g.vp.name[v] for v in g.vertices()] == nodes.tolist()
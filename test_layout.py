@@ -0,0 +1,18 @@
+import os
+
+from layout import cached_layout
+from txgraph import CSRGraph
+
+
+def test_cached_layout_without_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    positions = cached_layout(CSRGraph.random(50, 120), iterations=5, grid=32, cache_dir=None)
+    assert positions.shape == (50, 2)
+    assert not os.listdir(tmp_path)
+
+
+def test_cached_layout_reuses_cache(tmp_path):
+    graph = CSRGraph.random(50, 120)
+    first = cached_layout(graph, iterations=5, grid=32, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 1
+    assert (cached_layout(graph, iterations=5, grid=32, cache_dir=str(tmp_path)) == first).all()
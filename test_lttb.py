@@ -0,0 +1,100 @@
+import json
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lttb import ZOOM_SCRIPT, Pyramid, follow_zoom, lttb, zoomable
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = np.arange(10_000, dtype=float)
+    y = np.random.default_rng(0).normal(size=len(x)).cumsum()
+    kept = lttb(x, y, 500)
+    assert len(kept) == 500
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+
+
+# What a zoom range can hold on a date axis: Plotly's strings, datetimes, numpy dates
+@pytest.mark.parametrize("bound", [str, pd.Timestamp.to_pydatetime, pd.Timestamp.to_datetime64])
+def test_pyramid_window_accepts_date_bounds(bound):
+    dates = pd.date_range("2020-01-01", periods=100_000, freq="min")
+    pyramid = Pyramid(dates.to_numpy(), np.random.default_rng(0).normal(size=len(dates)), budget=1000)
+    lo, hi = pd.Timestamp("2020-01-10"), pd.Timestamp("2020-01-10 06:00")
+    rows = pyramid.window(bound(lo), bound(hi))
+    # Six hours of minutes fit the budget, so the raw points come back, plus one neighbour each side
+    assert len(rows) == 6 * 60 + 3
+    assert dates[rows[1]] == lo and dates[rows[-2]] == hi
+
+
+def test_follow_zoom_redraws_date_axis_widget():
+    go = pytest.importorskip("plotly.graph_objects")
+    pytest.importorskip("anywidget")
+    dates = pd.date_range("2020-01-01", periods=100_000, freq="min").to_numpy()
+    values = np.random.default_rng(0).normal(size=len(dates)).cumsum()
+    widget = go.FigureWidget(go.Scatter(x=dates[:1], y=values[:1], name="value"))
+    follow_zoom(widget, {"value": (dates, values)}, budget=1000)
+    assert len(widget.data[0].x) <= 1002
+
+    # Plotly reports date-axis ranges as strings
+    widget.layout.xaxis.range = ["2020-01-10 00:00:00", "2020-01-10 06:00:00"]
+    shown = pd.to_datetime(widget.data[0].x)
+    assert len(shown) == 6 * 60 + 3
+    assert shown[1] == pd.Timestamp("2020-01-10")
+
+
+def _zoomable_figure(budget=1000):
+    px = pytest.importorskip("plotly.express")
+    dates = pd.date_range("2020-01-01", periods=100_000, freq="min")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"Date(UTC)": np.tile(dates, 2), "Metric": np.repeat(["a", "b"], len(dates)),
+                       "Value": rng.normal(size=2 * len(dates)).cumsum()})
+    fig = zoomable(px.line(df.iloc[::1000], x="Date(UTC)", y="Value", color="Metric"),
+                   df, "Date(UTC)", "Value", "Metric", budget=budget)
+    return df, fig
+
+
+def test_zoomable_starts_on_the_coarsest_level():
+    df, fig = _zoomable_figure()
+    for trace, series in zip(fig.data, fig.layout.meta["zoom"]["series"]):
+        assert len(trace.x) <= 1000 and len(series["x"]) == 100_000
+        assert series["levels"][0] == list(range(100_000))
+        assert len(trace.x) == len(series["levels"][-1])
+
+
+def test_zoom_script_picks_the_same_points_as_pyramid_window():
+    if shutil.which("node") is None:
+        pytest.skip("node is not installed")
+    df, fig = _zoomable_figure()
+    layout = json.loads(fig.to_json())["layout"]
+    harness = f"""
+        var gd = {{layout: {json.dumps(layout)}, on: function (event, handler) {{ gd.handler = handler; }}}};
+        var document = {{getElementById: function () {{ return gd; }}}};
+        var calls = [];
+        var Plotly = {{restyle: function (g, update, traces) {{ calls.push([update, traces]); }}}};
+        {ZOOM_SCRIPT.replace("{plot_id}", "plot")}
+        gd.handler({{'xaxis.range[0]': '2020-01-10 00:00:00', 'xaxis.range[1]': '2020-01-10 06:00:00'}});
+        gd.handler({{'xaxis.autorange': true}});
+        console.log(JSON.stringify(calls));
+    """
+    calls = json.loads(subprocess.run(["node"], input=harness, capture_output=True, text=True, check=True).stdout)
+    (zoomed, traces), (reset, _) = calls
+    assert traces == [0, 1]
+    for i, (_, group) in enumerate(df.groupby("Metric")):
+        pyramid = Pyramid(group["Date(UTC)"].to_numpy(), group["Value"].to_numpy(), 1000)
+        expected = pyramid.window("2020-01-10", "2020-01-10 06:00:00")
+        assert len(zoomed["x"][i]) == len(expected) == 6 * 60 + 3
+        assert zoomed["y"][i] == group["Value"].to_numpy()[expected].tolist()
+        assert len(reset["x"][i]) == len(pyramid.levels[-1])
+
+
+def test_follow_zoom_reads_the_attached_pyramids():
+    go = pytest.importorskip("plotly.graph_objects")
+    pytest.importorskip("anywidget")
+    _, fig = _zoomable_figure()
+    widget = follow_zoom(go.FigureWidget(fig))
+    widget.layout.xaxis.range = ["2020-01-10 00:00:00", "2020-01-10 06:00:00"]
+    assert [len(trace.x) for trace in widget.data] == [6 * 60 + 3] * 2
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from normalized import SOURCES, STRATEGIES, column_stats, normalize_file
+
+NAME = "deployed-contracts"
+HEADER = '"Date(UTC)","UnixTimeStamp","No. of Deployed Contracts"\n'
+
+
+@pytest.mark.parametrize("content", ["", HEADER])
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_empty_source_writes_header_only(tmp_path, content, strategy):
+    spec = SOURCES[NAME]
+    (tmp_path / spec["file"]).write_text(content)
+    stats = column_stats(str(tmp_path / spec["file"]), spec, strategy)
+    if stats is not None:
+        assert stats["count"].tolist() == [0]
+        assert all(np.isnan(stats[name]).all() for name in ("first", "min", "max", "mean", "std"))
+
+    out = pd.read_csv(normalize_file(NAME, strategy, root=str(tmp_path)))
+    assert list(out.columns) == ["Date(UTC)", "UnixTimeStamp", "No. of Deployed Contracts"]
+    assert len(out) == 0
+
+
+def test_stats_match_numpy(tmp_path):
+    spec = SOURCES[NAME]
+    rows = np.arange(1, 26, dtype=float) ** 1.5
+    lines = [f'"2024-01-{i + 1:02d}","{1704067200 + 86400 * i}","{v}"\n' for i, v in enumerate(rows)]
+    (tmp_path / spec["file"]).write_text(HEADER + "".join(lines))
+    stats = column_stats(str(tmp_path / spec["file"]), spec, "zscore", chunk_rows=7)
+    assert stats["count"][0] == len(rows)
+    assert stats["mean"][0] == pytest.approx(rows.mean())
+    assert stats["std"][0] == pytest.approx(rows.std())
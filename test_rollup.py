@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import pandas as pd
+
+import metrics
+from metrics import DATASETS, MetricsStore
+from rollup import Rollup
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAME = "deployed-contracts"
+METRIC = NAME + "/No. of Deployed Contracts"
+
+
+def _store(root):
+    return MetricsStore(str(root), datasets={NAME: DATASETS[NAME]})
+
+
+def test_refresh_skips_the_frame_when_nothing_changed(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(HERE, DATASETS[NAME]["file"]), tmp_path)
+    rollup = Rollup(_store(tmp_path))
+    assert rollup.refresh() > 0
+    total = rollup.query(METRIC)["sum"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("metrics frame loaded")
+
+    # A fresh process: new store and rollup, unchanged CSV
+    monkeypatch.setattr(metrics.pd, "read_parquet", fail)
+    monkeypatch.setattr(metrics, "parse_dataset", fail)
+    fresh = Rollup(_store(tmp_path))
+    assert fresh.refresh() == 0
+    assert fresh.query(METRIC)["sum"] == total
+
+
+def test_refresh_folds_in_appended_rows(tmp_path):
+    path = shutil.copy(os.path.join(HERE, DATASETS[NAME]["file"]), tmp_path)
+    Rollup(_store(tmp_path)).refresh()
+
+    df = pd.read_csv(path)
+    last = df.iloc[-1]
+    with open(path, 'a') as f:
+        f.write(f'\n"{pd.Timestamp(int(last["UnixTimeStamp"]) + 86400, unit="s"):%Y-%m-%d}",'
+                f'"{int(last["UnixTimeStamp"]) + 86400}","1000"\n')
+    rollup = Rollup(_store(tmp_path))
+    assert rollup.refresh() == 1
+    assert rollup.query(METRIC)["count"] == len(df) + 1
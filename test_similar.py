@@ -0,0 +1,51 @@
+import numpy as np
+
+from similar import DIM, EXACT_BELOW, LSHIndex
+
+
+def _random(rng, n):
+    keys = rng.integers(0, 256, (n, 20), dtype=np.uint8).view("S20").ravel()
+    return keys, rng.standard_normal((n, DIM)).astype(np.float32)
+
+
+def _check_tables(index):
+    for t in range(len(index.planes)):
+        assert (np.sort(index.order[t]) == np.arange(len(index))).all()
+        assert (index.sorted_codes[t] == index.codes[index.order[t], t]).all()
+        assert (np.diff(index.sorted_codes[t]) >= 0).all()
+
+
+def test_readding_a_key_replaces_its_row():
+    rng = np.random.default_rng(0)
+    keys, vectors = _random(rng, EXACT_BELOW * 2)
+    index = LSHIndex()
+    assert (index.add(keys, vectors) == np.arange(len(keys))).all()
+
+    new_keys, new_vectors = _random(rng, 2)
+    rows = index.add(np.concatenate((keys[[5, 5]], new_keys[:1])), np.concatenate((vectors[:1], new_vectors)))
+    assert rows.tolist() == [5, 5, len(keys)]
+    assert len(index) == len(keys) + 1 == len(np.unique(index.keys))
+    _check_tables(index)
+
+    found, scores = index.query(new_vectors[0], 10)
+    assert found[0][0] == 5 and scores[0][0] > 0.99
+    assert (found[0] == 5).sum() == 1
+
+
+def test_add_to_a_memory_mapped_index(tmp_path):
+    rng = np.random.default_rng(1)
+    keys, vectors = _random(rng, 500)
+    index = LSHIndex()
+    index.add(keys, vectors)
+    index.save(tmp_path)
+
+    loaded = LSHIndex.load(tmp_path)
+    new_keys, new_vectors = _random(rng, 2)
+    loaded.add(np.concatenate((keys[:1], new_keys[:1])), new_vectors)
+    loaded.save(tmp_path)
+
+    reloaded = LSHIndex.load(tmp_path)
+    assert len(reloaded) == 501
+    _check_tables(reloaded)
+    assert reloaded.query(new_vectors[0], 1)[0][0][0] == 0
+    assert reloaded.query(new_vectors[1], 1)[0][0][0] == 500
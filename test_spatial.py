@@ -0,0 +1,23 @@
+import numpy as np
+
+from spatial import SpatialIndex
+
+
+def test_knn_matches_brute_force_across_shards():
+    points = np.random.default_rng(0).uniform(0, 100, (2000, 3))
+    index = SpatialIndex(points, shards=8, workers=2)
+    queries = points[:50] + 0.5
+    distances, indices = index.knn(queries, 5)
+    brute = np.linalg.norm(queries[:, None, :] - points[None, :, :], axis=2)
+    assert np.allclose(distances, np.sort(brute, axis=1)[:, :5])
+    assert (index.count_radius(queries, 10.0) == (brute <= 10.0).sum(axis=1)).all()
+
+
+def test_empty_cloud_answers_with_nothing():
+    index = SpatialIndex(np.empty((0, 3)))
+    queries = np.zeros((2, 3))
+    distances, indices = index.knn(queries, 3)
+    assert np.isinf(distances).all() and (indices == -1).all()
+    assert [len(hits) for hits in index.radius(queries, 1.0)] == [0, 0]
+    assert index.count_radius(queries, 1.0).tolist() == [0, 0]
+    assert len(index.local_density()) == 0
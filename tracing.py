@@ -0,0 +1,188 @@
+import atexit
+import functools
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# TRACE_FILE=trace.json (or 1) turns tracing on for any script that imports this module
+ENV_VAR = "TRACE_FILE"
+# Set by enable() so worker processes know whose trace they feed
+OWNER_VAR = "TRACE_OWNER_PID"
+DEFAULT_PATH = "trace.json"
+
+_path = None
+_owner = None
+_events = []
+_lock = threading.Lock()
+_disabled = nullcontext()
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def enabled():
+    return _path is not None
+
+
+def enable(path=DEFAULT_PATH):
+    """Start recording spans, written to path at exit; child processes inherit it through the environment"""
+    global _path, _owner
+    _path = path
+    _owner = os.getpid()
+    os.environ[ENV_VAR] = path
+    os.environ[OWNER_VAR] = str(_owner)
+    for part in glob.glob(glob.escape(path) + ".*.part"):
+        os.remove(part)
+    atexit.register(write)
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name, "ph": "X", "ts": self.start / 1000, "dur": (end - self.start) / 1000,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": dict(self.args),
+        }
+        peak = max_rss_mb()
+        if peak is not None:
+            event["args"]["max_rss_mb"] = round(peak, 1)
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def span(name, **args):
+    """Context manager timing a stage, a shared no-op when tracing is off"""
+    if _path is None:
+        return _disabled
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """Decorator form of span(), named after the function by default"""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _path is None:
+                return fn(*args, **kwargs)
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def flush():
+    """Hand this worker process's spans to the parent through a part file next to the trace"""
+    if _path is None or os.getpid() == _owner:
+        return
+    with _lock:
+        # A forked worker also inherits the parent's unwritten spans, only hand over its own
+        events = [e for e in _events if e["pid"] == os.getpid()]
+        _events.clear()
+    if events:
+        with open(f"{_path}.{os.getpid()}.part", 'a') as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+
+
+def summary(events):
+    """Rows of (name, count, total ms, mean ms, max ms, peak rss MB) by total time"""
+    rows = {}
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        row = rows.setdefault(event["name"], [0, 0.0, 0.0, None])
+        row[0] += 1
+        row[1] += event["dur"] / 1000
+        row[2] = max(row[2], event["dur"] / 1000)
+        rss = event["args"].get("max_rss_mb")
+        if rss is not None:
+            row[3] = rss if row[3] is None else max(row[3], rss)
+    table = [(name, count, total, total / count, longest, rss) for name, (count, total, longest, rss) in rows.items()]
+    return sorted(table, key=lambda r: -r[2])
+
+
+def print_summary(events):
+    print(f"{'span':<40} {'count':>6} {'total ms':>10} {'mean ms':>10} {'max ms':>10} {'max rss MB':>11}")
+    for name, count, total, mean, longest, rss in summary(events):
+        print(f"{name:<40} {count:>6} {total:>10.1f} {mean:>10.1f} {longest:>10.1f} "
+              f"{'' if rss is None else f'{rss:.1f}':>11}")
+
+
+def write(path=None):
+    """Write the Chrome trace-event JSON (chrome://tracing, Perfetto) and print the summary table"""
+    if _path is None:
+        return
+    if os.getpid() != _owner:
+        flush()
+        return
+    path = path or _path
+
+    with _lock:
+        events = list(_events)
+        _events.clear()
+    for part in glob.glob(glob.escape(_path) + ".*.part"):
+        with open(part, 'r') as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+        os.remove(part)
+    if not events:
+        return
+
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print_summary(events)
+    print(f"Trace with {len(events)} spans written to {path}")
+
+
+def add_argument(parser):
+    """--trace [path] on a script's argparse parser"""
+    parser.add_argument('--trace', nargs='?', const=DEFAULT_PATH, default=None,
+                        help=f"record timing spans to a Chrome trace file (or set {ENV_VAR})")
+
+
+def configure(path=None):
+    """Enable from a --trace value or the environment variable, whichever is set"""
+    global _path, _owner
+    path = path or os.environ.get(ENV_VAR)
+    if not path or enabled():
+        return
+    path = DEFAULT_PATH if path == "1" else path
+    owner = os.environ.get(OWNER_VAR)
+    if owner and int(owner) != os.getpid():
+        # A worker of a traced process: record, and leave writing the trace to the parent
+        _path = path
+        _owner = int(owner)
+        atexit.register(flush)
+    else:
+        enable(path)
+
+
+# Worker processes (and scripts run with TRACE_FILE set) start tracing on import
+configure()
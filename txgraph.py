@@ -0,0 +1,82 @@
+import numpy as np
+
+from address import AddressBook
+from recommender import load_interactions
+
+
+class CSRGraph:
+    """Undirected transaction graph as CSR index/offset arrays over interned addresses"""
+
+    def __init__(self, nodes, indptr, indices, senders=None):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        # Nodes with at least one outgoing transaction
+        self.senders = senders if senders is not None else np.zeros(len(nodes), dtype=bool)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def num_edges(self):
+        return len(self.indices) // 2
+
+    @classmethod
+    def from_ids(cls, nodes, src, dst, senders=None):
+        """Build from integer edge endpoints, dropping self-loops and duplicate edges"""
+        n = len(nodes)
+        keep = src != dst
+        src = src[keep].astype(np.int64)
+        dst = dst[keep].astype(np.int64)
+
+        # Both directions, deduplicated through a single sortable key
+        keys = np.unique(np.concatenate((src * n + dst, dst * n + src)))
+        rows = keys // n
+        cols = keys % n
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        return cls(nodes, indptr, cols.astype(np.int32), senders)
+
+    @classmethod
+    def from_book(cls, book, src, dst):
+        """Build from AddressBook ids, node i is address id i and nodes holds the 20-byte addresses"""
+        senders = np.zeros(len(book), dtype=bool)
+        senders[src] = True
+        return cls.from_ids(book.raw, src, dst, senders)
+
+    @classmethod
+    def from_edges(cls, src_names, dst_names):
+        """Build from hex address arrays"""
+        book = AddressBook()
+        ids = book.intern(np.concatenate((src_names, dst_names)))
+        return cls.from_book(book, ids[:len(src_names)], ids[len(src_names):])
+
+    @classmethod
+    def from_file(cls, file_path):
+        """Load data.json transactions or a graphGen.ts adjacency"""
+        return cls.from_book(*load_interactions(file_path))
+
+    @classmethod
+    def random(cls, num_nodes, num_edges, seed=42):
+        """Random graph with about num_edges edges, like the nx.gnm_random_graph demo kon.py used to draw"""
+        rng = np.random.default_rng(seed)
+        src = rng.integers(0, num_nodes, num_edges)
+        dst = rng.integers(0, num_nodes, num_edges)
+        return cls.from_ids(np.arange(num_nodes).astype(str), src, dst)
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def edges(self):
+        """(src, dst) arrays with every undirected edge once"""
+        src = np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr))
+        upper = src < self.indices
+        return src[upper], self.indices[upper].astype(np.int64)
+
+    def save(self, file_path):
+        np.savez(file_path, nodes=self.nodes, indptr=self.indptr, indices=self.indices, senders=self.senders)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as f:
+            return cls(f['nodes'], f['indptr'], f['indices'], f['senders'])